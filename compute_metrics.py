@@ -2,13 +2,17 @@
 # -*- coding: utf-8 -*-
 """
 compute_metrics.py
-Lê: rotulos_ouro.csv (ouro), baseline.csv, outputs/*/resultados.json e outputs/summary.csv
+Lê: rotulos_ouro.csv (ouro), baseline.csv, outputs/resultados_parquet/ (ou, legado, outputs/*/resultados.json) e outputs/summary.csv
 Gera: T1_F1.csv, T2_coverage.csv, T3_mae.csv e gráficos simples.
 Uso:
   python compute_metrics.py --root . --gold rotulos_ouro.csv --outputs outputs --baseline baseline.csv --pesos pesos.json
+Opcional: --bootstrap N (ICs de F1/MAE, padrão 1000; 0 desliga), --seed, --workers,
+  --ignorar-summary (escore recalculado com os pesos atuais em vez do summary.csv).
+Gera também T4_bootstrap_ci.csv e T5_slices.csv (por UF, órgão e mês).
 """
 
 import argparse, os, json, glob, math
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 import pandas as pd
 import numpy as np
@@ -25,10 +29,42 @@ def load_gold(path_csv: Path) -> pd.DataFrame:
             df[col] = ""
     return df[keep]
 
-def try_load_mvp_results(outputs_dir: Path) -> pd.DataFrame:
-    # Tenta ler mvp_results.csv; se não houver, varre resultados.json em outputs/<doc_id>/resultados.json
+def load_parquet_results(dataset_dir: Path, doc_ids=None, criterios=None):
+    # Lê só as colunas usadas (projeção) e, se pedido, filtra doc_id/criterio no próprio scan
+    # (partição por critério + estatísticas dos row groups). Sem pyarrow, devolve None.
+    try:
+        import pyarrow.dataset as ds
+    except ImportError:
+        print("[WARN] pyarrow não instalado; ignorando", dataset_dir)
+        return None
+    dataset = ds.dataset(dataset_dir, format="parquet", partitioning="hive")
+    filt = None
+    if doc_ids is not None:
+        filt = ds.field("doc_id").isin(sorted(doc_ids))
+    if criterios is not None:
+        fc = ds.field("criterio").isin(sorted(criterios))
+        filt = fc if filt is None else (filt & fc)
+    table = dataset.to_table(columns=["doc_id","criterio","presenca","evidencias_count","avaliado_em"], filter=filt)
+    df = table.to_pandas()
+    df["criterio"] = df["criterio"].astype(str).str.strip().str.lower()
+    # Documento reavaliado: fica a avaliação mais recente
+    df = df.sort_values("avaliado_em").drop_duplicates(["doc_id","criterio"], keep="last")
+    df["presenca_mvp"] = df["presenca"].astype(str).str.strip().str.lower()
+    return df[["doc_id","criterio","presenca_mvp","evidencias_count"]].reset_index(drop=True)
+
+def try_load_mvp_results(outputs_dir: Path, doc_ids=None, criterios=None) -> pd.DataFrame:
+    # Ordem: mvp_results.csv; dataset Parquet em outputs/resultados_parquet/; por fim (legado)
+    # varre resultados.json em outputs/<doc_id>/resultados.json
     csv_path = outputs_dir / "mvp_results.csv"
     rows = []
+    parquet_dir = outputs_dir / "resultados_parquet"
+    if not csv_path.exists() and parquet_dir.is_dir():
+        df = load_parquet_results(parquet_dir, doc_ids, criterios)
+        if df is not None:
+            return df
+        if not any(outputs_dir.glob("**/resultados.json")):
+            # Só há o dataset Parquet: seguir daria métricas vazias sem erro.
+            raise SystemExit(f"Resultados só em Parquet ({parquet_dir}) e pyarrow não instalado. Execute: pip install pyarrow")
     if csv_path.exists():
         df = pd.read_csv(csv_path, dtype=str).fillna("")
         # Esperado: doc_id, criterio, presenca_mvp, evidencias_count (opcional)
@@ -83,51 +119,53 @@ def try_load_summary(outputs_dir: Path) -> pd.DataFrame:
 
 SCORE_MAP = {"sim": 1.0, "parcial": 0.5, "nao": 0.0, "insuficiente": 0.0}
 
+def _weighted_scores(df: pd.DataFrame, presenca_col: str, pesos: dict, out_col: str) -> pd.DataFrame:
+    # Escore ponderado por documento: 100 * soma(w * s) / soma(w), com pesos/escores como colunas.
+    # As somas são feitas por posição dentro do documento (matriz doc x critério), na mesma
+    # ordem das linhas, para reproduzir exatamente o arredondamento da soma sequencial.
+    if df.empty:
+        return pd.DataFrame(columns=["doc_id", out_col])
+    w = df["criterio"].map(lambda c: float(pesos.get(c, 0.0))).to_numpy(dtype=float)
+    s = df[presenca_col].map(SCORE_MAP).fillna(0.0).to_numpy(dtype=float)
+    codes, docs = pd.factorize(df["doc_id"], sort=True)
+    pos = pd.Series(codes).groupby(codes).cumcount().to_numpy()
+    W = np.zeros((len(docs), pos.max() + 1))
+    WS = np.zeros_like(W)
+    W[codes, pos] = w
+    WS[codes, pos] = w * s
+    total_w = np.zeros(len(docs))
+    acc = np.zeros(len(docs))
+    for j in range(W.shape[1]):
+        total_w += W[:, j]
+        acc += WS[:, j]
+    safe = np.where(total_w == 0, 1.0, total_w)
+    score = np.where(total_w == 0, 0.0, 100.0 * acc / safe)
+    # round() do Python por documento, igual à versão anterior
+    return pd.DataFrame({"doc_id": docs, out_col: [round(float(x), 2) for x in score]})
+
 def compute_human_scores(gold: pd.DataFrame, pesos: dict) -> pd.DataFrame:
-    rows = []
-    for (doc_id), g in gold.groupby("doc_id"):
-        total_w = 0.0
-        acc = 0.0
-        for _, r in g.iterrows():
-            criterio = r["criterio"]
-            w = float(pesos.get(criterio, 0.0))
-            total_w += w
-            acc += w * SCORE_MAP.get(r["presenca_gold"], 0.0)
-        score = 0.0 if total_w == 0 else 100.0 * acc / total_w
-        rows.append({"doc_id": doc_id, "escore_humano": round(score, 2)})
-    return pd.DataFrame(rows)
+    return _weighted_scores(gold, "presenca_gold", pesos, "escore_humano")
 
 def compute_scores_from_preds(preds: pd.DataFrame, pesos: dict) -> pd.DataFrame:
-    rows = []
-    for (doc_id), g in preds.groupby("doc_id"):
-        total_w = 0.0
-        acc = 0.0
-        for _, r in g.iterrows():
-            criterio = r["criterio"]
-            w = float(pesos.get(criterio, 0.0))
-            total_w += w
-            acc += w * SCORE_MAP.get(r["presenca_mvp"], 0.0)
-        score = 0.0 if total_w == 0 else 100.0 * acc / total_w
-        rows.append({"doc_id": doc_id, "escore_mvp_calc": round(score, 2)})
-    return pd.DataFrame(rows)
+    return _weighted_scores(preds, "presenca_mvp", pesos, "escore_mvp_calc")
 
 def f1_macro(y_true: list, y_pred: list, labels=("sim","parcial","nao")) -> float:
-    # F1 macro entre sim/parcial/nao (ignora "insuficiente")
-    def f1_for_label(lbl):
-        tp = sum((yt==lbl) and (yp==lbl) for yt, yp in zip(y_true, y_pred))
-        fp = sum((yt!=lbl) and (yp==lbl) for yt, yp in zip(y_true, y_pred))
-        fn = sum((yt==lbl) and (yp!=lbl) for yt, yp in zip(y_true, y_pred))
-        if tp == 0 and (fp>0 or fn>0):
-            return 0.0
-        if tp == 0 and fp == 0 and fn == 0:
-            return 0.0
-        prec = tp / (tp + fp) if (tp+fp)>0 else 0.0
-        rec  = tp / (tp + fn) if (tp+fn)>0 else 0.0
-        if prec+rec == 0:
-            return 0.0
-        return 2*prec*rec/(prec+rec)
-    vals = [f1_for_label(lbl) for lbl in labels]
-    return float(np.mean(vals))
+    # F1 macro entre sim/parcial/nao (ignora "insuficiente"), via matriz de confusão vetorizada
+    yt = np.asarray(y_true, dtype=object)
+    yp = np.asarray(y_pred, dtype=object)
+    if yt.size == 0:
+        return 0.0
+    lbl = np.asarray(labels, dtype=object)[:, None]
+    t = yt[None, :] == lbl
+    p = yp[None, :] == lbl
+    tp = (t & p).sum(axis=1)
+    fp = (~t & p).sum(axis=1)
+    fn = (t & ~p).sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        prec = tp / (tp + fp)
+        rec = tp / (tp + fn)
+        f1 = np.where(tp > 0, 2 * prec * rec / (prec + rec), 0.0)
+    return float(np.mean(f1))
 
 def build_t1_f1(gold: pd.DataFrame, preds: pd.DataFrame, baseline: pd.DataFrame) -> pd.DataFrame:
     # Merge para cada critério e doc
@@ -191,6 +229,102 @@ def build_t3_mae(gold: pd.DataFrame, preds: pd.DataFrame, summary: pd.DataFrame,
     m_sorted = m.sort_values("erro_abs", ascending=False)
     return m_sorted, mae
 
+LABELS = ("sim", "parcial", "nao")
+BOOT_CHUNK = 250  # reamostragens por tarefa (limita a memória das matrizes de índices)
+
+def _encode_labels(values) -> np.ndarray:
+    # sim/parcial/nao -> 0/1/2; qualquer outro rótulo -> -1
+    return pd.Categorical(pd.Series(values, dtype=object), categories=list(LABELS)).codes.astype(np.int8)
+
+def _f1_macro_codes(yt: np.ndarray, yp: np.ndarray) -> np.ndarray:
+    # F1 macro por linha de matrizes (reamostragens x observações), mesma fórmula de f1_macro
+    vals = []
+    for lbl in range(len(LABELS)):
+        t = yt == lbl
+        p = yp == lbl
+        tp = (t & p).sum(axis=1)
+        fp = (~t & p).sum(axis=1)
+        fn = (t & ~p).sum(axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            prec = tp / (tp + fp)
+            rec = tp / (tp + fn)
+            vals.append(np.where(tp > 0, 2 * prec * rec / (prec + rec), 0.0))
+    return np.mean(vals, axis=0)
+
+def _bootstrap_chunk(yt, ymvp, ybase, erros, n_resamples, seed):
+    rng = np.random.default_rng(seed)
+    out = {}
+    if len(yt) > 0:
+        idx = rng.integers(0, len(yt), size=(n_resamples, len(yt)))
+        out["F1_mvp"] = _f1_macro_codes(yt[idx], ymvp[idx])
+        if ybase is not None:
+            out["F1_baseline"] = _f1_macro_codes(yt[idx], ybase[idx])
+    if len(erros) > 0:
+        idx = rng.integers(0, len(erros), size=(n_resamples, len(erros)))
+        out["MAE"] = erros[idx].mean(axis=1)
+    return out
+
+def bootstrap_ci(y_true, y_mvp, y_base, erros, n_boot=1000, seed=42, workers=1, alpha=0.05) -> pd.DataFrame:
+    # Reamostragem vetorizada (matrizes de índices), dividida em blocos com sementes derivadas
+    # de uma SeedSequence: o resultado não depende do número de workers.
+    yt, ymvp = _encode_labels(y_true), _encode_labels(y_mvp)
+    ybase = _encode_labels(y_base) if y_base is not None else None
+    erros = np.asarray(erros, dtype=float)
+    sizes = [min(BOOT_CHUNK, n_boot - i) for i in range(0, n_boot, BOOT_CHUNK)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    args = [(yt, ymvp, ybase, erros, n, sd) for n, sd in zip(sizes, seeds)]
+    if workers > 1 and len(args) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            parts = list(ex.map(_bootstrap_chunk, *zip(*args)))
+    else:
+        parts = [_bootstrap_chunk(*a) for a in args]
+    point = {
+        "F1_mvp": f1_macro(list(y_true), list(y_mvp)) if len(yt) else np.nan,
+        "F1_baseline": f1_macro(list(y_true), list(y_base)) if (y_base is not None and len(yt)) else np.nan,
+        "MAE": erros.mean() if len(erros) else np.nan,
+    }
+    rows = []
+    for metric, est in point.items():
+        samples = [p[metric] for p in parts if metric in p]
+        if not samples:
+            continue
+        dist = np.concatenate(samples)
+        lo, hi = np.quantile(dist, [alpha / 2, 1 - alpha / 2])
+        rows.append({"metrica": metric, "estimativa": round(float(est), 3), "ic_inf": round(float(lo), 3),
+                     "ic_sup": round(float(hi), 3), "nivel": 1 - alpha, "n_boot": n_boot,
+                     "n": len(yt) if metric != "MAE" else len(erros)})
+    return pd.DataFrame(rows, columns=["metrica","estimativa","ic_inf","ic_sup","nivel","n_boot","n"])
+
+def merge_for_f1(gold: pd.DataFrame, preds: pd.DataFrame, baseline: pd.DataFrame) -> pd.DataFrame:
+    # Mesmo recorte do T1 (classes alvo), com a coluna do baseline quando houver
+    m = gold.merge(preds, on=["doc_id","criterio"], how="inner")
+    m = m[m["presenca_gold"].isin(list(LABELS))]
+    if not baseline.empty:
+        m = m.merge(baseline, on=["doc_id","criterio"], how="left")
+        m["presenca_baseline"] = m["presenca_baseline"].fillna("nao")
+    return m
+
+def build_slices(m: pd.DataFrame, t3_docs: pd.DataFrame, gold: pd.DataFrame) -> pd.DataFrame:
+    # F1/MAE por UF, órgão e mês (AAAA-MM de "data")
+    m = m.copy()
+    m["mes"] = m["data"].astype(str).str[:7]
+    docs = gold.drop_duplicates("doc_id")[["doc_id","uf","orgao","data"]].copy()
+    docs["mes"] = docs["data"].astype(str).str[:7]
+    d = t3_docs.merge(docs, on="doc_id", how="left") if not t3_docs.empty else pd.DataFrame(columns=["uf","orgao","mes","erro_abs"])
+    has_base = "presenca_baseline" in m.columns
+    rows = []
+    for dim in ["uf", "orgao", "mes"]:
+        maes = d.groupby(dim)["erro_abs"].agg(["mean", "size"]) if not d.empty else pd.DataFrame(columns=["mean","size"])
+        for valor, g in m.groupby(dim):
+            f1_mvp = f1_macro(g["presenca_gold"].tolist(), g["presenca_mvp"].tolist())
+            f1_base = f1_macro(g["presenca_gold"].tolist(), g["presenca_baseline"].tolist()) if has_base else np.nan
+            mae = maes.loc[valor, "mean"] if valor in maes.index else np.nan
+            n_docs = int(maes.loc[valor, "size"]) if valor in maes.index else 0
+            rows.append({"dimensao": dim, "valor": valor, "F1_mvp": round(f1_mvp, 3),
+                         "F1_baseline": ("" if math.isnan(f1_base) else round(f1_base, 3)), "n": len(g),
+                         "MAE": ("" if pd.isna(mae) else round(float(mae), 3)), "n_docs": n_docs})
+    return pd.DataFrame(rows, columns=["dimensao","valor","F1_mvp","F1_baseline","n","MAE","n_docs"])
+
 def plot_bar(df: pd.DataFrame, xcol: str, ycols: list, title: str, png_path: Path):
     plt.figure()
     # Sem cores definidas, um eixo por coluna lado a lado
@@ -218,6 +352,11 @@ def main():
     ap.add_argument("--baseline", default="baseline.csv", help="CSV do baseline")
     ap.add_argument("--pesos", default="pesos.json", help="Arquivo JSON com pesos por critério")
     ap.add_argument("--outdir", default="metrics_out", help="Pasta para salvar as tabelas/figuras")
+    ap.add_argument("--ignorar-summary", action="store_true", help="Recalcula o escore MVP com --pesos a partir dos resultados por critério, ignorando summary.csv")
+    ap.add_argument("--somente-ouro", action="store_true", help="Lê do dataset Parquet só os docs/critérios do ouro (afeta o T2)")
+    ap.add_argument("--bootstrap", type=int, default=1000, help="Nº de reamostragens para os ICs (0 desliga)")
+    ap.add_argument("--seed", type=int, default=42, help="Semente do bootstrap")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Processos usados no bootstrap")
     args = ap.parse_args()
 
     root = Path(args.root)
@@ -225,9 +364,15 @@ def main():
     out_dir.mkdir(parents=True, exist_ok=True)
 
     gold = load_gold(root / args.gold)
-    preds = try_load_mvp_results(root / args.outputs)
+    if args.somente_ouro:
+        preds = try_load_mvp_results(root / args.outputs, set(gold["doc_id"]), set(gold["criterio"]))
+    else:
+        preds = try_load_mvp_results(root / args.outputs)
     baseline = try_load_baseline(root / args.baseline)
-    summary = try_load_summary(root / args.outputs)
+    if args.ignorar_summary:
+        summary = pd.DataFrame(columns=["doc_id","escore_aderencia"])
+    else:
+        summary = try_load_summary(root / args.outputs)
     pesos = {}
     if (root / args.pesos).exists():
         try:
@@ -252,6 +397,21 @@ def main():
     mae_path = out_dir / "T3_mae_overall.txt"
     mae_path.write_text(f"MAE: {mae:.3f}\n", encoding="utf-8")
 
+    # T4: intervalos de confiança (bootstrap) e T5: recortes por UF/órgão/mês
+    m = merge_for_f1(gold, preds, baseline)
+    extra = []
+    if args.bootstrap > 0:
+        y_base = m["presenca_baseline"].tolist() if "presenca_baseline" in m.columns else None
+        t4 = bootstrap_ci(m["presenca_gold"].tolist(), m["presenca_mvp"].tolist(), y_base,
+                          t3_docs["erro_abs"].dropna().to_numpy(), args.bootstrap, args.seed, args.workers)
+        t4_path = out_dir / "T4_bootstrap_ci.csv"
+        t4.to_csv(t4_path, index=False)
+        extra.append(t4_path.name)
+    t5 = build_slices(m, t3_docs, gold)
+    t5_path = out_dir / "T5_slices.csv"
+    t5.to_csv(t5_path, index=False)
+    extra.append(t5_path.name)
+
     # Gráficos (opcionais, simples)
     try:
         if not t1.empty:
@@ -269,7 +429,7 @@ def main():
         print("[WARN] falha ao gerar gráficos:", e)
 
     print("Arquivos gerados em:", out_dir.resolve())
-    print(" -", t1_path.name, "|", t2_path.name, "|", t3_path.name, "|", mae_path.name)
+    print(" -", t1_path.name, "|", t2_path.name, "|", t3_path.name, "|", mae_path.name, "|", " | ".join(extra))
     print("Figuras (se geradas): fig_F1.png, fig_MAE.png")
 
 if __name__ == "__main__":
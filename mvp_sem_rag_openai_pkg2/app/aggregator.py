@@ -1,5 +1,7 @@
-from typing import Dict, List
+from typing import Dict, List, Tuple
 from .models import CriterionResult, Consolidated
+from .records import Consolidado, Resultado
+from .metrics import timed
 
 DEFAULT_WEIGHTS = {
     "eficiencia_energetica": 0.25,
@@ -12,7 +14,8 @@ DEFAULT_WEIGHTS = {
 
 SCORE_MAP = {"sim":1.0, "parcial":0.5, "nao":0.0, "insuficiente":0.0}
 
-def consolidate(doc_id: str, resultados: List[CriterionResult], pesos: Dict[str, float] | None = None) -> Consolidated:
+def _score(resultados, pesos: Dict[str, float] | None) -> Tuple[float, Dict[str, List[str]]]:
+    # Aceita CriterionResult ou records.Resultado (mesmos atributos).
     pesos = pesos or DEFAULT_WEIGHTS
     total = 0.0
     used = 0.0
@@ -30,9 +33,20 @@ def consolidate(doc_id: str, resultados: List[CriterionResult], pesos: Dict[str,
             insuficientes.append(r.criterio)
 
     escore = 0.0 if used == 0 else round(100 * total / used, 2)
+    return escore, {"greenwashing_alto": flags_gw, "itens_insuficientes": insuficientes}
+
+@timed("consolidate")
+def consolidate(doc_id: str, resultados: List[CriterionResult], pesos: Dict[str, float] | None = None) -> Consolidated:
+    escore, flags = _score(resultados, pesos)
     return Consolidated(
         doc_id=doc_id,
         escore_aderencia=escore,
-        flags={"greenwashing_alto": flags_gw, "itens_insuficientes": insuficientes},
+        flags=flags,
         resultados=resultados
     )
+
+@timed("consolidate")
+def consolidate_records(doc_id: str, resultados: List[Resultado], pesos: Dict[str, float] | None = None) -> Consolidado:
+    # Mesmo cálculo, sem Pydantic: usado no pipeline/rescore (conversão só na borda da API).
+    escore, flags = _score(resultados, pesos)
+    return Consolidado(doc_id, escore, flags, resultados)
@@ -0,0 +1,196 @@
+"""
+Avaliação em lote de um diretório de PDFs (sem passar pela API HTTP).
+Gera outputs/<doc_id>/resultados.json e outputs/summary.csv, no formato lido por compute_metrics.py.
+Retomável: documentos com resultados.json já gravado são pulados; o summary.csv é
+atualizado a cada documento concluído.
+Com --formato parquet/ambos, os resultados também vão para outputs/resultados_parquet/
+(dataset colunar particionado por critério, gravado a cada --flush-docs documentos).
+Uso:
+  python -m app.batch editais/ --outputs outputs --workers 4 --concorrencia 4 --pesos ../pesos.json
+  python -m app.batch editais/ --outputs outputs_novo --sem-reutilizar
+"""
+
+import argparse, asyncio, csv, json, os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from . import ocr, utils_pdf
+from .llm_async import AsyncLLMClient
+from .records import Resultado
+from .pipeline import analyze_document
+from .dataset import DATASET_DIRNAME, ResultsDataset
+
+SUMMARY_FIELDS = ["doc_id", "escore_aderencia", "greenwashing_alto", "itens_insuficientes", "erros_validacao"]
+
+def find_pdfs(input_dir: Path) -> List[Path]:
+    return sorted(p for p in input_dir.rglob("*") if p.is_file() and p.suffix.lower() == ".pdf")
+
+def result_path(out_dir: Path, doc_id: str) -> Path:
+    return out_dir / doc_id / "resultados.json"
+
+def _worker_init() -> None:
+    # Já há paralelismo entre documentos: evita pools de extração e de OCR aninhados
+    # (N workers x N processos de tesseract).
+    utils_pdf.PDF_WORKERS = 1
+    ocr.OCR_WORKERS = 1
+
+def process_document(doc_path: str, doc_id: str, pesos: Optional[Dict[str, float]],
+                     max_paginas: int, contexto: int, concorrencia: int, modo: str = "individual",
+                     criterios: Optional[Dict[str, List[str]]] = None, max_tokens_contexto: Optional[int] = None,
+                     on_result: Optional[Callable[[Resultado], None]] = None, reutilizar: bool = True) -> dict:
+    async def run():
+        llm = AsyncLLMClient()  # um cliente por event loop
+        try:
+            return await analyze_document(llm, doc_path, doc_id, criterios, pesos, max_paginas, contexto,
+                                          concorrencia, max_tokens_contexto, modo, on_result, reutilizar)
+        finally:
+            await llm.aclose()
+    return asyncio.run(run()).to_dict()
+
+def _write_json(path: Path, data) -> None:
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+    os.replace(tmp, path)
+
+def summary_row(cons: dict) -> dict:
+    flags = cons.get("flags", {})
+    return {
+        "doc_id": cons["doc_id"],
+        "escore_aderencia": cons["escore_aderencia"],
+        "greenwashing_alto": ";".join(flags.get("greenwashing_alto", [])),
+        "itens_insuficientes": ";".join(flags.get("itens_insuficientes", [])),
+        "erros_validacao": len(flags.get("erros_validacao", [])),
+    }
+
+def append_summary(out_dir: Path, rows: List[dict]) -> None:
+    path = out_dir / "summary.csv"
+    new = not path.exists()
+    with path.open("a", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=SUMMARY_FIELDS)
+        if new:
+            w.writeheader()
+        w.writerows(rows)
+
+def save_document(out_dir: Path, cons: dict) -> None:
+    # consolidado.json, depois resultados.json (marca o documento como concluído) e só então a
+    # linha do summary.csv: uma interrupção no meio deixa no máximo uma linha faltando, que o
+    # reconcile_summary recupera na próxima execução.
+    d = out_dir / cons["doc_id"]
+    d.mkdir(parents=True, exist_ok=True)
+    _write_json(d / "consolidado.json", cons)
+    _write_json(d / "resultados.json", cons["resultados"])
+    append_summary(out_dir, [summary_row(cons)])
+
+def reconcile_summary(out_dir: Path, done: List[str]) -> None:
+    # Recupera linhas do summary.csv perdidas por uma interrupção entre as gravações e remove
+    # linhas repetidas de um doc_id (fica a última), de execuções anteriores a essa ordem.
+    path = out_dir / "summary.csv"
+    linhas: Dict[str, dict] = {}
+    total = 0
+    if path.exists():
+        with path.open(newline="", encoding="utf-8") as f:
+            for r in csv.DictReader(f):
+                linhas.pop(r["doc_id"], None)
+                linhas[r["doc_id"]] = r
+                total += 1
+    rows = []
+    for doc_id in done:
+        cons_path = out_dir / doc_id / "consolidado.json"
+        if doc_id not in linhas and cons_path.exists():
+            rows.append(summary_row(json.loads(cons_path.read_text(encoding="utf-8"))))
+    if total > len(linhas):
+        tmp = path.with_suffix(".tmp")
+        with tmp.open("w", newline="", encoding="utf-8") as f:
+            w = csv.DictWriter(f, fieldnames=SUMMARY_FIELDS)
+            w.writeheader()
+            w.writerows(linhas.values())
+        os.replace(tmp, path)
+    if rows:
+        append_summary(out_dir, rows)
+
+def main():
+    load_dotenv()
+    ap = argparse.ArgumentParser(description="Avalia em lote todos os PDFs de um diretório.")
+    ap.add_argument("input_dir", help="Pasta com os PDFs (busca recursiva)")
+    ap.add_argument("--outputs", default="outputs", help="Pasta de saída (outputs/<doc_id>/resultados.json)")
+    ap.add_argument("--pesos", default="", help="JSON com pesos por critério (padrão: DEFAULT_WEIGHTS)")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Documentos processados em paralelo")
+    ap.add_argument("--pool", choices=["process", "thread"], default="process")
+    ap.add_argument("--concorrencia", type=int, default=4, help="Chamadas simultâneas ao LLM por documento")
+    ap.add_argument("--max-paginas", type=int, default=6)
+    ap.add_argument("--contexto", type=int, default=1)
+    ap.add_argument("--modo", choices=["individual", "agrupado"], default="individual",
+                    help="agrupado: avalia critérios com páginas em comum em um único prompt")
+    ap.add_argument("--formato", choices=["json", "parquet", "ambos"], default="json",
+                    help="json: outputs/<doc_id>/resultados.json; parquet: outputs/resultados_parquet/")
+    ap.add_argument("--flush-docs", type=int, default=50, help="Documentos por gravação no dataset Parquet")
+    ap.add_argument("--sem-reutilizar", action="store_true",
+                    help="Não reaproveita resultados do results_db: todos os critérios vão ao LLM")
+    args = ap.parse_args()
+
+    out_dir = Path(args.outputs)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    pesos = json.loads(Path(args.pesos).read_text(encoding="utf-8")) if args.pesos else None
+
+    use_json = args.formato in ("json", "ambos")
+    dataset = ResultsDataset(out_dir / DATASET_DIRNAME, args.flush_docs) if args.formato != "json" else None
+    in_dataset = dataset.doc_ids() if dataset is not None else set()
+
+    def is_done(doc_id: str) -> bool:
+        if use_json and not result_path(out_dir, doc_id).exists():
+            return False
+        return dataset is None or doc_id in in_dataset
+
+    def save(cons: dict) -> None:
+        if use_json:
+            save_document(out_dir, cons)
+        if dataset is not None:
+            flushed = dataset.append(cons)
+            if flushed and not use_json:
+                append_summary(out_dir, [summary_row(c) for c in flushed])
+
+    pdfs = find_pdfs(Path(args.input_dir))
+    todo, done, ids = [], [], set()
+    for pdf in pdfs:
+        doc_id = pdf.stem
+        if doc_id in ids:
+            print(f"[WARN] doc_id repetido, ignorando {pdf}")
+            continue
+        ids.add(doc_id)
+        (done if is_done(doc_id) else todo).append((pdf, doc_id))
+    if use_json:
+        reconcile_summary(out_dir, [d for _, d in done])
+    print(f"{len(pdfs)} PDFs | {len(done)} já concluídos | {len(todo)} a processar")
+
+    if args.pool == "process":
+        pool = ProcessPoolExecutor(max_workers=args.workers, initializer=_worker_init)
+    else:
+        pool = ThreadPoolExecutor(max_workers=args.workers)
+    ok = failed = 0
+    with pool:
+        futures = {
+            pool.submit(process_document, str(pdf.resolve()), doc_id, pesos,
+                        args.max_paginas, args.contexto, args.concorrencia, args.modo,
+                        reutilizar=not args.sem_reutilizar): doc_id
+            for pdf, doc_id in todo
+        }
+        for fut in as_completed(futures):
+            doc_id = futures[fut]
+            try:
+                save(fut.result())
+                ok += 1
+                print(f"[{ok + failed}/{len(todo)}] {doc_id} ok")
+            except Exception as e:
+                failed += 1
+                print(f"[WARN] falha em {doc_id}: {e}")
+    if dataset is not None:
+        flushed = dataset.flush()
+        if flushed and not use_json:
+            append_summary(out_dir, [summary_row(c) for c in flushed])
+    print(f"Concluído: {ok} ok, {failed} com falha. Saídas em {out_dir.resolve()}")
+
+if __name__ == "__main__":
+    main()
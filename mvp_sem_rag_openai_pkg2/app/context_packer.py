@@ -0,0 +1,111 @@
+import os
+from typing import Dict, List, Mapping, NamedTuple, Optional, Tuple
+
+from .llm_async import estimate_tokens
+
+# Empacota o conteúdo enviado ao LLM dentro de um orçamento de tokens:
+# recorta trechos em volta das ocorrências das palavras-chave, prioriza os de maior
+# escore e mantém os marcadores de página para que Evidence.pagina continue correto.
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "0"))  # 0 = usa MODEL_TOKEN_BUDGETS
+DEFAULT_TOKEN_BUDGET = 6000
+MODEL_TOKEN_BUDGETS = {
+    "gpt-4o-mini": 12000,
+    "gpt-4o": 12000,
+    "gemini-pro": 6000,
+    "gemini-1.5-flash": 12000,
+    "gemini-2.0-flash": 12000,
+}
+PASSAGE_CHARS = int(os.getenv("CONTEXT_PASSAGE_CHARS", "800"))
+SEPARADOR = "\n[...]\n"
+
+class Passage(NamedTuple):
+    pagina: int
+    inicio: int
+    fim: int
+    score: float
+
+def budget_for(model: str) -> int:
+    if CONTEXT_TOKEN_BUDGET > 0:
+        return CONTEXT_TOKEN_BUDGET
+    return MODEL_TOKEN_BUDGETS.get(model, DEFAULT_TOKEN_BUDGET)
+
+def format_pages(texts: Mapping[int, str], paginas: List[int]) -> str:
+    parts = []
+    for p in paginas:
+        content = texts.get(p, "")
+        parts.append(f"--- INICIO_PAGINA {p} ---\n{content}\n--- FIM_PAGINA {p} ---")
+    return "\n\n".join(parts)
+
+def _expand_to_lines(text: str, ini: int, fim: int) -> Tuple[int, int]:
+    a = text.rfind("\n", 0, max(ini, 0))
+    b = text.find("\n", min(fim, len(text)))
+    return (0 if a < 0 else a + 1), (len(text) if b < 0 else b)
+
+def page_passages(pagina: int, text: str, hits: List[int]) -> List[Passage]:
+    # Janelas de PASSAGE_CHARS em volta de cada ocorrência, alinhadas a linhas e fundidas se sobrepostas.
+    half = PASSAGE_CHARS // 2
+    windows: List[List[int]] = []
+    for pos in sorted(hits):
+        ini, fim = _expand_to_lines(text, pos - half, pos + half)
+        if windows and ini <= windows[-1][1]:
+            windows[-1][1] = max(windows[-1][1], fim)
+            windows[-1][2] += 1
+        else:
+            windows.append([ini, fim, 1])
+    return [Passage(pagina, a, b, float(n)) for a, b, n in windows]
+
+def _context_passage(pagina: int, text: str, hit_pages: set) -> Optional[Passage]:
+    # Página de contexto (sem ocorrências): pega a borda vizinha da página com ocorrências.
+    if not text:
+        return None
+    if pagina + 1 in hit_pages:
+        ini, fim = _expand_to_lines(text, len(text) - PASSAGE_CHARS, len(text))
+    elif pagina - 1 in hit_pages:
+        ini, fim = _expand_to_lines(text, 0, PASSAGE_CHARS)
+    else:
+        return None
+    return Passage(pagina, ini, fim, 0.5)
+
+def pack_context(texts: Mapping[int, str], paginas: List[int], ranking: List[Tuple[int, int]],
+                 hits: Dict[int, List[int]], budget_tokens: int) -> str:
+    # texts pode ser um PageStore (decodifica a cada acesso): cada página é lida uma vez aqui.
+    texts = {p: texts.get(p, "") for p in paginas}
+    full = format_pages(texts, paginas)
+    if estimate_tokens(full) <= budget_tokens:
+        return full
+    allowed = set(paginas)
+    ranked_pages = [p for p, _ in ranking if p in allowed]
+    hit_pages = set(ranked_pages)
+    best: List[Passage] = []
+    rest: List[Passage] = []
+    for p in ranked_pages:
+        ps = sorted(page_passages(p, texts.get(p, ""), hits.get(p, [])), key=lambda x: (-x.score, x.inicio))
+        if ps:
+            best.append(ps[0])
+            rest.extend(ps[1:])
+    for p in paginas:
+        if p not in hit_pages:
+            cp = _context_passage(p, texts.get(p, ""), hit_pages)
+            if cp is not None:
+                rest.append(cp)
+    rest.sort(key=lambda x: (-x.score, x.pagina, x.inicio))
+
+    # Garante primeiro o melhor trecho de cada página ranqueada (na ordem do ranking).
+    chosen: List[Passage] = []
+    used = 0
+    for ps in (best, rest):
+        for psg in ps:
+            cost = estimate_tokens(texts[psg.pagina][psg.inicio:psg.fim]) + 12  # + marcadores
+            if used + cost > budget_tokens and chosen:
+                continue
+            chosen.append(psg)
+            used += cost
+
+    by_page: Dict[int, List[Passage]] = {}
+    for psg in chosen:
+        by_page.setdefault(psg.pagina, []).append(psg)
+    parts = []
+    for p in sorted(by_page):
+        trechos = [texts[p][x.inicio:x.fim].strip() for x in sorted(by_page[p], key=lambda x: x.inicio)]
+        parts.append(f"--- INICIO_PAGINA {p} ---\n{SEPARADOR.join(trechos)}\n--- FIM_PAGINA {p} ---")
+    return "\n\n".join(parts)
@@ -0,0 +1,15 @@
+from typing import Dict, List
+
+# Palavras-chave padrão usadas na varredura de cada critério (chaves de DEFAULT_WEIGHTS, mais
+# verificacao_ensaio, que só é avaliado quando está nos pesos, como no pesos.json).
+# A busca do pipeline ignora acentos e maiúsculas e casa palavras inteiras ("iso" não casa
+# "inciso", "agua" não casa "aguardar"); um "*" no fim casa prefixos ("recicl*" -> "reciclável").
+DEFAULT_KEYWORDS: Dict[str, List[str]] = {
+    "eficiencia_energetica": ["eficiencia energetica", "ence", "procel", "classe a", "consumo de energia", "kwh", "lm/w"],
+    "normas_tecnicas": ["abnt", "nbr", "iso", "norma tecnica", "normas tecnicas", "inmetro"],
+    "emissoes": ["emissao", "emissoes", "co2", "carbono", "gases de efeito estufa", "poluente*"],
+    "uso_de_agua": ["agua", "hidric*", "vazao", "economia de agua", "reuso", "l/min"],
+    "materiais_reciclabilidade": ["recicl*", "reutiliz*", "biodegrad*", "logistica reversa", "residuo*", "embalage*"],
+    "rotulagem": ["rotulo*", "rotulagem", "selo", "selos", "etiqueta*", "certificacao ambiental", "ecolabel"],
+    "verificacao_ensaio": ["ensaio*", "laudo*", "laboratorio acreditado", "certificado de conformidade", "amostra*", "inspecao"],
+}
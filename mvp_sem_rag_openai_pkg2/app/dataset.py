@@ -0,0 +1,83 @@
+import time, uuid
+from pathlib import Path
+from typing import List, Set
+
+# Dataset colunar (Parquet, particionado por critério) com uma linha por CriterionResult.
+# As linhas ficam em buffer e são gravadas a cada `flush_docs` documentos, para evitar
+# milhares de arquivos pequenos. pyarrow (requirements.txt) só é importado aqui.
+DATASET_DIRNAME = "resultados_parquet"
+
+def _pa():
+    try:
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+    except ImportError:
+        raise ImportError("pyarrow não instalado. Execute: pip install pyarrow")
+    return pa, ds
+
+def schema():
+    pa, _ = _pa()
+    evidencia = pa.struct([("doc", pa.string()), ("pagina", pa.int32()), ("trecho", pa.string())])
+    return pa.schema([
+        ("doc_id", pa.string()),
+        ("criterio", pa.string()),
+        ("presenca", pa.string()),
+        ("risco_greenwashing", pa.string()),
+        ("observacoes", pa.string()),
+        ("evidencias_count", pa.int32()),
+        ("evidencias", pa.list_(evidencia)),
+        ("escore_aderencia", pa.float64()),
+        ("avaliado_em", pa.float64()),
+    ])
+
+class ResultsDataset:
+    def __init__(self, base_dir: Path, flush_docs: int = 50):
+        _pa()  # sem pyarrow, falha já na abertura, não no primeiro flush (depois de gastar LLM)
+        self.base_dir = Path(base_dir)
+        self.flush_docs = flush_docs
+        self._rows: List[dict] = []
+        self._docs: List[dict] = []
+
+    def append(self, cons: dict) -> List[dict]:
+        # Recebe um Consolidated (dict); devolve os documentos gravados se houve flush.
+        now = time.time()
+        for r in cons["resultados"]:
+            evid = r.get("evidencias") or []
+            self._rows.append({
+                "doc_id": cons["doc_id"],
+                "criterio": r["criterio"],
+                "presenca": r["presenca"],
+                "risco_greenwashing": r["risco_greenwashing"],
+                "observacoes": r.get("observacoes") or "",
+                "evidencias_count": len(evid),
+                "evidencias": [{"doc": e["doc"], "pagina": e["pagina"], "trecho": e["trecho"]} for e in evid],
+                "escore_aderencia": cons["escore_aderencia"],
+                "avaliado_em": now,
+            })
+        self._docs.append(cons)
+        if len(self._docs) >= self.flush_docs:
+            return self.flush()
+        return []
+
+    def flush(self) -> List[dict]:
+        if not self._docs:
+            return []
+        pa, ds = _pa()
+        # Ordena por doc_id para que as estatísticas dos row groups sirvam ao filtro por documento.
+        rows = sorted(self._rows, key=lambda r: (r["doc_id"], r["criterio"]))
+        table = pa.Table.from_pylist(rows, schema=schema())
+        ds.write_dataset(
+            table, self.base_dir, format="parquet",
+            partitioning=ds.partitioning(pa.schema([("criterio", pa.string())]), flavor="hive"),
+            basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+            existing_data_behavior="overwrite_or_ignore",
+        )
+        flushed, self._rows, self._docs = self._docs, [], []
+        return flushed
+
+    def doc_ids(self) -> Set[str]:
+        if not self.base_dir.exists():
+            return set()
+        _, ds = _pa()
+        d = ds.dataset(self.base_dir, format="parquet", partitioning="hive")
+        return set(d.to_table(columns=["doc_id"]).column("doc_id").to_pylist())
@@ -0,0 +1,283 @@
+"""
+Fila de jobs de análise (pipeline completo de um edital) em SQLite local.
+POST /jobs enfileira e devolve o id; workers em threads consomem a fila por prioridade
+(maior primeiro, depois ordem de chegada) e gravam cada CriterionResult assim que sai,
+para GET /jobs/{id} (progresso) e GET /jobs/{id}/events (SSE).
+Dedup: mesmo PDF (SHA-256) com os mesmos parâmetros devolve o job existente
+(na fila, executando ou concluído), sem gastar LLM de novo; forcar=True ignora os concluídos.
+Lease: quem pega um job grava seu id de worker e renova o heartbeat enquanto executa; só
+jobs com heartbeat vencido (processo morto) voltam para a fila, então vários processos
+(workers do uvicorn, CLI) podem consumir o mesmo banco.
+Também roda fora da API:
+  python -m app.jobs --workers 2
+"""
+
+import argparse, hashlib, json, os, socket, sqlite3, threading, time, uuid
+from typing import List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", ".jobs.sqlite3")
+JOBS_WORKERS = int(os.getenv("JOBS_WORKERS", "2"))  # 0 = só enfileira (workers em outro processo)
+JOBS_POLL_INTERVAL = float(os.getenv("JOBS_POLL_INTERVAL", "0.5"))
+JOBS_LEASE_SECONDS = float(os.getenv("JOBS_LEASE_SECONDS", "60"))  # heartbeat renovado a cada 1/3 disso
+JOBS_RETRY_MAX = float(os.getenv("JOBS_RETRY_MAX", "30"))  # espera máxima após erro do banco (s)
+
+NA_FILA, EXECUTANDO, CONCLUIDO, FALHOU = "na_fila", "executando", "concluido", "falhou"
+
+def dedup_key(doc_sha: str, params: dict) -> str:
+    raw = json.dumps([doc_sha, params], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+class JobQueue:
+    def __init__(self, path: str = JOBS_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY, dedup_key TEXT NOT NULL, status TEXT NOT NULL, prioridade INTEGER NOT NULL,"
+            " params TEXT NOT NULL, criterios TEXT NOT NULL, resultado TEXT, erro TEXT,"
+            " criado REAL NOT NULL, iniciado REAL, concluido REAL)"
+        )
+        colunas = {r[1] for r in self._conn.execute("PRAGMA table_info(jobs)")}
+        for nome, tipo in (("worker", "TEXT"), ("heartbeat", "REAL")):  # bancos criados antes do lease
+            if nome not in colunas:
+                self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {nome} {tipo}")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_fila ON jobs(status, prioridade DESC, criado)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_dedup ON jobs(dedup_key)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS job_results ("
+            " seq INTEGER PRIMARY KEY AUTOINCREMENT, job_id TEXT NOT NULL, criterio TEXT NOT NULL,"
+            " resultado TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_job_results_job ON job_results(job_id, seq)")
+
+    def submit(self, params: dict, key: str, criterios: List[str], prioridade: int = 0,
+               force: bool = False) -> Tuple[str, bool]:
+        # Devolve (job_id, duplicado). Jobs que falharam podem ser resubmetidos; com force, os
+        # concluídos também (só um job na fila ou executando é reaproveitado).
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT id, status, prioridade FROM jobs WHERE dedup_key = ? AND status NOT IN (?, ?)"
+                    " ORDER BY criado DESC LIMIT 1", (key, FALHOU, CONCLUIDO if force else FALHOU)).fetchone()
+                if row is not None:
+                    if row[1] == NA_FILA and prioridade > row[2]:
+                        self._conn.execute("UPDATE jobs SET prioridade = ? WHERE id = ?", (prioridade, row[0]))
+                    self._conn.execute("COMMIT")
+                    return row[0], True
+                job_id = uuid.uuid4().hex
+                self._conn.execute(
+                    "INSERT INTO jobs (id, dedup_key, status, prioridade, params, criterios, criado)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (job_id, key, NA_FILA, prioridade, json.dumps(params, ensure_ascii=False),
+                     json.dumps(criterios, ensure_ascii=False), time.time()))
+                self._conn.execute("COMMIT")
+                return job_id, False
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def claim(self, worker: str, lease: float = JOBS_LEASE_SECONDS) -> Optional[dict]:
+        # Retira o próximo job da fila (transação IMMEDIATE: seguro entre processos). Antes,
+        # devolve à fila os jobs cujo lease venceu.
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                self._requeue_expired(now - lease)
+                row = self._conn.execute(
+                    "SELECT id, params FROM jobs WHERE status = ? ORDER BY prioridade DESC, criado LIMIT 1",
+                    (NA_FILA,)).fetchone()
+                if row is not None:
+                    self._conn.execute("UPDATE jobs SET status = ?, iniciado = ?, worker = ?, heartbeat = ? WHERE id = ?",
+                                       (EXECUTANDO, now, worker, now, row[0]))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return None if row is None else {"id": row[0], "params": json.loads(row[1]), "worker": worker}
+
+    def heartbeat(self, worker: str) -> int:
+        # Renova o lease de todos os jobs em execução deste worker.
+        with self._lock:
+            return self._conn.execute("UPDATE jobs SET heartbeat = ? WHERE worker = ? AND status = ?",
+                                      (time.time(), worker, EXECUTANDO)).rowcount
+
+    # add_result/finish/fail só valem enquanto o worker detém o lease: se o job voltou para a
+    # fila (heartbeat vencido) e outro worker o pegou, a escrita do antigo é descartada.
+    def add_result(self, job_id: str, resultado: dict, worker: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO job_results (job_id, criterio, resultado) SELECT ?, ?, ?"
+                " WHERE EXISTS (SELECT 1 FROM jobs WHERE id = ? AND worker = ? AND status = ?)",
+                (job_id, resultado["criterio"], json.dumps(resultado, ensure_ascii=False), job_id, worker, EXECUTANDO))
+
+    def finish(self, job_id: str, resultado: dict, worker: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, resultado = ?, concluido = ? WHERE id = ? AND worker = ? AND status = ?",
+                (CONCLUIDO, json.dumps(resultado, ensure_ascii=False), time.time(), job_id, worker, EXECUTANDO))
+
+    def fail(self, job_id: str, erro: str, worker: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, erro = ?, concluido = ? WHERE id = ? AND worker = ? AND status = ?",
+                (FALHOU, erro, time.time(), job_id, worker, EXECUTANDO))
+
+    def requeue_expired(self, lease: float = JOBS_LEASE_SECONDS) -> int:
+        # Jobs cujo worker parou de renovar o lease (processo morto) voltam para a fila.
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                n = self._requeue_expired(time.time() - lease)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return n
+
+    def _requeue_expired(self, limite: float) -> int:
+        # Dentro de uma transação; heartbeat NULL = job de um banco anterior ao lease.
+        ids = [r[0] for r in self._conn.execute(
+            "SELECT id FROM jobs WHERE status = ? AND (heartbeat IS NULL OR heartbeat < ?)", (EXECUTANDO, limite))]
+        for job_id in ids:
+            # O progresso parcial é descartado.
+            self._conn.execute("DELETE FROM job_results WHERE job_id = ?", (job_id,))
+            self._conn.execute("UPDATE jobs SET status = ?, iniciado = NULL, worker = NULL, heartbeat = NULL"
+                               " WHERE id = ?", (NA_FILA, job_id))
+        return len(ids)
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, status, prioridade, params, criterios, resultado, erro FROM jobs WHERE id = ?",
+                (job_id,)).fetchone()
+            if row is None:
+                return None
+            feitos = self._conn.execute(
+                "SELECT resultado FROM job_results WHERE job_id = ? ORDER BY seq", (job_id,)).fetchall()
+        return {
+            "job_id": row[0], "status": row[1], "prioridade": row[2],
+            "params": json.loads(row[3]), "criterios": json.loads(row[4]),
+            "resultados": [json.loads(r[0]) for r in feitos],
+            "resultado": json.loads(row[5]) if row[5] else None, "erro": row[6],
+        }
+
+    def results_since(self, job_id: str, seq: int) -> List[Tuple[int, dict]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, resultado FROM job_results WHERE job_id = ? AND seq > ? ORDER BY seq",
+                (job_id, seq)).fetchall()
+        return [(s, json.loads(r)) for s, r in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+_queue: Optional[JobQueue] = None
+_queue_lock = threading.Lock()
+
+def get_queue() -> JobQueue:
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue()
+        return _queue
+
+def run_job(queue: JobQueue, job: dict) -> None:
+    from .batch import process_document
+    p, worker = job["params"], job["worker"]
+    try:
+        cons = process_document(
+            p["doc_path"], p.get("doc_id") or "", p.get("pesos") or None, p["max_paginas"], p["contexto"],
+            p["max_concorrencia"], p["modo"], p.get("criterios") or None, p.get("max_tokens_contexto"),
+            on_result=lambda r: queue.add_result(job["id"], r.to_dict(), worker), reutilizar=p.get("reutilizar", True),
+        )
+        queue.finish(job["id"], cons, worker)
+    except Exception as e:
+        queue.fail(job["id"], f"{type(e).__name__}: {e}", worker)
+
+class JobWorkers:
+    # Threads que consomem a fila; cada job roda seu próprio event loop (asyncio.run).
+    # Uma thread a mais renova o heartbeat dos jobs deste processo (id de worker único).
+    def __init__(self, queue: JobQueue, n: int = JOBS_WORKERS, lease: float = JOBS_LEASE_SECONDS):
+        self.queue = queue
+        self.n = n
+        self.lease = lease
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self) -> None:
+        for i in range(self.n):
+            t = threading.Thread(target=self._loop, name=f"job-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        t = threading.Thread(target=self._heartbeat_loop, name="job-heartbeat", daemon=True)
+        t.start()
+        self._threads.append(t)
+
+    def notify(self) -> None:
+        self._wake.set()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        self._wake.set()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+
+    def _heartbeat_loop(self) -> None:
+        while not self._stop.wait(self.lease / 3):
+            try:
+                self.queue.heartbeat(self.worker_id)
+            except sqlite3.Error:
+                pass  # banco ocupado: tenta de novo no próximo ciclo, antes de o lease vencer
+
+    def _loop(self) -> None:
+        espera = JOBS_POLL_INTERVAL
+        falha: Optional[Tuple[str, str]] = None  # job pego cuja falha não foi gravada
+        while not self._stop.is_set():
+            job = None
+            try:
+                if falha is not None:
+                    self.queue.fail(falha[0], falha[1], self.worker_id)
+                    falha = None
+                job = self.queue.claim(self.worker_id, self.lease)
+                if job is None:
+                    self._wake.wait(JOBS_POLL_INTERVAL)
+                    self._wake.clear()
+                else:
+                    run_job(self.queue, job)
+                espera = JOBS_POLL_INTERVAL
+            except Exception as e:
+                # Banco ocupado/indisponível não derruba a thread. Um job já pego é marcado como
+                # falho na próxima volta; senão o heartbeat o manteria executando para sempre.
+                if job is not None:
+                    falha = (job["id"], f"{type(e).__name__}: {e}")
+                print(f"[WARN] worker {threading.current_thread().name}: {type(e).__name__}: {e};"
+                      f" nova tentativa em {espera:.1f}s")
+                self._stop.wait(espera)
+                espera = min(espera * 2, JOBS_RETRY_MAX)
+
+def main():
+    load_dotenv()
+    ap = argparse.ArgumentParser(description="Executa os workers da fila de jobs (sem a API).")
+    ap.add_argument("--workers", type=int, default=max(1, JOBS_WORKERS))
+    args = ap.parse_args()
+    workers = JobWorkers(get_queue(), args.workers)
+    workers.start()
+    print(f"{args.workers} worker(s) consumindo {JOBS_DB_PATH}. Ctrl+C para sair.")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        workers.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+import os, re, threading, unicodedata
+from collections import Counter, OrderedDict
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+from . import page_cache
+from .page_store import PageStore
+
+# Índice invertido por documento: token normalizado -> página -> ocorrências.
+# Construído uma vez após a extração e reaproveitado por todos os critérios.
+MAX_INDEXES = int(os.getenv("KEYWORD_INDEX_CACHE", "32"))
+TOKEN_RE = re.compile(r"\w+")
+
+def _build_fold() -> Dict[int, str]:
+    table = {}
+    for cp in range(0xC0, 0x250):
+        c = chr(cp)
+        base = "".join(ch for ch in unicodedata.normalize("NFKD", c) if not unicodedata.combining(ch))
+        if len(base) == 1 and base != c:
+            table[cp] = base
+    return table
+
+_FOLD = _build_fold()
+
+def normalize(text: str) -> str:
+    # Minúsculas + remoção de acentos mantendo o comprimento ("Eficiência" -> "eficiencia")
+    return (text or "").lower().translate(_FOLD)
+
+class KeywordIndex:
+    def __init__(self, texts: Mapping[int, str]):
+        self.n_pages = len(texts)
+        self.postings: Dict[str, Dict[int, int]] = {}
+        # Texto normalizado em um PageStore (buffer único), não uma segunda cópia str por página.
+        self.norm = PageStore.from_texts(self._normalized(texts))
+        self._memo: Dict[str, Dict[int, int]] = {}
+        self._memo_palavras: Dict[str, Dict[int, int]] = {}
+        self._lock = threading.Lock()
+
+    def _normalized(self, texts: Mapping[int, str]):
+        # Gera (página, texto normalizado) em ordem e preenche os postings no caminho.
+        for p in sorted(texts):
+            nt = normalize(texts[p])
+            for tok, c in Counter(TOKEN_RE.findall(nt)).items():
+                self.postings.setdefault(tok, {})[p] = c
+            yield p, nt
+
+    def _substring_counts(self, k: str) -> Dict[int, int]:
+        # Equivale a str.count(k) no texto: uma palavra-chave sem separadores
+        # só pode ocorrer dentro de um token.
+        out: Dict[int, int] = {}
+        for tok, pages in self.postings.items():
+            if k in tok:
+                n = tok.count(k)
+                for p, c in pages.items():
+                    out[p] = out.get(p, 0) + n * c
+        return out
+
+    def count(self, keyword: str, textos: Optional[Dict[int, str]] = None) -> Dict[int, int]:
+        # textos: páginas normalizadas já decodificadas nesta chamada (rank), para frases que
+        # caem nas mesmas páginas não decodificarem o PageStore de novo.
+        # Sem strip: espaços nas bordas (" iso ") contam no texto, como no /scan original.
+        k = normalize(keyword)
+        if not k:
+            return {}
+        with self._lock:
+            hit = self._memo.get(k)
+        if hit is not None:
+            return hit
+        if TOKEN_RE.fullmatch(k):
+            out = self._substring_counts(k)
+        else:
+            # Frases: restringe às páginas que contêm o maior token e conta no texto normalizado
+            toks = TOKEN_RE.findall(k)
+            candidates = self._substring_counts(max(toks, key=len)) if toks else self.norm
+            out = {}
+            for p in candidates:
+                if textos is None:
+                    text = self.norm[p]
+                else:
+                    text = textos.get(p)
+                    if text is None:
+                        text = textos[p] = self.norm[p]
+                n = text.count(k)
+                if n:
+                    out[p] = n
+        with self._lock:
+            self._memo[k] = out
+        return out
+
+    def count_words(self, keyword: str, textos: Optional[Dict[int, str]] = None) -> Dict[int, int]:
+        # Como count, mas casando palavras inteiras ("iso" não casa "inciso"); um "*" no fim
+        # casa prefixos ("recicl*" encontra "reciclável", "reciclagem").
+        k = normalize(keyword).strip()
+        toks = TOKEN_RE.findall(k)
+        if not toks:
+            return {}
+        with self._lock:
+            hit = self._memo_palavras.get(k)
+        if hit is not None:
+            return hit
+        prefixo = k.endswith("*")
+        corpo = k.rstrip("*")
+        if TOKEN_RE.fullmatch(corpo):
+            if not prefixo:
+                out = dict(self.postings.get(corpo, {}))
+            else:
+                out = {}
+                for tok, pages in self.postings.items():
+                    if tok.startswith(corpo):
+                        for p, c in pages.items():
+                            out[p] = out.get(p, 0) + c
+        else:
+            # Frases: só páginas que contêm o maior token inteiro da frase (o último,
+            # com "*", pode ser só um prefixo); contadas no texto normalizado.
+            inteiros = toks[:-1] if prefixo and corpo.endswith(toks[-1]) else toks
+            candidates = self.postings.get(max(inteiros, key=len), {}) if inteiros else self._substring_counts(toks[0])
+            pat = _word_pattern(k)
+            out = {}
+            for p in candidates:
+                if textos is None:
+                    text = self.norm[p]
+                else:
+                    text = textos.get(p)
+                    if text is None:
+                        text = textos[p] = self.norm[p]
+                n = len(pat.findall(text))
+                if n:
+                    out[p] = n
+        with self._lock:
+            self._memo_palavras[k] = out
+        return out
+
+    def rank(self, keywords: Iterable[str], palavra_inteira: bool = False) -> List[Tuple[int, int]]:
+        count = self.count_words if palavra_inteira else self.count
+        scores: Dict[int, int] = {}
+        textos: Dict[int, str] = {}
+        for kw in keywords:
+            for p, c in count(kw, textos).items():
+                scores[p] = scores.get(p, 0) + c
+        return sorted(scores.items(), key=lambda x: (-x[1], x[0]))
+
+    def hits(self, paginas: Iterable[int], keywords: Iterable[str],
+             palavra_inteira: bool = False) -> Dict[int, List[int]]:
+        # Posições (no texto normalizado, de mesmo comprimento do original) de cada ocorrência.
+        if palavra_inteira:
+            pats = [_word_pattern(k) for k in (normalize(kw).strip() for kw in keywords) if TOKEN_RE.search(k)]
+            out: Dict[int, List[int]] = {}
+            for p in paginas:
+                text = self.norm.get(p, "")
+                out[p] = sorted(m.start() for pat in pats for m in pat.finditer(text))
+            return out
+        keys = [k for k in (normalize(kw) for kw in keywords) if k]
+        out = {}
+        for p in paginas:
+            text = self.norm.get(p, "")
+            pos = []
+            for k in keys:
+                i = text.find(k)
+                while i >= 0:
+                    pos.append(i)
+                    i = text.find(k, i + len(k))
+            out[p] = sorted(pos)
+        return out
+
+    def scan(self, keywords: Iterable[str], max_paginas: int = 6, contexto: int = 1,
+             palavra_inteira: bool = False) -> List[int]:
+        # Mesma semântica do /scan original: top max_paginas por escore + vizinhas (contexto)
+        pages = [p for p, _ in self.rank(keywords, palavra_inteira)][:max_paginas]
+        with_context = set()
+        for p in pages:
+            for d in range(-contexto, contexto + 1):
+                if 1 <= p + d <= self.n_pages:
+                    with_context.add(p + d)
+        return sorted(with_context) if with_context else pages
+
+def _word_pattern(k: str) -> "re.Pattern[str]":
+    # k normalizado; bordas de palavra nos dois lados, exceto depois de um "*" final.
+    corpo = k.rstrip("*")
+    fim = "" if k.endswith("*") else r"(?!\w)"
+    return re.compile(r"(?<!\w)" + re.escape(corpo) + fim)
+
+_indexes: "OrderedDict[str, KeywordIndex]" = OrderedDict()
+_lock = threading.Lock()
+
+def get_index(path: str) -> KeywordIndex:
+    sha = page_cache.doc_hash(path)
+    with _lock:
+        idx = _indexes.get(sha)
+        if idx is not None:
+            _indexes.move_to_end(sha)
+            return idx
+    idx = KeywordIndex(page_cache.get_page_texts(path))
+    with _lock:
+        _indexes[sha] = idx
+        while len(_indexes) > MAX_INDEXES:
+            _indexes.popitem(last=False)
+    return idx
+
+def warm(path: str) -> None:
+    try:
+        get_index(path)
+    except Exception as e:
+        print(f"[WARN] falha ao indexar {path}: {e}")
@@ -0,0 +1,198 @@
+import asyncio, json, os, random, time
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Optional
+
+from .llm_client import estimate_tokens, extract_json_text, load_google, mock_delay, mock_response, record_usage
+from .llm_cache import cache_key, get_cache, is_valid
+from .metrics import LLM_RETRIES, timed
+
+# Cliente assíncrono: conexão HTTP reaproveitada, limite de requisições/tokens por minuto
+# (token bucket) e retentativas com backoff exponencial + jitter em 429/5xx/timeout.
+LLM_RPM = float(os.getenv("LLM_RPM", "0"))  # 0 = sem limite
+LLM_TPM = float(os.getenv("LLM_TPM", "0"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "20"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "32"))
+
+RETRY_STATUS = {408, 409, 429, 500, 502, 503, 504}
+DEFAULT_SYSTEM = "Responda apenas com JSON válido, sem comentários."
+
+class TokenBucket:
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.tokens = per_minute
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, amount: float = 1.0) -> None:
+        if self.rate <= 0:
+            return
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+class RateLimiter:
+    def __init__(self, rpm: float = LLM_RPM, tpm: float = LLM_TPM):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+
+    async def acquire(self, tokens: int) -> None:
+        await self.requests.acquire(1)
+        await self.tokens.acquire(tokens)
+
+def _status_of(exc: Exception) -> Optional[int]:
+    for attr in ("status_code", "code"):
+        v = getattr(exc, attr, None)
+        if isinstance(v, int):
+            return v
+    resp = getattr(exc, "response", None)
+    v = getattr(resp, "status_code", None)
+    return v if isinstance(v, int) else None
+
+def _retry_after(exc: Exception) -> Optional[float]:
+    # Espera pedida pelo provedor (retry-after-ms ou Retry-After em segundos/data HTTP), em segundos.
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        ms = headers.get("retry-after-ms")
+        if ms is not None:
+            return max(0.0, float(ms) / 1000)
+        v = headers.get("retry-after")
+        if v is None:
+            return None
+        try:
+            return max(0.0, float(v))
+        except ValueError:
+            return max(0.0, parsedate_to_datetime(v).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class AsyncLLMClient:
+    # Os objetos internos (httpx, locks) ficam presos ao event loop em que foram usados:
+    # crie um cliente por loop.
+    def __init__(self, limiter: Optional[RateLimiter] = None):
+        self.provider = os.getenv("LLM_PROVIDER", "OPENAI").upper()
+        self.model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+        self.timeout = LLM_TIMEOUT
+        self.max_retries = LLM_MAX_RETRIES
+        self.limiter = limiter or RateLimiter()
+        self._client = None
+        self.cache = get_cache()
+        self._http = None
+        self._models: Dict[str, object] = {}
+        self._transient: tuple = (asyncio.TimeoutError, ConnectionError)
+        if self.provider == "GOOGLE":
+            self.model = os.getenv("GOOGLE_MODEL", "gemini-pro")
+        elif self.provider != "OPENAI":
+            self.model = "mock"
+
+    def _ensure_client(self) -> None:
+        # SDKs e conexão criados na primeira chamada, já dentro do event loop que vai usá-los.
+        if self._client is not None or self.provider not in ("OPENAI", "GOOGLE"):
+            return
+        if self.provider == "OPENAI":
+            import httpx
+            import openai
+            self._http = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=LLM_MAX_CONNECTIONS, max_keepalive_connections=LLM_MAX_CONNECTIONS),
+            )
+            self._client = openai.AsyncOpenAI(max_retries=0, http_client=self._http)
+            self._transient += (openai.APIConnectionError, openai.APITimeoutError)
+        else:
+            self._client = load_google()
+
+    def model_name(self) -> str:
+        return self.model
+
+    def _google_model(self, name: str):
+        model = self._models.get(name)
+        if model is None:
+            model = self._models[name] = self._client.GenerativeModel(name)
+        return model
+
+    async def _call(self, prompt: str, system: str, temperature: float, max_tokens: int) -> str:
+        self._ensure_client()
+        if self.provider == "OPENAI":
+            resp = await self._client.chat.completions.create(
+                model=self.model,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                response_format={"type": "json_object"},
+                messages=[
+                    {"role": "system", "content": system or DEFAULT_SYSTEM},
+                    {"role": "user", "content": prompt},
+                ],
+            )
+            out = resp.choices[0].message.content
+            record_usage(getattr(resp, "usage", None), "prompt_tokens", "completion_tokens", system, prompt, out)
+            return out
+        if self.provider == "GOOGLE":
+            full_prompt = f"{system or DEFAULT_SYSTEM}\nUsuário: {prompt}"
+            response = await self._google_model(self.model).generate_content_async(full_prompt, generation_config={
+                "temperature": temperature,
+                "max_output_tokens": max_tokens,
+            })
+            record_usage(getattr(response, "usage_metadata", None), "prompt_token_count",
+                         "candidates_token_count", system, prompt, response.text)
+            return extract_json_text(response.text)
+        # MOCK (fallback)
+        delay = mock_delay()
+        if delay:
+            await asyncio.sleep(delay)
+        out = mock_response(prompt)
+        record_usage(None, "", "", system, prompt, out)
+        return out
+
+    def _retryable(self, exc: Exception) -> bool:
+        return isinstance(exc, self._transient) or _status_of(exc) in RETRY_STATUS
+
+    async def complete_json(self, prompt: str, system: str = "", temperature: float = 0.0, max_tokens: int = 800,
+                            check: Callable[[str], object] = json.loads) -> str:
+        # check: validação da resposta (ex.: parse_result); só o que passa vai para o cache.
+        # O cache é SQLite (leitura grava o acesso): fora do event loop.
+        if self.cache is None:
+            return await self._complete_json(prompt, system, temperature, max_tokens)
+        key = cache_key(self.provider, self.model, temperature, max_tokens, system, prompt)
+        out = await asyncio.to_thread(self.cache.get, key)
+        if out is None or not is_valid(out, check):
+            out = await self._complete_json(prompt, system, temperature, max_tokens)
+            if is_valid(out, check):
+                await asyncio.to_thread(self.cache.put, key, out)
+        return out
+
+    async def _complete_json(self, prompt: str, system: str, temperature: float, max_tokens: int) -> str:
+        tokens = estimate_tokens(system) + estimate_tokens(prompt) + max_tokens
+        attempt = 0
+        while True:
+            # Cada tentativa (inclusive retentativas após 429) passa pelos limites de RPM/TPM.
+            await self.limiter.acquire(tokens)
+            try:
+                with timed("llm_call"):
+                    return await asyncio.wait_for(self._call(prompt, system, temperature, max_tokens), self.timeout)
+            except Exception as e:
+                if attempt >= self.max_retries or not self._retryable(e):
+                    raise
+                LLM_RETRIES.inc()
+                pedido = _retry_after(e)
+                if pedido is not None:
+                    await asyncio.sleep(pedido)
+                else:
+                    delay = min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * 2 ** attempt)
+                    await asyncio.sleep(random.uniform(0, delay))  # full jitter
+                attempt += 1
+
+    async def aclose(self) -> None:
+        if self._http is not None:
+            await self._http.aclose()
@@ -1,28 +1,72 @@
-import os, json
-try:
-    import google.generativeai as genai
-except ImportError:
-    genai = None
+import os, json, random, re, threading, time
+from typing import Callable
+
+from .llm_cache import cache_key, get_cache, is_valid
+from .metrics import record_tokens, timed
+
+# Latência simulada do provedor MOCK (benchmarks): MOCK_LATENCY_MS ± MOCK_JITTER_MS por chamada.
+MOCK_LATENCY_MS = float(os.getenv("MOCK_LATENCY_MS", "0"))
+MOCK_JITTER_MS = float(os.getenv("MOCK_JITTER_MS", "0"))
+
+def load_google():
+    # Import tardio: o SDK do Gemini é pesado e só é necessário com LLM_PROVIDER=GOOGLE.
+    try:
+        import google.generativeai as genai
+    except ImportError:
+        raise ImportError("google-generativeai não instalado. Execute: pip install google-generativeai")
+    api_key = os.getenv("GOOGLE_API_KEY")
+    if not api_key:
+        raise ValueError("Defina a variável de ambiente GOOGLE_API_KEY com sua chave da API Gemini.")
+    genai.configure(api_key=api_key)
+    return genai
 
 class LLMClient:
+    # O SDK do provedor só é importado/instanciado na primeira chamada (ver ensure_client).
     def __init__(self):
         self.provider = os.getenv("LLM_PROVIDER", "OPENAI").upper()
         self.model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
         self._client = None
+        self._client_lock = threading.Lock()
+        self.cache = get_cache()
+
+    def ensure_client(self):
+        if self._client is None and self.provider in ("OPENAI", "GOOGLE"):
+            with self._client_lock:
+                if self._client is None:
+                    if self.provider == "OPENAI":
+                        from openai import OpenAI
+                        self._client = OpenAI()
+                    else:
+                        self._client = load_google()
+        return self._client
+
+    def model_name(self) -> str:
         if self.provider == "OPENAI":
-            from openai import OpenAI
-            self._client = OpenAI()
-        elif self.provider == "GOOGLE":
-            if genai is None:
-                raise ImportError("google-generativeai não instalado. Execute: pip install google-generativeai")
-            api_key = os.getenv("GOOGLE_API_KEY")
-            if not api_key:
-                raise ValueError("Defina a variável de ambiente GOOGLE_API_KEY com sua chave da API Gemini.")
-            genai.configure(api_key=api_key)
-            self._client = genai
-
-    def complete_json(self, prompt: str, system: str = "", temperature: float = 0.0, max_tokens: int = 800) -> str:
+            return self.model
+        if self.provider == "GOOGLE":
+            return os.getenv("GOOGLE_MODEL", "gemini-pro")
+        return "mock"
+
+    def complete_json(self, prompt: str, system: str = "", temperature: float = 0.0, max_tokens: int = 800,
+                      check: Callable[[str], object] = json.loads) -> str:
+        # check: validação da resposta (ex.: parse_result); só o que passa vai para o cache.
+        if self.cache is None:
+            return self._complete_json(prompt, system, temperature, max_tokens)
+        key = cache_key(self.provider, self.model_name(), temperature, max_tokens, system, prompt)
+        out = self.cache.get(key)
+        if out is None or not is_valid(out, check):
+            out = self._complete_json(prompt, system, temperature, max_tokens)
+            if is_valid(out, check):
+                self.cache.put(key, out)
+        return out
+
+    def _complete_json(self, prompt: str, system: str, temperature: float, max_tokens: int) -> str:
+        with timed("llm_call"):
+            return self._call(prompt, system, temperature, max_tokens)
+
+    def _call(self, prompt: str, system: str, temperature: float, max_tokens: int) -> str:
         # Retorna JSON (texto) usando Chat Completions com response_format=json_object.
+        self.ensure_client()
         if self.provider == "OPENAI":
             resp = self._client.chat.completions.create(
                 model=self.model,
@@ -34,7 +78,9 @@ class LLMClient:
                     {"role":"user","content": prompt}
                 ],
             )
-            return resp.choices[0].message.content
+            out = resp.choices[0].message.content
+            record_usage(getattr(resp, "usage", None), "prompt_tokens", "completion_tokens", system, prompt, out)
+            return out
         elif self.provider == "GOOGLE":
             model_name = os.getenv("GOOGLE_MODEL", "gemini-pro")
             system_message = system or "Responda apenas com JSON válido, sem comentários."
@@ -44,19 +90,53 @@ class LLMClient:
                 "temperature": temperature,
                 "max_output_tokens": max_tokens
             })
-            import re
-            match = re.search(r'\{.*\}', response.text, re.DOTALL)
-            if match:
-                return match.group(0)
-            return response.text
+            record_usage(getattr(response, "usage_metadata", None), "prompt_token_count",
+                         "candidates_token_count", system, prompt, response.text)
+            return extract_json_text(response.text)
         # MOCK (fallback)
-        if '"paginas"' in prompt and '"criterio"' in prompt:
-            return json.dumps({"criterio": "eficiencia_energetica", "paginas": [12, 13]})
-        mock = {
-            "criterio": "eficiencia_energetica",
-            "presenca": "parcial",
-            "risco_greenwashing": "medio",
-            "evidencias": [{"doc": "edital.pdf", "pagina": 12, "trecho": "Exige classe A (ENCE), sem detalhar norma."}],
-            "observacoes": "Falta norma/ensaio; há referência vaga."
-        }
-        return json.dumps(mock, ensure_ascii=False)
+        delay = mock_delay()
+        if delay:
+            time.sleep(delay)
+        out = mock_response(prompt)
+        record_usage(None, "", "", system, prompt, out)
+        return out
+
+def mock_delay() -> float:
+    if MOCK_LATENCY_MS <= 0 and MOCK_JITTER_MS <= 0:
+        return 0.0
+    return max(0.0, MOCK_LATENCY_MS + random.uniform(-MOCK_JITTER_MS, MOCK_JITTER_MS)) / 1000
+
+def estimate_tokens(text: str) -> int:
+    # Aproximação grosseira (~4 caracteres por token) para o limitador e as métricas.
+    return len(text) // 4 + 1
+
+def record_usage(usage, in_attr: str, out_attr: str, system: str, prompt: str, out: str) -> None:
+    # Usa a contagem do provedor quando disponível; senão, a estimativa por caracteres.
+    tin = getattr(usage, in_attr, None) if usage is not None else None
+    tout = getattr(usage, out_attr, None) if usage is not None else None
+    record_tokens(tin if isinstance(tin, int) else estimate_tokens(system) + estimate_tokens(prompt),
+                  tout if isinstance(tout, int) else estimate_tokens(out or ""))
+
+def extract_json_text(text: str) -> str:
+    # O Gemini às vezes envolve o JSON em texto/markdown; recorta o objeto.
+    match = re.search(r'\{.*\}', text, re.DOTALL)
+    if match:
+        return match.group(0)
+    return text
+
+def mock_response(prompt: str) -> str:
+    if '"paginas"' in prompt and '"criterio"' in prompt:
+        return json.dumps({"criterio": "eficiencia_energetica", "paginas": [12, 13]})
+    multi = re.search(r"- Critérios: (.+)", prompt)
+    if multi and '"resultados"' in prompt:
+        criterios = [c.strip() for c in multi.group(1).split(",") if c.strip()]
+        resultados = [dict(json.loads(mock_response("")), criterio=c) for c in criterios]
+        return json.dumps({"resultados": resultados}, ensure_ascii=False)
+    mock = {
+        "criterio": "eficiencia_energetica",
+        "presenca": "parcial",
+        "risco_greenwashing": "medio",
+        "evidencias": [{"doc": "edital.pdf", "pagina": 12, "trecho": "Exige classe A (ENCE), sem detalhar norma."}],
+        "observacoes": "Falta norma/ensaio; há referência vaga."
+    }
+    return json.dumps(mock, ensure_ascii=False)
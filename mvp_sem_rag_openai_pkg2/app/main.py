@@ -1,83 +1,210 @@
-import os, json
-from fastapi import FastAPI, UploadFile, File
-from fastapi.responses import FileResponse, HTMLResponse
+import asyncio, json, os, time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, UploadFile, File, BackgroundTasks, HTTPException, Request
+from fastapi.responses import HTMLResponse, PlainTextResponse, StreamingResponse
 from dotenv import load_dotenv
 from pathlib import Path
+from typing import List
 
 from .models import (
     ScanRequest, ScanResponse,
     EvaluateRequest, CriterionResult,
-    ValidateRequest, ValidateResponse,
-    ConsolidateRequest, Consolidated, ReportRequest
+    ValidateRequest, ValidateResponse, BatchValidateRequest,
+    ConsolidateRequest, Consolidated, ReportRequest,
+    PipelineRequest, BatchReportRequest,
+    JobRequest, JobSubmitted, JobStatus
 )
-from .utils_pdf import n_pages, extract_text_by_page
-from .validators import validate_results
+from .utils_pdf import n_pages
+from . import page_cache
+from .page_cache import get_pages, get_page_texts
+from .context_packer import budget_for
+from .uploads import store_upload
+from .keyword_index import get_index, warm
+from .validators import validate_results, validate_batch
 from .aggregator import consolidate
-from .report import render_report_html
+from .report import iter_report, iter_batch_report
+from . import metrics
+from .metrics import timed
 from .llm_client import LLMClient
+from .llm_async import AsyncLLMClient
+from .pipeline import SYSTEM_EVALUATE, build_evaluate_prompt, build_packed_prompt, parse_result, analyze_document, default_criterios
+from . import jobs
 
 load_dotenv()
-app = FastAPI(title="MVP Sem RAG — Compras Sustentáveis")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Clientes LLM por ciclo de vida da app (o SDK do provedor só carrega na primeira chamada).
+    UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+    app.state.llm = LLMClient()
+    app.state.allm = AsyncLLMClient()
+    workers = jobs.JobWorkers(jobs.get_queue()) if jobs.JOBS_WORKERS > 0 else None
+    if workers is not None:
+        workers.start()
+    app.state.job_workers = workers
+    yield
+    if workers is not None:
+        workers.stop()
+    await app.state.allm.aclose()
+
+app = FastAPI(title="MVP Sem RAG — Compras Sustentáveis", lifespan=lifespan)
 UPLOAD_DIR = Path(os.getenv("UPLOAD_DIR","uploads"))
-UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
-llm = LLMClient()
+@app.middleware("http")
+async def timing_middleware(request: Request, call_next):
+    t0 = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Rótulo pelo template da rota (ex.: /scan), não pela URL, para não explodir a cardinalidade.
+        route = request.scope.get("route")
+        metrics.REQUEST_SECONDS.observe(
+            time.perf_counter() - t0, method=request.method,
+            endpoint=getattr(route, "path", "desconhecido"), status=str(status),
+        )
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics_endpoint():
+    return PlainTextResponse(metrics.expose(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
 @app.post("/upload")
-async def upload(file: UploadFile = File(...)):
-    dest = UPLOAD_DIR / file.filename
-    with dest.open("wb") as f:
-        f.write(await file.read())
-    return {"doc_path": str(dest.resolve())}
+async def upload(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
+    dest, sha, duplicado = await store_upload(file, UPLOAD_DIR)
+    page_cache.cache.remember(str(dest), sha)
+    # Extrai e indexa em segundo plano para que /scan e /evaluate já encontrem o cache pronto
+    background_tasks.add_task(warm, str(dest))
+    return {"doc_path": str(dest), "sha256": sha, "duplicado": duplicado}
 
 @app.post("/scan", response_model=ScanResponse)
 def scan(req: ScanRequest):
-    texts = extract_text_by_page(req.doc_path)
-    scores = []
-    keys = [k.lower() for k in req.palavras_chave] if req.palavras_chave else []
-    for p, t in texts.items():
-        tl = (t or "").lower()
-        score = sum(tl.count(k) for k in keys) if keys else 0
-        if score > 0:
-            scores.append((p, score))
-    scores.sort(key=lambda x: x[1], reverse=True)
-    pages = [p for p,_ in scores][:req.max_paginas]
-    with_context = set()
-    for p in pages:
-        for d in range(-req.contexto, req.contexto+1):
-            if 1 <= p + d <= len(texts):
-                with_context.add(p+d)
-    ordered = sorted(with_context) if with_context else pages
-    return ScanResponse(criterio=req.criterio, paginas=ordered)
+    idx = get_index(req.doc_path)
+    with timed("scan"):
+        pages = idx.scan(req.palavras_chave, req.max_paginas, req.contexto)
+    return ScanResponse(criterio=req.criterio, paginas=pages)
 
 @app.post("/evaluate", response_model=CriterionResult)
-def evaluate(req: EvaluateRequest):
-    texts = extract_text_by_page(req.doc_path)
+def evaluate(req: EvaluateRequest, request: Request):
+    llm = request.app.state.llm
     doc_name = Path(req.doc_path).name
-    parts = []
-    for p in req.paginas:
-        content = texts.get(p, "")
-        parts.append(f"--- INICIO_PAGINA {p} ---\n{content}\n--- FIM_PAGINA {p} ---")
-    conteudo = "\n\n".join(parts)
-    prompt_tpl = (Path(__file__).parent / "prompts" / "evaluate_prompt.txt").read_text(encoding="utf-8")
-    prompt = prompt_tpl.format(criterio=req.criterio, conteudo_paginas=conteudo, doc_name=doc_name)
-    out = llm.complete_json(prompt, system="Responda apenas com JSON válido compatível com o schema.")
-    data = json.loads(out)
-    return CriterionResult(**data)
+    if req.palavras_chave:
+        idx = get_index(req.doc_path)
+        texts = get_page_texts(req.doc_path)
+        budget = req.max_tokens_contexto or budget_for(llm.model_name())
+        with timed("prompt_build"):
+            prompt = build_packed_prompt(idx, texts, req.criterio, req.palavras_chave, req.paginas, doc_name, budget)
+    else:
+        texts = get_pages(req.doc_path, req.paginas)
+        with timed("prompt_build"):
+            prompt = build_evaluate_prompt(req.criterio, texts, req.paginas, doc_name)
+    out = llm.complete_json(prompt, system=SYSTEM_EVALUATE, check=parse_result)
+    with timed("parse"):
+        return parse_result(out)
 
 @app.post("/validate", response_model=ValidateResponse)
 def validate(req: ValidateRequest):
     return validate_results(req.doc_path, req.n_paginas, req.resultados)
 
+@app.post("/validate/batch", response_model=List[ValidateResponse])
+def validate_batch_endpoint(req: BatchValidateRequest):
+    return validate_batch((i.doc_path, i.n_paginas, i.resultados) for i in req.itens)
+
 @app.post("/consolidate", response_model=Consolidated)
 def consolidate_endpoint(req: ConsolidateRequest):
     return consolidate(req.doc_id, req.resultados, req.pesos or None)
 
+@app.post("/pipeline", response_model=Consolidated)
+async def pipeline(req: PipelineRequest, request: Request):
+    cons = await analyze_document(
+        request.app.state.allm, req.doc_path, req.doc_id, req.criterios or None, req.pesos or None,
+        req.max_paginas, req.contexto, req.max_concorrencia, req.max_tokens_contexto, req.modo,
+        reutilizar=req.reutilizar,
+    )
+    return cons.to_model()
+
+@app.post("/jobs", response_model=JobSubmitted)
+def submit_job(req: JobRequest, request: Request):
+    # Enfileira o pipeline completo; o mesmo PDF com os mesmos parâmetros reaproveita o job existente.
+    if not Path(req.doc_path).is_file():
+        raise HTTPException(status_code=404, detail=f"Documento não encontrado: {req.doc_path}")
+    params = req.model_dump(exclude={"prioridade", "forcar"})
+    key = jobs.dedup_key(page_cache.doc_hash(req.doc_path), {k: v for k, v in params.items() if k != "doc_path"})
+    criterios = list(req.criterios or default_criterios(req.pesos or None))
+    job_id, duplicado = jobs.get_queue().submit(params, key, criterios, req.prioridade, force=req.forcar)
+    workers = getattr(request.app.state, "job_workers", None)
+    if workers is not None:
+        workers.notify()
+    return JobSubmitted(job_id=job_id, status=jobs.get_queue().get(job_id)["status"], duplicado=duplicado)
+
+def _job_or_404(job_id: str) -> dict:
+    job = jobs.get_queue().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job não encontrado: {job_id}")
+    return job
+
+@app.get("/jobs/{job_id}", response_model=JobStatus)
+def job_status(job_id: str):
+    job = _job_or_404(job_id)
+    feitos = {r["criterio"] for r in job["resultados"]}
+    progresso = {c: "concluido" if c in feitos else "pendente" for c in job["criterios"]}
+    return JobStatus(
+        job_id=job["job_id"], status=job["status"], prioridade=job["prioridade"],
+        doc_path=job["params"]["doc_path"], progresso=progresso,
+        concluidos=sum(v == "concluido" for v in progresso.values()), total=len(progresso),
+        resultados=job["resultados"], resultado=job["resultado"], erro=job["erro"],
+    )
+
+def _sse(event: str, data, event_id: str = "") -> str:
+    head = f"id: {event_id}\n" if event_id else ""
+    return f"{head}event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str, request: Request):
+    # SSE: um evento "criterio" por CriterionResult concluído e um "fim" com o Consolidated (ou o erro).
+    # Reconexões com Last-Event-ID recebem só o que faltou.
+    _job_or_404(job_id)
+    queue = jobs.get_queue()
+    try:
+        last = int(request.headers.get("last-event-id", "0"))
+    except ValueError:
+        last = 0
+
+    async def stream():
+        nonlocal last
+        while True:
+            for seq, r in await asyncio.to_thread(queue.results_since, job_id, last):
+                last = seq
+                yield _sse("criterio", r, str(seq))
+            job = await asyncio.to_thread(queue.get, job_id)
+            if job["status"] in (jobs.CONCLUIDO, jobs.FALHOU):
+                # Resultados gravados entre as duas consultas saem antes do fim.
+                for seq, r in await asyncio.to_thread(queue.results_since, job_id, last):
+                    last = seq
+                    yield _sse("criterio", r, str(seq))
+                yield _sse("fim", {"status": job["status"], "resultado": job["resultado"], "erro": job["erro"]})
+                return
+            if await request.is_disconnected():
+                return
+            await asyncio.sleep(jobs.JOBS_POLL_INTERVAL)
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 @app.post("/report")
 def report(req: ReportRequest):
-    out_path = Path("relatorio.html")
-    render_report_html(req.consolidated, str(out_path))
-    return FileResponse(str(out_path), filename="relatorio.html", media_type="text/html")
+    return StreamingResponse(
+        iter_report(req.consolidated), media_type="text/html; charset=utf-8",
+        headers={"Content-Disposition": 'attachment; filename="relatorio.html"'},
+    )
+
+@app.post("/report/batch")
+def report_batch(req: BatchReportRequest):
+    return StreamingResponse(
+        iter_batch_report(req.consolidated), media_type="text/html; charset=utf-8",
+        headers={"Content-Disposition": 'attachment; filename="relatorio_lote.html"'},
+    )
 
 @app.get("/upload-page", response_class=HTMLResponse)
 def upload_page():
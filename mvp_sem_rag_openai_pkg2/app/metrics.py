@@ -0,0 +1,116 @@
+import bisect, threading, time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple, TypeVar
+
+# Métricas no formato de exposição do Prometheus (texto), sem dependências externas.
+# Contadores e histogramas com rótulos; cada observação custa um lock e um bisect.
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+T = TypeVar("T")
+LabelKey = Tuple[Tuple[str, str], ...]
+
+def _key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def _fmt_labels(key: LabelKey, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    items = key + extra
+    if not items:
+        return ""
+    esc = lambda v: v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in items) + "}"
+
+class Counter:
+    def __init__(self, name: str, doc: str):
+        self.name, self.doc = name, doc
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        k = _key(labels)
+        with self._lock:
+            self._values[k] = self._values.get(k, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(_key(labels), 0.0)
+
+    def expose(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for k, v in sorted(self._values.items()):
+                lines.append(f"{self.name}{_fmt_labels(k)} {v}")
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, doc: str, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name, self.doc = name, doc
+        self.buckets = tuple(buckets)
+        self._data: Dict[LabelKey, List[float]] = {}  # contagens por bucket + [soma, total]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        k = _key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            d = self._data.get(k)
+            if d is None:
+                d = self._data[k] = [0.0] * (len(self.buckets) + 2)
+            if i < len(self.buckets):
+                d[i] += 1
+            d[-2] += value
+            d[-1] += 1
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            d = self._data.get(_key(labels))
+            return int(d[-1]) if d else 0
+
+    def expose(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for k, d in sorted(self._data.items()):
+                acc = 0.0
+                for b, c in zip(self.buckets, d):
+                    acc += c
+                    lines.append(f"{self.name}_bucket{_fmt_labels(k, (('le', repr(b)),))} {acc}")
+                lines.append(f"{self.name}_bucket{_fmt_labels(k, (('le', '+Inf'),))} {d[-1]}")
+                lines.append(f"{self.name}_sum{_fmt_labels(k)} {d[-2]}")
+                lines.append(f"{self.name}_count{_fmt_labels(k)} {d[-1]}")
+        return lines
+
+REQUEST_SECONDS = Histogram("mvp_http_request_duration_seconds", "Latência por endpoint HTTP.")
+STAGE_SECONDS = Histogram("mvp_stage_duration_seconds", "Latência por etapa do pipeline.")
+PAGES_EXTRACTED = Counter("mvp_pages_extracted_total", "Páginas extraídas de PDFs (sem cache).")
+PAGE_CACHE = Counter("mvp_page_cache_total", "Consultas ao cache de páginas por resultado (hit/disk/miss).")
+LLM_CALLS = Counter("mvp_llm_calls_total", "Chamadas ao provedor de LLM.")
+LLM_TOKENS = Counter("mvp_llm_tokens_total", "Tokens enviados/recebidos do LLM (direction=in|out).")
+LLM_CACHE = Counter("mvp_llm_cache_total", "Consultas ao cache de respostas do LLM por resultado (hit/miss).")
+LLM_RETRIES = Counter("mvp_llm_retries_total", "Retentativas de chamadas ao LLM.")
+
+REGISTRY = [REQUEST_SECONDS, STAGE_SECONDS, PAGES_EXTRACTED, PAGE_CACHE, LLM_CALLS, LLM_TOKENS, LLM_CACHE, LLM_RETRIES]
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    # Etapas: extraction, scan, prompt_build, llm_call, parse, validate, consolidate, render.
+    # Também serve como decorador (@timed("validate")).
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - t0, stage=stage)
+
+def timed_iter(stage: str, it: Iterable[T]) -> Iterator[T]:
+    # Para geradores (ex.: relatório em streaming): mede até o último pedaço ser consumido.
+    with timed(stage):
+        yield from it
+
+def record_tokens(tokens_in: int, tokens_out: int) -> None:
+    LLM_CALLS.inc()
+    LLM_TOKENS.inc(tokens_in, direction="in")
+    LLM_TOKENS.inc(tokens_out, direction="out")
+
+def expose() -> str:
+    lines: List[str] = []
+    for m in REGISTRY:
+        lines.extend(m.expose())
+    return "\n".join(lines) + "\n"
@@ -3,6 +3,7 @@ from typing import List, Optional, Literal, Dict
 
 Presence = Literal["sim", "parcial", "nao", "insuficiente"]
 Risk = Literal["baixo", "medio", "alto"]
+JobState = Literal["na_fila", "executando", "concluido", "falhou"]
 
 class ScanRequest(BaseModel):
     doc_path: str = Field(..., description="Caminho do PDF no servidor")
@@ -19,6 +20,8 @@ class EvaluateRequest(BaseModel):
     doc_path: str
     criterio: str
     paginas: List[int]
+    palavras_chave: List[str] = Field(default_factory=list)  # se informadas, envia só os trechos mais relevantes
+    max_tokens_contexto: Optional[int] = None  # padrão: orçamento do modelo (context_packer)
 
 class Evidence(BaseModel):
     doc: str
@@ -37,6 +40,9 @@ class ValidateRequest(BaseModel):
     n_paginas: int
     resultados: List[CriterionResult]
 
+class BatchValidateRequest(BaseModel):
+    itens: List[ValidateRequest]
+
 class ValidateResponse(BaseModel):
     ok: bool
     erros: List[str] = Field(default_factory=list)
@@ -55,5 +61,41 @@ class Consolidated(BaseModel):
     flags: Dict[str, List[str]]
     resultados: List[CriterionResult]
 
+class PipelineRequest(BaseModel):
+    doc_path: str
+    doc_id: Optional[str] = ""  # padrão: nome do arquivo sem extensão
+    criterios: Dict[str, List[str]] = Field(default_factory=dict)  # criterio -> palavras-chave (vazio = padrão)
+    pesos: Dict[str, float] = Field(default_factory=dict)  # vazio = DEFAULT_WEIGHTS
+    max_paginas: int = 6
+    contexto: int = 1
+    max_concorrencia: int = 4  # chamadas simultâneas ao LLM
+    max_tokens_contexto: Optional[int] = None  # orçamento de tokens do conteúdo por critério
+    modo: Literal["individual", "agrupado"] = "individual"  # agrupado: um prompt por grupo de critérios com páginas em comum
+    reutilizar: bool = True  # reaproveita resultados já avaliados (results_db); False força nova avaliação
+
+class JobRequest(PipelineRequest):
+    prioridade: int = 0  # maior = processado antes
+    forcar: bool = False  # roda de novo mesmo se já houver job concluído com os mesmos parâmetros
+
+class JobSubmitted(BaseModel):
+    job_id: str
+    status: JobState
+    duplicado: bool = False  # mesmo PDF e parâmetros de um job existente
+
+class JobStatus(BaseModel):
+    job_id: str
+    status: JobState
+    prioridade: int
+    doc_path: str
+    progresso: Dict[str, str]  # criterio -> "pendente" | "concluido"
+    concluidos: int
+    total: int
+    resultados: List[CriterionResult] = Field(default_factory=list)  # na ordem de conclusão
+    resultado: Optional[Consolidated] = None
+    erro: Optional[str] = None
+
 class ReportRequest(BaseModel):
     consolidated: Consolidated
+
+class BatchReportRequest(BaseModel):
+    consolidated: List[Consolidated]
@@ -0,0 +1,135 @@
+import hashlib, os, threading
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+# OCR para páginas sem camada de texto (editais escaneados). Só as páginas com menos de
+# OCR_MIN_CHARS caracteres extraídos são rasterizadas e enviadas ao motor de OCR, em um
+# pool de processos; o texto fica em cache pelo hash da imagem renderizada da página.
+OCR_ENABLED = os.getenv("OCR_ENABLED", "1") != "0"
+OCR_ENGINE = os.getenv("OCR_ENGINE", "tesseract")
+OCR_LANG = os.getenv("OCR_LANG", "por")
+OCR_MIN_CHARS = int(os.getenv("OCR_MIN_CHARS", "20"))
+OCR_RESOLUTION = int(os.getenv("OCR_RESOLUTION", "300"))
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", "0")) or (os.cpu_count() or 1)
+OCR_CHUNK_SIZE = int(os.getenv("OCR_CHUNK_SIZE", "4"))
+OCR_CACHE_DIR = Path(os.getenv("OCR_CACHE_DIR", ".ocr_cache"))
+
+class OCREngine:
+    # Interface dos motores de OCR: registre outros com register_engine(nome, fábrica)
+    # no import de um módulo (os processos do pool também precisam enxergar o registro).
+    name = "base"
+
+    def available(self) -> bool:
+        return True
+
+    def image_to_text(self, image) -> str:
+        raise NotImplementedError
+
+class TesseractEngine(OCREngine):
+    name = "tesseract"
+    _available: Optional[bool] = None  # por processo: `tesseract --version` roda uma vez só
+
+    def __init__(self, lang: str = OCR_LANG):
+        self.lang = lang
+
+    def available(self) -> bool:
+        if TesseractEngine._available is None:
+            try:
+                import pytesseract
+                pytesseract.get_tesseract_version()
+                TesseractEngine._available = True
+            except Exception:
+                TesseractEngine._available = False
+        return TesseractEngine._available
+
+    def image_to_text(self, image) -> str:
+        import pytesseract
+        return pytesseract.image_to_string(image, lang=self.lang)
+
+ENGINES: Dict[str, Callable[[], OCREngine]] = {"tesseract": TesseractEngine}
+
+def register_engine(name: str, factory: Callable[[], OCREngine]) -> None:
+    ENGINES[name] = factory
+
+def get_engine(name: str = OCR_ENGINE) -> OCREngine:
+    if name not in ENGINES:
+        raise ValueError(f"Motor de OCR desconhecido: {name}. Disponíveis: {', '.join(ENGINES)}")
+    return ENGINES[name]()
+
+def pages_needing_ocr(texts: Dict[int, str]) -> List[int]:
+    return [p for p, t in texts.items() if len((t or "").strip()) < OCR_MIN_CHARS]
+
+def _ocr_pages(path: str, pages: List[int], engine_name: str, resolution: int, cache_dir: str) -> Dict[int, str]:
+    # Executa no processo do pool.
+    import pdfplumber
+    engine = get_engine(engine_name)
+    cache = Path(cache_dir)
+    cache.mkdir(parents=True, exist_ok=True)
+    out: Dict[int, str] = {}
+    with pdfplumber.open(path) as pdf:
+        for p in pages:
+            try:
+                img = pdf.pages[p - 1].to_image(resolution=resolution).original
+                h = hashlib.sha256(f"{img.mode}{img.size}".encode() + img.tobytes()).hexdigest()
+                cached = cache / f"{engine_name}-{h}.txt"
+                if cached.exists():
+                    out[p] = cached.read_text(encoding="utf-8")
+                    continue
+                text = engine.image_to_text(img) or ""
+                tmp = cached.with_suffix(f".{os.getpid()}.tmp")
+                tmp.write_text(text, encoding="utf-8")
+                os.replace(tmp, cached)
+                out[p] = text
+            except Exception as e:
+                print(f"[WARN] OCR falhou na página {p} de {path}: {e}")
+    return out
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+_unavailable_warned = False
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=OCR_WORKERS, mp_context=mp.get_context("spawn"))
+        return _pool
+
+def run_ocr(path: str, pages: List[int], engine_name: str = OCR_ENGINE) -> Dict[int, str]:
+    global _unavailable_warned
+    if not pages:
+        return {}
+    if not get_engine(engine_name).available():
+        if not _unavailable_warned:
+            print(f"[WARN] motor de OCR '{engine_name}' indisponível; páginas escaneadas ficarão sem texto.")
+            _unavailable_warned = True
+        return {}
+    chunks = [pages[i:i + OCR_CHUNK_SIZE] for i in range(0, len(pages), OCR_CHUNK_SIZE)]
+    if OCR_WORKERS <= 1 or len(chunks) == 1:
+        return _ocr_pages(path, pages, engine_name, OCR_RESOLUTION, str(OCR_CACHE_DIR))
+    out: Dict[int, str] = {}
+    n = len(chunks)
+    for part in _get_pool().map(_ocr_pages, [path] * n, chunks, [engine_name] * n,
+                                [OCR_RESOLUTION] * n, [str(OCR_CACHE_DIR)] * n):
+        out.update(part)
+    return out
+
+def can_ocr(engine_name: str = OCR_ENGINE) -> bool:
+    return OCR_ENABLED and get_engine(engine_name).available()
+
+def fill_missing(path: str, texts: Dict[int, str]) -> List[int]:
+    # Completa, in place, as páginas sem texto com OCR (no-op para PDFs digitais) e devolve
+    # as que precisavam de OCR e ficaram sem ele (OCR desligado, motor indisponível ou falha),
+    # para o page_cache não gravar em disco um texto incompleto.
+    # Síncrono: page_cache.get/get_pages só devolvem depois do OCR, então a primeira leitura
+    # de um edital escaneado (upload em segundo plano, /scan, /evaluate, lote) espera por ele.
+    missing = pages_needing_ocr(texts)
+    if not missing or not OCR_ENABLED:
+        return missing
+    feitas = run_ocr(path, missing)
+    for p, t in feitas.items():
+        if len(t.strip()) > len((texts.get(p) or "").strip()):
+            texts[p] = t
+    return [p for p in missing if p not in feitas]
@@ -0,0 +1,266 @@
+import gzip, hashlib, json, os, threading, time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .utils_pdf import extract_text_by_page, iter_pages
+from .page_store import PageStore
+from . import ocr
+from .metrics import PAGE_CACHE, PAGES_EXTRACTED, timed
+
+# Cache de texto por página, indexado pelo SHA-256 do conteúdo do PDF.
+# Camada 1: LRU em memória (PageStore: um buffer UTF-8 por documento) limitado em bytes.
+# Camada 2: arquivo por documento: .pages sem compressão, mapeado em memória (padrão; o texto
+# fica no cache de arquivos do SO, compartilhado entre processos e fora do heap), ou .json.gz
+# com PAGE_CACHE_MMAP=0 (menos disco, mas o texto vai inteiro para o heap de cada processo).
+CACHE_DIR = Path(os.getenv("PAGE_CACHE_DIR", ".page_cache"))
+MAX_BYTES = int(float(os.getenv("PAGE_CACHE_MAX_MB", "256")) * 1024 * 1024)
+# Limites da pasta em disco (0 = sem limite), aplicados a cada documento gravado: saem primeiro
+# os documentos usados há mais tempo (o uso renova o mtime).
+DISK_MAX_BYTES = int(float(os.getenv("PAGE_CACHE_DISK_MAX_MB", "2048")) * 1024 * 1024)
+DISK_MAX_AGE = float(os.getenv("PAGE_CACHE_DISK_MAX_DAYS", "0")) * 86400
+PAGE_CACHE_MMAP = os.getenv("PAGE_CACHE_MMAP", "1") != "0"
+RAW_SUFFIX = ".pages"
+PENDING_OCR_SUFFIX = ".sem_ocr.json"  # páginas gravadas sem OCR (desligado, indisponível ou falha)
+HASH_CHUNK = 1024 * 1024
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+class PageTextCache:
+    def __init__(self, cache_dir: Path = CACHE_DIR, max_bytes: int = MAX_BYTES, use_mmap: bool = PAGE_CACHE_MMAP,
+                 disk_max_bytes: int = DISK_MAX_BYTES, disk_max_age: float = DISK_MAX_AGE):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.use_mmap = use_mmap
+        self.disk_max_bytes = disk_max_bytes
+        self.disk_max_age = disk_max_age
+        self._lru: "OrderedDict[str, Tuple[PageStore, int]]" = OrderedDict()
+        self._size = 0
+        self._stats: Dict[str, Tuple[int, int, str]] = {}  # path -> (mtime_ns, tamanho, sha)
+        self._lock = threading.Lock()
+        self._building: Dict[str, threading.Lock] = {}
+
+    def doc_hash(self, path: str) -> str:
+        # Só recalcula o hash se mtime/tamanho mudarem; bytes novos => chave nova.
+        key = str(Path(path).resolve())
+        st = os.stat(key)
+        with self._lock:
+            memo = self._stats.get(key)
+        if memo and memo[0] == st.st_mtime_ns and memo[1] == st.st_size:
+            return memo[2]
+        sha = file_sha256(key)
+        with self._lock:
+            self._stats[key] = (st.st_mtime_ns, st.st_size, sha)
+        return sha
+
+    def remember(self, path: str, sha: str) -> None:
+        # Registra um hash já calculado (ex.: durante o upload) para não reler o arquivo.
+        key = str(Path(path).resolve())
+        st = os.stat(key)
+        with self._lock:
+            self._stats[key] = (st.st_mtime_ns, st.st_size, sha)
+
+    def _disk_path(self, sha: str) -> Path:
+        return self.cache_dir / f"{sha}.json.gz"
+
+    def _raw_path(self, sha: str) -> Path:
+        return self.cache_dir / f"{sha}{RAW_SUFFIX}"
+
+    def _pending_path(self, sha: str) -> Path:
+        return self.cache_dir / f"{sha}{PENDING_OCR_SUFFIX}"
+
+    def _get_mem(self, sha: str):
+        with self._lock:
+            hit = self._lru.get(sha)
+            if hit is None:
+                return None
+            self._lru.move_to_end(sha)
+            return hit[0]
+
+    def _put_mem(self, sha: str, texts: PageStore) -> None:
+        size = texts.nbytes
+        with self._lock:
+            old = self._lru.pop(sha, None)
+            if old is not None:
+                self._size -= old[1]
+            if size > self.max_bytes:
+                return
+            self._lru[sha] = (texts, size)
+            self._size += size
+            while self._size > self.max_bytes and self._lru:
+                _, (_, s) = self._lru.popitem(last=False)
+                self._size -= s
+
+    def _load_disk(self, sha: str) -> Optional[PageStore]:
+        # Lê o formato que existir (.pages tem preferência: não precisa descomprimir nem decodificar).
+        raw = self._raw_path(sha)
+        if raw.exists():
+            try:
+                store = PageStore.open(raw, use_mmap=self.use_mmap)
+                _touch(raw)
+                return store
+            except Exception:
+                pass
+        p = self._disk_path(sha)
+        if not p.exists():
+            return None
+        try:
+            with gzip.open(p, "rt", encoding="utf-8") as f:
+                data = json.load(f)
+            store = PageStore.from_texts((int(k), v) for k, v in sorted(data.items(), key=lambda kv: int(kv[0])))
+        except Exception:
+            return None
+        _touch(p)
+        if self.use_mmap:
+            # Cache antigo (.json.gz): converte uma vez para .pages e passa a mapear.
+            try:
+                store.save(raw)
+                return PageStore.open(raw)
+            except OSError:
+                pass
+        return store
+
+    def _save_disk(self, sha: str, texts: Dict[int, str], sem_ocr: List[int] = ()) -> PageStore:
+        # sem_ocr: páginas que precisavam de OCR e ficaram sem ele; o get tenta de novo quando
+        # o OCR estiver disponível, em vez de servir para sempre páginas vazias do cache.
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        pending = self._pending_path(sha)
+        if sem_ocr:
+            pending.write_text(json.dumps(sorted(sem_ocr)), encoding="utf-8")
+        elif pending.exists():
+            pending.unlink()
+        store = PageStore.from_texts(texts)
+        if self.use_mmap:
+            store.save(self._raw_path(sha))
+            store = PageStore.open(self._raw_path(sha))
+        else:
+            p = self._disk_path(sha)
+            tmp = p.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            with gzip.open(tmp, "wt", encoding="utf-8", compresslevel=3) as f:
+                json.dump(texts, f, ensure_ascii=False)
+            os.replace(tmp, p)
+        self.prune_disk(keep=sha)
+        return store
+
+    def prune_disk(self, keep: str = "") -> int:
+        # Apaga os documentos (.pages, .json.gz, .sem_ocr.json) mais antigos que disk_max_age e,
+        # depois, os usados há mais tempo até a pasta caber em disk_max_bytes. `keep` nunca sai.
+        # Um .pages mapeado por outro processo continua válido para ele depois de apagado.
+        if not self.disk_max_bytes and not self.disk_max_age:
+            return 0
+        docs: Dict[str, List] = {}  # sha -> [mtime mais recente, bytes, arquivos]
+        try:
+            entries = list(os.scandir(self.cache_dir))
+        except OSError:
+            return 0
+        for e in entries:
+            if not e.name.endswith((RAW_SUFFIX, ".json.gz", PENDING_OCR_SUFFIX)):
+                continue
+            try:
+                st = e.stat()
+            except OSError:
+                continue
+            d = docs.setdefault(e.name.split(".", 1)[0], [0.0, 0, []])
+            d[0] = max(d[0], st.st_mtime)
+            d[1] += st.st_size
+            d[2].append(e.path)
+        total = sum(d[1] for d in docs.values())
+        limite = time.time() - self.disk_max_age
+        removidos = 0
+        for sha, (mtime, size, files) in sorted(docs.items(), key=lambda kv: kv[1][0]):
+            if sha == keep:
+                continue
+            velho = self.disk_max_age and mtime < limite
+            if not velho and (not self.disk_max_bytes or total <= self.disk_max_bytes):
+                continue
+            for f in files:
+                try:
+                    os.remove(f)
+                except OSError:
+                    pass
+            total -= size
+            removidos += 1
+        return removidos
+
+    def peek(self, path: str) -> Optional[PageStore]:
+        # Consulta memória e disco sem disparar extração.
+        sha = self.doc_hash(path)
+        texts = self._get_mem(sha)
+        if texts is None:
+            texts = self._load_disk(sha)
+            if texts is not None:
+                self._put_mem(sha, texts)
+        return texts
+
+    def get(self, path: str) -> PageStore:
+        sha = self.doc_hash(path)
+        texts = self._get_mem(sha)
+        if texts is not None:
+            PAGE_CACHE.inc(result="hit")
+            return texts
+        # Evita extrações concorrentes do mesmo documento.
+        with self._lock:
+            building = self._building.setdefault(sha, threading.Lock())
+        with building:
+            texts = self._get_mem(sha)
+            if texts is not None:
+                PAGE_CACHE.inc(result="hit")
+                return texts
+            texts = self._load_disk(sha)
+            if texts is None:
+                PAGE_CACHE.inc(result="miss")
+                with timed("extraction"):
+                    texts = extract_text_by_page(path)
+                    sem_ocr = ocr.fill_missing(path, texts)
+                PAGES_EXTRACTED.inc(len(texts))
+                texts = self._save_disk(sha, texts, sem_ocr)
+            else:
+                PAGE_CACHE.inc(result="disk")
+                if self._pending_path(sha).exists() and ocr.can_ocr():
+                    # Gravado sem OCR numa execução anterior e o OCR agora funciona: completa.
+                    with timed("extraction"):
+                        full = dict(texts.items())
+                        sem_ocr = ocr.fill_missing(path, full)
+                    texts = self._save_disk(sha, full, sem_ocr)
+            self._put_mem(sha, texts)
+        with self._lock:
+            self._building.pop(sha, None)
+        return texts
+
+    def clear_memory(self) -> None:
+        with self._lock:
+            self._lru.clear()
+            self._size = 0
+
+def _touch(path: Path) -> None:
+    # Marca o uso (mtime) para o prune_disk tirar primeiro os documentos usados há mais tempo.
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+cache = PageTextCache()
+
+def get_page_texts(path: str) -> PageStore:
+    return cache.get(path)
+
+def get_pages(path: str, paginas: Iterable[int]) -> Dict[int, str]:
+    # Usa o cache se o documento já foi extraído; senão decodifica só as páginas pedidas.
+    texts = cache.peek(path)
+    if texts is not None:
+        PAGE_CACHE.inc(result="hit")
+        return {p: texts[p] for p in paginas if p in texts}
+    PAGE_CACHE.inc(result="miss")
+    with timed("extraction"):
+        texts = dict(iter_pages(path, paginas))
+        ocr.fill_missing(path, texts)
+    PAGES_EXTRACTED.inc(len(texts))
+    return texts
+
+def doc_hash(path: str) -> str:
+    return cache.doc_hash(path)
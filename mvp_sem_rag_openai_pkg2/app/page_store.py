@@ -0,0 +1,92 @@
+import mmap, os, struct, threading
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import Iterable, Iterator, Mapping, Tuple, Union
+
+# Texto por página em um único buffer UTF-8 + vetor de offsets (Mapping[int, str]).
+# Evita um objeto str por página (e o Dict em volta): o documento inteiro é uma alocação só,
+# devolvida ao sistema quando sai do cache, em vez de milhares de blocos que fragmentam o heap.
+# O texto é decodificado a cada acesso; quem lê muito a mesma página deve guardar a str.
+# Formato em disco (sem compressão, para mmap; ordem de bytes nativa, é um cache local):
+# MAGIC | n | páginas (int32) | offsets (int64, n+1) | UTF-8.
+MAGIC = b"PGS1"
+_HEAD = struct.Struct("=4sI")
+
+class PageStore(Mapping[int, str]):
+    __slots__ = ("_pages", "_offsets", "_data", "_buf")
+
+    def __init__(self, pages: array, offsets: array, data: Union[bytes, memoryview]):
+        # pages em ordem crescente; offsets[i]:offsets[i+1] é o texto de pages[i] em data.
+        self._pages = pages
+        self._offsets = offsets
+        self._buf = data  # mantém vivo o buffer (ou o mmap) por trás da view
+        self._data = memoryview(data)
+
+    @classmethod
+    def from_texts(cls, texts: Union[Mapping[int, str], Iterable[Tuple[int, str]]]) -> "PageStore":
+        # Aceita um Mapping ou pares (página, texto) em ordem crescente, consumidos um a um
+        # (um gerador não materializa todas as páginas como str de uma vez).
+        items = ((p, texts[p]) for p in sorted(texts)) if isinstance(texts, Mapping) else texts
+        pages, offsets, partes = array("i"), array("q", [0]), []
+        for p, t in items:
+            if pages and p <= pages[-1]:
+                raise ValueError("páginas fora de ordem")
+            b = (t or "").encode("utf-8")
+            pages.append(p)
+            partes.append(b)
+            offsets.append(offsets[-1] + len(b))
+        return cls(pages, offsets, b"".join(partes))
+
+    @classmethod
+    def open(cls, path: Union[str, Path], use_mmap: bool = True) -> "PageStore":
+        with open(path, "rb") as f:
+            if use_mmap:
+                raw = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                raw = f.read()
+        magic, n = _HEAD.unpack_from(raw, 0)
+        if magic != MAGIC:
+            raise ValueError(f"formato inválido: {path}")
+        pos = _HEAD.size
+        pages, offsets = array("i"), array("q")
+        pages.frombytes(raw[pos:pos + 4 * n])
+        pos += 4 * n
+        offsets.frombytes(raw[pos:pos + 8 * (n + 1)])
+        pos += 8 * (n + 1)
+        return cls(pages, offsets, memoryview(raw)[pos:])
+
+    def save(self, path: Union[str, Path]) -> None:
+        path = Path(path)
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, "wb") as f:
+            f.write(_HEAD.pack(MAGIC, len(self._pages)))
+            f.write(self._pages.tobytes())
+            f.write(self._offsets.tobytes())
+            f.write(self._data)
+        os.replace(tmp, path)
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._data) + self._pages.itemsize * len(self._pages) + self._offsets.itemsize * len(self._offsets)
+
+    def _index(self, pagina: int) -> int:
+        i = bisect_left(self._pages, pagina)
+        if i == len(self._pages) or self._pages[i] != pagina:
+            return -1
+        return i
+
+    def __getitem__(self, pagina: int) -> str:
+        i = self._index(pagina)
+        if i < 0:
+            raise KeyError(pagina)
+        return str(self._data[self._offsets[i]:self._offsets[i + 1]], "utf-8")
+
+    def __contains__(self, pagina) -> bool:
+        return isinstance(pagina, int) and self._index(pagina) >= 0
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._pages)
+
+    def __len__(self) -> int:
+        return len(self._pages)
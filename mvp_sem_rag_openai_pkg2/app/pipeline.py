@@ -0,0 +1,214 @@
+import asyncio, json
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, List, Mapping, Optional
+
+from pydantic import ValidationError
+
+from .models import CriterionResult
+from .records import Consolidado, Resultado
+from .criteria import DEFAULT_KEYWORDS
+from .aggregator import DEFAULT_WEIGHTS, consolidate_records
+from .validators import validate_results
+from .keyword_index import KeywordIndex, get_index
+from .context_packer import budget_for, format_pages, pack_context
+from . import page_cache
+from .results_db import get_store, prompt_version
+from .metrics import timed
+
+PROMPTS_DIR = Path(__file__).parent / "prompts"
+SYSTEM_EVALUATE = "Responda apenas com JSON válido compatível com o schema."
+
+@lru_cache(maxsize=None)
+def load_prompt(name: str = "evaluate_prompt.txt") -> str:
+    return (PROMPTS_DIR / name).read_text(encoding="utf-8")
+
+def render_evaluate_prompt(criterio: str, conteudo: str, doc_name: str) -> str:
+    return load_prompt().format(criterio=criterio, conteudo_paginas=conteudo, doc_name=doc_name)
+
+def build_evaluate_prompt(criterio: str, texts: Mapping[int, str], paginas: List[int], doc_name: str) -> str:
+    return render_evaluate_prompt(criterio, format_pages(texts, paginas), doc_name)
+
+def build_packed_prompt(idx: KeywordIndex, texts: Mapping[int, str], criterio: str, palavras: List[str],
+                        paginas: List[int], doc_name: str, budget_tokens: int, palavra_inteira: bool = False) -> str:
+    # Trechos mais relevantes das páginas dentro do orçamento de tokens do modelo.
+    conteudo = pack_context(texts, paginas, idx.rank(palavras, palavra_inteira),
+                            idx.hits(paginas, palavras, palavra_inteira), budget_tokens)
+    return render_evaluate_prompt(criterio, conteudo, doc_name)
+
+def build_multi_prompt(idx: KeywordIndex, texts: Mapping[int, str], criterios: Dict[str, List[str]],
+                       paginas: List[int], doc_name: str, budget_tokens: int, palavra_inteira: bool = False) -> str:
+    palavras = [k for ks in criterios.values() for k in ks]
+    conteudo = pack_context(texts, paginas, idx.rank(palavras, palavra_inteira),
+                            idx.hits(paginas, palavras, palavra_inteira), budget_tokens)
+    return load_prompt("evaluate_multi_prompt.txt").format(
+        criterios=", ".join(criterios), conteudo_paginas=conteudo, doc_name=doc_name)
+
+def group_criteria(paginas: Dict[str, List[int]], max_grupo: int = 4, min_sobreposicao: float = 0.5) -> List[List[str]]:
+    # Agrupa critérios cujas páginas varridas se sobrepõem (fração das páginas do critério
+    # já presentes no grupo >= min_sobreposicao), para avaliá-los em um único prompt.
+    grupos: List[List[str]] = []
+    uniao: List[set] = []
+    for c in sorted(paginas, key=lambda c: -len(paginas[c])):
+        ps = set(paginas[c])
+        best, best_frac = None, 0.0
+        for i, u in enumerate(uniao):
+            if len(grupos[i]) >= max_grupo or not ps:
+                continue
+            frac = len(ps & u) / len(ps)
+            if frac >= min_sobreposicao and frac > best_frac:
+                best, best_frac = i, frac
+        if best is None:
+            grupos.append([c])
+            uniao.append(set(ps))
+        else:
+            grupos[best].append(c)
+            uniao[best] |= ps
+    return grupos
+
+def parse_multi(out: str, criterios: List[str]) -> Dict[str, CriterionResult]:
+    # Aceita {"resultados": [...]} ou uma lista; descarta itens inválidos ou de critérios não pedidos.
+    data = json.loads(out)
+    if isinstance(data, dict):
+        data = data.get("resultados", [])
+    found: Dict[str, CriterionResult] = {}
+    for obj in data if isinstance(data, list) else []:
+        if not isinstance(obj, dict) or obj.get("criterio") not in criterios:
+            continue
+        try:
+            found.setdefault(obj["criterio"], CriterionResult(**obj))
+        except ValidationError:
+            continue
+    return found
+
+def check_multi(out: str, criterios: List[str]) -> None:
+    # Resposta agrupada sem nenhum critério válido não deve ir para o cache.
+    if not parse_multi(out, criterios):
+        raise ValueError("resposta sem critérios válidos")
+
+def parse_result(out: str, criterio: Optional[str] = None) -> CriterionResult:
+    data = json.loads(out)
+    if criterio:
+        data["criterio"] = criterio
+    return CriterionResult(**data)
+
+async def complete_json(llm, prompt: str, system: str = "", max_tokens: int = 800,
+                        check: Callable[[str], object] = json.loads) -> str:
+    # Aceita o cliente assíncrono (AsyncLLMClient) ou o síncrono (LLMClient, em thread).
+    # check valida a resposta antes de ela entrar no cache do cliente.
+    if asyncio.iscoroutinefunction(llm.complete_json):
+        return await llm.complete_json(prompt, system=system, max_tokens=max_tokens, check=check)
+    return await asyncio.to_thread(llm.complete_json, prompt, system=system, max_tokens=max_tokens, check=check)
+
+def default_criterios(pesos: Optional[Dict[str, float]] = None) -> Dict[str, List[str]]:
+    # Critérios = chaves dos pesos; sem palavras-chave conhecidas, usa o próprio nome.
+    return {c: DEFAULT_KEYWORDS.get(c, [c.replace("_", " ")]) for c in (pesos or DEFAULT_WEIGHTS)}
+
+async def analyze_document(
+    llm,
+    doc_path: str,
+    doc_id: str = "",
+    criterios: Optional[Dict[str, List[str]]] = None,
+    pesos: Optional[Dict[str, float]] = None,
+    max_paginas: int = 6,
+    contexto: int = 1,
+    max_concorrencia: int = 4,
+    max_tokens_contexto: Optional[int] = None,
+    modo: str = "individual",
+    on_result: Optional[Callable[[Resultado], None]] = None,
+    reutilizar: bool = True,
+) -> Consolidado:
+    # Extrai/indexa uma vez e dispara as avaliações dos critérios em paralelo (limitado por semáforo).
+    # modo="agrupado": critérios com páginas em comum vão no mesmo prompt (fallback individual).
+    # on_result é chamado (no event loop) a cada critério concluído, para acompanhar o progresso.
+    # Resultados ficam no results_db; com reutilizar, critérios já avaliados (mesmo PDF,
+    # versão do prompt e modelo) vêm de lá e só os pendentes vão ao LLM.
+    # Internamente usa records (Resultado/Consolidado); quem expõe na API chama to_model().
+    criterios = criterios or default_criterios(pesos)
+    doc_id = doc_id or Path(doc_path).stem
+    doc_name = Path(doc_path).name
+    idx = await asyncio.to_thread(get_index, doc_path)
+    texts = await asyncio.to_thread(page_cache.get_page_texts, doc_path)
+    sem = asyncio.Semaphore(max(1, max_concorrencia))
+    model = llm.model_name()
+    budget = max_tokens_contexto or budget_for(model)
+
+    store = get_store()
+    doc_sha = page_cache.doc_hash(doc_path)
+    templates = [load_prompt(), load_prompt("evaluate_multi_prompt.txt"), SYSTEM_EVALUATE]
+    versoes = {c: prompt_version(templates, k, max_paginas, contexto, max_tokens_contexto, modo)
+              for c, k in criterios.items()}
+    salvos = await asyncio.to_thread(store.get_many, doc_sha, versoes, model) if store is not None and reutilizar else {}
+    pendentes = [c for c in criterios if c not in salvos]
+    falhas = set()  # erros do LLM não são persistidos: serão tentados de novo
+    with timed("scan"):
+        paginas = {c: idx.scan(criterios[c], max_paginas, contexto, palavra_inteira=True) for c in pendentes}
+
+    def falha(criterio: str, motivo: str) -> Resultado:
+        return Resultado(criterio, "insuficiente", "baixo", (), motivo)
+
+    async def evaluate_one(criterio: str) -> Resultado:
+        with timed("prompt_build"):
+            prompt = build_packed_prompt(idx, texts, criterio, criterios[criterio], paginas[criterio], doc_name, budget,
+                                         palavra_inteira=True)
+        try:
+            async with sem:
+                out = await complete_json(llm, prompt, system=SYSTEM_EVALUATE,
+                                          check=lambda o: parse_result(o, criterio))
+            with timed("parse"):
+                return Resultado.from_model(parse_result(out, criterio))
+        except Exception as e:
+            falhas.add(criterio)
+            return falha(criterio, f"Falha na avaliação: {e}")
+
+    async def evaluate_group(grupo: List[str]) -> List[Resultado]:
+        if len(grupo) == 1:
+            return [await evaluate_one(grupo[0])]
+        union = sorted({p for c in grupo for p in paginas[c]})
+        with timed("prompt_build"):
+            prompt = build_multi_prompt(idx, texts, {c: criterios[c] for c in grupo}, union, doc_name, budget,
+                                        palavra_inteira=True)
+        try:
+            async with sem:
+                out = await complete_json(llm, prompt, system=SYSTEM_EVALUATE, max_tokens=800 * len(grupo),
+                                          check=lambda o: check_multi(o, grupo))
+            with timed("parse"):
+                found = {c: Resultado.from_model(r) for c, r in parse_multi(out, grupo).items()}
+        except Exception:
+            found = {}
+        faltando = [c for c in grupo if c not in found]
+        for r in await asyncio.gather(*(evaluate_one(c) for c in faltando)):
+            found[r.criterio] = r
+        return [found[c] for c in grupo]
+
+    com_paginas = {c: ps for c, ps in paginas.items() if ps}
+    if modo == "agrupado":
+        grupos = group_criteria(com_paginas)
+    else:
+        grupos = [[c] for c in com_paginas]
+    por_criterio: Dict[str, Resultado] = {c: Resultado.from_dict(r) for c, r in salvos.items()}
+    por_criterio.update({
+        c: falha(c, "Nenhuma página relevante encontrada na varredura.") for c in pendentes if c not in com_paginas
+    })
+    if on_result is not None:
+        for r in por_criterio.values():
+            on_result(r)
+
+    async def run_group(grupo: List[str]) -> None:
+        for r in await evaluate_group(grupo):
+            por_criterio[r.criterio] = r
+            if on_result is not None:
+                on_result(r)
+
+    await asyncio.gather(*(run_group(g) for g in grupos))
+    if store is not None:
+        novos = [(c, versoes[c], por_criterio[c].to_dict()) for c in pendentes if c not in falhas]
+        await asyncio.to_thread(store.put_many, doc_sha, novos, model)
+        await asyncio.to_thread(store.put_document, doc_sha, doc_id, doc_path, idx.n_pages)
+    resultados = [por_criterio[c] for c in criterios]
+    # Conferência dos trechos é CPU-bound (decodifica páginas): fora do event loop.
+    val = await asyncio.to_thread(validate_results, doc_path, idx.n_pages, resultados, texts)
+    out = consolidate_records(doc_id, resultados, pesos or None)
+    if not val.ok:
+        out.flags["erros_validacao"] = val.erros
+    return out
@@ -0,0 +1,61 @@
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from .models import Consolidated, CriterionResult
+
+# Registros leves (NamedTuple: sem __dict__ por instância) usados dentro do pipeline, dos
+# workers e do rescore. A conversão para os modelos Pydantic só acontece na borda da API
+# (to_model) ou ao validar a saída do LLM (from_model); para JSON/SQLite, to_dict
+# produz o mesmo formato de model_dump().
+
+class Evidencia(NamedTuple):
+    doc: str
+    pagina: int
+    trecho: str
+
+class Resultado(NamedTuple):
+    criterio: str
+    presenca: str
+    risco_greenwashing: str
+    evidencias: Tuple[Evidencia, ...] = ()
+    observacoes: Optional[str] = ""
+
+    @classmethod
+    def from_model(cls, r: CriterionResult) -> "Resultado":
+        return cls(r.criterio, r.presenca, r.risco_greenwashing,
+                   tuple(Evidencia(e.doc, e.pagina, e.trecho) for e in r.evidencias), r.observacoes)
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "Resultado":
+        # Sem validação: só para dados que já passaram pelo modelo (results_db, jobs).
+        return cls(d["criterio"], d["presenca"], d["risco_greenwashing"],
+                   tuple(Evidencia(e["doc"], e["pagina"], e["trecho"]) for e in d.get("evidencias") or ()),
+                   d.get("observacoes", ""))
+
+    def to_dict(self) -> dict:
+        return {
+            "criterio": self.criterio,
+            "presenca": self.presenca,
+            "risco_greenwashing": self.risco_greenwashing,
+            "evidencias": [e._asdict() for e in self.evidencias],
+            "observacoes": self.observacoes,
+        }
+
+    def to_model(self) -> CriterionResult:
+        return CriterionResult.model_validate(self.to_dict())
+
+class Consolidado(NamedTuple):
+    doc_id: str
+    escore_aderencia: float
+    flags: Dict[str, List[str]]
+    resultados: List[Resultado]
+
+    def to_dict(self) -> dict:
+        return {
+            "doc_id": self.doc_id,
+            "escore_aderencia": self.escore_aderencia,
+            "flags": self.flags,
+            "resultados": [r.to_dict() for r in self.resultados],
+        }
+
+    def to_model(self) -> Consolidated:
+        return Consolidated.model_validate(self.to_dict())
@@ -1,14 +1,42 @@
-from jinja2 import Environment, FileSystemLoader, select_autoescape
+from functools import lru_cache
+from typing import Iterator, List
+from jinja2 import Environment, FileSystemLoader, Template, select_autoescape
 from pathlib import Path
 from .models import Consolidated
+from .metrics import timed, timed_iter
 
-def render_report_html(consolidated: Consolidated, output_path: str) -> str:
-    templates_dir = Path(__file__).parent / "templates"
-    env = Environment(
-        loader=FileSystemLoader(str(templates_dir)),
-        autoescape=select_autoescape()
+TEMPLATES_DIR = Path(__file__).parent / "templates"
+
+@lru_cache(maxsize=1)
+def get_env() -> Environment:
+    # Ambiente único por processo: templates compilados uma vez e mantidos em cache
+    # (auto_reload desligado: não verifica o arquivo a cada renderização).
+    return Environment(
+        loader=FileSystemLoader(str(TEMPLATES_DIR)),
+        autoescape=select_autoescape(),
+        auto_reload=False,
+        cache_size=-1,
     )
-    tmpl = env.get_template("report.html")
-    html = tmpl.render(c=consolidated)
-    Path(output_path).write_text(html, encoding="utf-8")
+
+@lru_cache(maxsize=None)
+def get_template(name: str) -> Template:
+    return get_env().get_template(name)
+
+def iter_report(consolidated: Consolidated) -> Iterator[str]:
+    # Gera o HTML em pedaços (para StreamingResponse), sem arquivo temporário.
+    return timed_iter("render", get_template("report.html").generate(c=consolidated))
+
+@timed("render")
+def render_report(consolidated: Consolidated) -> str:
+    return get_template("report.html").render(c=consolidated)
+
+def iter_batch_report(itens: List[Consolidated]) -> Iterator[str]:
+    return timed_iter("render", get_template("report_batch.html").generate(itens=itens))
+
+@timed("render")
+def render_batch_report(itens: List[Consolidated]) -> str:
+    return get_template("report_batch.html").render(itens=itens)
+
+def render_report_html(consolidated: Consolidated, output_path: str) -> str:
+    Path(output_path).write_text(render_report(consolidated), encoding="utf-8")
     return output_path
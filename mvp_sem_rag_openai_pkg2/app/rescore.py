@@ -0,0 +1,70 @@
+"""
+Reconsolida todos os documentos a partir dos resultados por critério persistidos
+(results_db), sem chamar o LLM nem reextrair PDFs. Use quando só os pesos mudaram.
+Reescreve outputs/summary.csv; com --resultados, também outputs/<doc_id>/consolidado.json
+e resultados.json.
+Uso:
+  python -m app.rescore --pesos ../pesos.json --outputs ../outputs
+"""
+
+import argparse, csv, json, os, time
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from .aggregator import consolidate_records
+from .batch import SUMMARY_FIELDS, _write_json, summary_row
+from .records import Resultado
+from .results_db import RESULTS_DB_PATH, ResultsStore
+from .validators import validate_results
+
+def rescore(store: ResultsStore, pesos, out_dir: Path, write_results: bool = False,
+            verificar_trechos: bool = True) -> int:
+    # verificar_trechos como no lote/pipeline, para que erros_validacao no summary.csv coincida.
+    rows = []
+    for doc, salvos in store.iter_documents():
+        resultados = [Resultado.from_dict(r) for r in salvos.values()]
+        cons = consolidate_records(doc["doc_id"], resultados, pesos)
+        val = validate_results(doc["doc_path"], doc["n_paginas"], resultados, verificar_trechos=verificar_trechos)
+        if not val.ok:
+            cons.flags["erros_validacao"] = val.erros
+        data = cons.to_dict()
+        rows.append(summary_row(data))
+        if write_results:
+            d = out_dir / doc["doc_id"]
+            d.mkdir(parents=True, exist_ok=True)
+            _write_json(d / "consolidado.json", data)
+            _write_json(d / "resultados.json", data["resultados"])
+    rows.sort(key=lambda r: r["doc_id"])
+    path = out_dir / "summary.csv"
+    tmp = path.with_suffix(".tmp")
+    with tmp.open("w", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=SUMMARY_FIELDS)
+        w.writeheader()
+        w.writerows(rows)
+    os.replace(tmp, path)
+    return len(rows)
+
+def main():
+    load_dotenv()
+    ap = argparse.ArgumentParser(description="Recalcula escores com novos pesos a partir dos resultados salvos.")
+    ap.add_argument("--pesos", default="", help="JSON com pesos por critério (padrão: DEFAULT_WEIGHTS)")
+    ap.add_argument("--outputs", default="outputs", help="Pasta de saída (summary.csv)")
+    ap.add_argument("--db", default=RESULTS_DB_PATH, help="Banco de resultados (RESULTS_DB_PATH)")
+    ap.add_argument("--resultados", action="store_true", help="Reescreve também consolidado.json/resultados.json por documento")
+    ap.add_argument("--sem-verificar-trechos", dest="verificar_trechos", action="store_false",
+                    help="Pula a conferência dos trechos contra o cache de páginas (mais rápido; erros_validacao "
+                         "fica só com as checagens estruturais e pode divergir do lote)")
+    args = ap.parse_args()
+
+    if not Path(args.db).exists():
+        raise SystemExit(f"Banco de resultados não encontrado: {args.db}")
+    pesos = json.loads(Path(args.pesos).read_text(encoding="utf-8")) if args.pesos else None
+    out_dir = Path(args.outputs)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    t0 = time.perf_counter()
+    n = rescore(ResultsStore(args.db), pesos, out_dir, args.resultados, args.verificar_trechos)
+    print(f"{n} documentos reconsolidados em {time.perf_counter() - t0:.1f}s. Saída: {out_dir / 'summary.csv'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import hashlib, json, os, sqlite3, threading, time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Resultados por critério persistidos por (SHA-256 do PDF, critério, versão do prompt, modelo).
+# O pipeline só manda ao LLM os critérios sem resultado para a versão atual; mudar só os
+# pesos não invalida nada (a consolidação é refeita a partir daqui, ver app.rescore).
+RESULTS_DB = os.getenv("RESULTS_DB", "1") != "0"
+RESULTS_DB_PATH = os.getenv("RESULTS_DB_PATH", ".results.sqlite3")
+
+def prompt_version(templates: List[str], palavras: List[str], max_paginas: int, contexto: int,
+                   max_tokens_contexto: Optional[int], modo: str = "individual") -> str:
+    # Muda quando muda o que é enviado ao LLM: templates, palavras-chave, parâmetros da varredura
+    # ou o modo (no agrupado, o critério vai em um prompt com outros e o contexto da união).
+    # O modo individual não entra no hash, para manter válidas as versões gravadas antes dele.
+    # "palavras_inteiras": a varredura passou a casar palavras inteiras; invalida as versões anteriores.
+    partes = [templates, sorted(palavras), max_paginas, contexto, max_tokens_contexto, "palavras_inteiras"]
+    if modo != "individual":
+        partes.append(modo)
+    raw = json.dumps(partes, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+class ResultsStore:
+    def __init__(self, path: str = RESULTS_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS criterion_results ("
+            " doc_sha TEXT NOT NULL, criterio TEXT NOT NULL, prompt_version TEXT NOT NULL, model TEXT NOT NULL,"
+            " resultado TEXT NOT NULL, criado REAL NOT NULL,"
+            " PRIMARY KEY (doc_sha, criterio, prompt_version, model))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            " doc_sha TEXT PRIMARY KEY, doc_id TEXT NOT NULL, doc_path TEXT NOT NULL, n_paginas INTEGER NOT NULL,"
+            " atualizado REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get_many(self, doc_sha: str, versions: Dict[str, str], model: str) -> Dict[str, dict]:
+        # criterio -> resultado (dict) para os critérios já avaliados na versão pedida.
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT criterio, prompt_version, resultado FROM criterion_results WHERE doc_sha = ? AND model = ?",
+                (doc_sha, model)).fetchall()
+        return {c: json.loads(r) for c, v, r in rows if versions.get(c) == v}
+
+    def put_many(self, doc_sha: str, itens: List[Tuple[str, str, dict]], model: str) -> None:
+        # itens: (criterio, prompt_version, resultado)
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO criterion_results (doc_sha, criterio, prompt_version, model, resultado, criado)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                [(doc_sha, c, v, model, json.dumps(r, ensure_ascii=False), now) for c, v, r in itens])
+            self._conn.commit()
+
+    def put_document(self, doc_sha: str, doc_id: str, doc_path: str, n_paginas: int) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO documents (doc_sha, doc_id, doc_path, n_paginas, atualizado)"
+                " VALUES (?, ?, ?, ?, ?)", (doc_sha, doc_id, doc_path, n_paginas, time.time()))
+            self._conn.commit()
+
+    def iter_documents(self) -> Iterator[Tuple[dict, Dict[str, dict]]]:
+        # (documento, criterio -> resultado mais recente), sem olhar versão/modelo: usado para
+        # reconsolidar com pesos novos sem chamar o LLM. Uma única varredura ordenada por documento.
+        with self._lock:
+            docs = {r[0]: {"doc_sha": r[0], "doc_id": r[1], "doc_path": r[2], "n_paginas": r[3]}
+                    for r in self._conn.execute("SELECT doc_sha, doc_id, doc_path, n_paginas FROM documents")}
+            rows = self._conn.execute(
+                "SELECT doc_sha, criterio, resultado FROM criterion_results ORDER BY doc_sha, criado").fetchall()
+        atual, resultados = None, {}
+        for sha, criterio, r in rows:
+            if sha != atual:
+                if atual in docs:
+                    yield docs[atual], resultados
+                atual, resultados = sha, {}
+            resultados[criterio] = json.loads(r)
+        if atual in docs:
+            yield docs[atual], resultados
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+_store: Optional[ResultsStore] = None
+_store_lock = threading.Lock()
+
+def get_store() -> Optional[ResultsStore]:
+    # Instância única por processo; None se RESULTS_DB=0.
+    global _store
+    if not RESULTS_DB:
+        return None
+    with _store_lock:
+        if _store is None:
+            _store = ResultsStore()
+        return _store
@@ -0,0 +1,46 @@
+import hashlib, os, uuid
+from pathlib import Path
+from typing import Tuple
+
+from fastapi import UploadFile
+
+# Armazenamento endereçado por conteúdo: uploads/<sha256>/<nome original>.
+# O arquivo é gravado em blocos (memória limitada ao tamanho do bloco) e um
+# upload repetido do mesmo conteúdo reaproveita o arquivo já existente.
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+
+def safe_name(filename: str) -> str:
+    name = Path(filename or "").name
+    return name if name not in ("", ".", "..") else "documento.pdf"
+
+def find_existing(upload_dir: Path, sha: str):
+    d = upload_dir / sha
+    if not d.is_dir():
+        return None
+    return next((p for p in d.iterdir() if p.is_file()), None)
+
+async def store_upload(file: UploadFile, upload_dir: Path) -> Tuple[Path, str, bool]:
+    # Retorna (caminho, sha256, duplicado)
+    upload_dir.mkdir(parents=True, exist_ok=True)
+    tmp = upload_dir / f".{uuid.uuid4().hex}.part"
+    h = hashlib.sha256()
+    try:
+        with tmp.open("wb") as f:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                h.update(chunk)
+                f.write(chunk)
+        sha = h.hexdigest()
+        existing = find_existing(upload_dir, sha)
+        if existing is not None:
+            tmp.unlink()
+            return existing.resolve(), sha, True
+        dest = upload_dir / sha / safe_name(file.filename)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(tmp, dest)
+        return dest.resolve(), sha, False
+    finally:
+        if tmp.exists():
+            tmp.unlink()
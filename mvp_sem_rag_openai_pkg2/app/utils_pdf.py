@@ -1,8 +1,23 @@
-from typing import Dict
-import pdfplumber
-from pypdf import PdfReader
+import os, threading
+import multiprocessing as mp
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Extração paralela: o layout do pdfplumber é CPU-bound, então faixas de páginas
+# são distribuídas entre processos. PDF_WORKERS=1 desliga o pool.
+# pdfplumber/pypdf são importados só quando um PDF é aberto (import de app.main mais leve).
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", "0")) or (os.cpu_count() or 1)
+PDF_CHUNK_SIZE = int(os.getenv("PDF_CHUNK_SIZE", "25"))
+
+# Um pool por número de workers: chamadores com tamanhos diferentes (API e lote no mesmo
+# processo, benchmarks) não derrubam o pool uns dos outros.
+_pools: Dict[int, ProcessPoolExecutor] = {}
+_pool_lock = threading.Lock()
 
 def n_pages(path: str) -> int:
+    import pdfplumber
+    from pypdf import PdfReader
     try:
         with pdfplumber.open(path) as pdf:
             return len(pdf.pages)
@@ -10,18 +25,106 @@ def n_pages(path: str) -> int:
         reader = PdfReader(path)
         return len(reader.pages)
 
-def extract_text_by_page(path: str) -> Dict[int, str]:
-    texts = {}
+def iter_pages(path: str, pages: Optional[Iterable[int]] = None) -> Iterator[Tuple[int, str]]:
+    # Abre o PDF uma vez e decodifica só as páginas pedidas (1-based), em ordem crescente.
+    # O fallback para pypdf é por página: só a página que falhar no pdfplumber é relida.
+    import pdfplumber
+    from pypdf import PdfReader
+    reader = None
+
+    def fallback(i: int) -> str:
+        nonlocal reader
+        try:
+            if reader is None:
+                reader = PdfReader(path)
+            return reader.pages[i - 1].extract_text() or ""
+        except Exception:
+            return ""
+
     try:
-        with pdfplumber.open(path) as pdf:
-            for i, page in enumerate(pdf.pages, start=1):
-                texts[i] = page.extract_text() or ""
-        return texts
+        pdf = pdfplumber.open(path)
     except Exception:
-        reader = PdfReader(path)
-        for i, page in enumerate(reader.pages, start=1):
+        pdf = None
+    try:
+        total = None
+        if pdf is not None:
             try:
-                texts[i] = page.extract_text() or ""
+                # pdfplumber monta a lista de páginas aqui: árvore ilegível => pypdf no documento todo
+                total = len(pdf.pages)
             except Exception:
-                texts[i] = ""
-        return texts
+                try:
+                    pdf.close()  # close() também percorre as páginas
+                except Exception:
+                    pass
+                pdf = None
+        if total is None:
+            reader = PdfReader(path)
+            total = len(reader.pages)
+        wanted = range(1, total + 1) if pages is None else sorted({p for p in pages if 1 <= p <= total})
+        for i in wanted:
+            text = None
+            if pdf is not None:
+                try:
+                    page = pdf.pages[i - 1]
+                    text = page.extract_text() or ""
+                    page.close()  # libera objetos de layout já usados
+                except Exception:
+                    text = None
+            if text is None:
+                text = fallback(i)
+            yield i, text
+    finally:
+        if pdf is not None:
+            pdf.close()
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    with _pool_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            # spawn: seguro mesmo quando o processo pai tem threads (uvicorn)
+            pool = _pools[workers] = ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn"))
+        return pool
+
+def _discard_pool(pool: ProcessPoolExecutor) -> None:
+    # Pool quebrado (um processo filho morreu): sai do registro para a próxima chamada criar outro.
+    # Sem cancel_futures: as chamadas em andamento nele já recebem BrokenProcessPool.
+    with _pool_lock:
+        for w, p in list(_pools.items()):
+            if p is pool:
+                del _pools[w]
+    pool.shutdown(wait=False)
+
+def shutdown_pool() -> None:
+    # Encerramento explícito (fim do processo/benchmark): cancela o que ainda estiver na fila.
+    with _pool_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def _extract_range(path: str, start: int, end: int) -> List[Tuple[int, str]]:
+    return list(iter_pages(path, range(start, end + 1)))
+
+def extract_text_by_page(path: str, workers: Optional[int] = None, chunk_size: Optional[int] = None) -> Dict[int, str]:
+    workers = workers or PDF_WORKERS
+    chunk_size = max(1, chunk_size or PDF_CHUNK_SIZE)
+    if workers <= 1:
+        return dict(iter_pages(path))
+    total = n_pages(path)
+    if total <= chunk_size:
+        return dict(iter_pages(path))
+    starts = list(range(1, total + 1, chunk_size))
+    ends = [min(s + chunk_size - 1, total) for s in starts]
+    texts: Dict[int, str] = {}
+    pool = _get_pool(workers)
+    try:
+        # map preserva a ordem das faixas
+        for part in pool.map(_extract_range, [path] * len(starts), starts, ends):
+            texts.update(part)
+    except BrokenProcessPool:
+        _discard_pool(pool)
+        return dict(iter_pages(path))
+    except (CancelledError, RuntimeError):
+        # Pool encerrado por shutdown_pool durante a chamada: extrai aqui mesmo.
+        return dict(iter_pages(path))
+    return texts
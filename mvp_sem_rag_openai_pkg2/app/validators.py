@@ -1,23 +1,196 @@
-import re
-from typing import List
+import os, re
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
 from .models import CriterionResult, ValidateResponse
+from .metrics import timed
+from .keyword_index import normalize
+from . import page_cache
 
-REGEX_ABNT = re.compile(r'(ABNT\s*(NBR|ISO)?\s*\d{3,5})|(ISO\s*\d{3,5}(-\d+)?)', re.IGNORECASE)
+# Normas em uma única passada: ABNT NBR / ISO / INMETRO / Portaria (grupo nomeado = tipo).
+REGEX_NORMA = re.compile(
+    r"(?P<abnt>\bABNT\s*(?:NBR\s*)?(?:ISO\s*)?\d{3,5}(?:-\d+)?)"
+    r"|(?P<nbr>\bNBR\s*\d{3,5}(?:-\d+)?)"
+    r"|(?P<iso>\bISO\s*\d{3,5}(?:-\d+)?)"
+    r"|(?P<portaria>\bPortaria\s*(?:INMETRO\s*)?(?:n\.?\s*[º°o]?\s*)?\d+(?:/\d{2,4})?)"
+    r"|(?P<inmetro>\bINMETRO\b)",
+    re.IGNORECASE,
+)
+REGEX_ABNT = REGEX_NORMA  # nome antigo
 REGEX_NUMBER = re.compile(r'\b(\d+(?:[\.,]\d+)?)\b')
+REGEX_ELIPSE = re.compile(r"\[?(?:\.\.\.|…)\]?")
+REGEX_NAO_ALNUM = re.compile(r"\W+")
 
-def validate_results(doc_path: str, n_paginas: int, resultados: List[CriterionResult]) -> ValidateResponse:
+# Tolerância da conferência do trecho: até TRECHO_MAX_ERRO * tamanho edições (mín. 1).
+TRECHO_MAX_ERRO = float(os.getenv("TRECHO_MAX_ERRO", "0.15"))
+TRECHO_MIN_CHARS = 8  # partes menores (após normalizar) não são conferidas
+FILTRO_FATIAS = 2
+
+def detect_norms(text: str) -> Dict[str, List[str]]:
+    # tipo (grupo nomeado) -> ocorrências
+    out: Dict[str, List[str]] = {}
+    for m in REGEX_NORMA.finditer(text or ""):
+        out.setdefault(m.lastgroup, []).append(m.group(0))
+    return out
+
+def normalize_match(text: str) -> str:
+    # Sem acentos, maiúsculas, pontuação e variação de espaços.
+    return REGEX_NAO_ALNUM.sub(" ", normalize(text)).strip()
+
+def _min_edit_distance(pattern: str, text: str, limite: int) -> int:
+    # Menor distância de edição entre pattern e qualquer substring de text
+    # (Myers/Hyyrö, bit-paralelo; para cedo ao atingir o limite).
+    m = len(pattern)
+    if m == 0:
+        return 0
+    peq: Dict[str, int] = {}
+    for i, c in enumerate(pattern):
+        peq[c] = peq.get(c, 0) | (1 << i)
+    mask = (1 << m) - 1
+    high = 1 << (m - 1)
+    pv, mv, score, best = mask, 0, m, m
+    for c in text:
+        eq = peq.get(c, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | (~(xh | pv) & mask)
+        mh = pv & xh
+        if ph & high:
+            score += 1
+        elif mh & high:
+            score -= 1
+        ph = (ph << 1) & mask
+        mh = (mh << 1) & mask
+        pv = mh | (~(xv | ph) & mask)
+        mv = ph & xv
+        if score < best:
+            best = score
+            if best <= limite:
+                break
+    return best
+
+def fuzzy_contains(parte: str, pagina: str, max_erro: float = TRECHO_MAX_ERRO) -> bool:
+    # parte e pagina já normalizadas (normalize_match).
+    if parte in pagina:
+        return True
+    k = max(1, int(len(parte) * max_erro))
+    if len(parte) <= k:
+        return True
+    # Filtro (pigeonhole): k edições estragam no máximo k das k+FILTRO_FATIAS fatias, então
+    # pelo menos FILTRO_FATIAS aparecem intactas com início estimado próximo (desvio <= k).
+    # O DP só roda nessas janelas, das mais apoiadas (mais fatias intactas) para as menos.
+    n = k + FILTRO_FATIAS
+    size = len(parte) // n
+    if size < 4:
+        return _min_edit_distance(parte, pagina, k) <= k
+    inicios: List[Tuple[int, int]] = []
+    for i in range(n):
+        fatia = parte[i * size:(i + 1) * size]
+        pos = pagina.find(fatia)
+        while pos >= 0:
+            inicios.append((pos - i * size, i))
+            pos = pagina.find(fatia, pos + 1)
+    inicios.sort()
+    janelas: List[Tuple[int, int, int]] = []
+    j = 0
+    for a in range(len(inicios)):
+        while inicios[a][0] - inicios[j][0] > 2 * k:
+            j += 1
+        suporte = len({i for _, i in inicios[j:a + 1]})
+        if suporte >= FILTRO_FATIAS:
+            janelas.append((-suporte, max(0, inicios[j][0] - k), min(len(pagina), inicios[a][0] + len(parte) + k)))
+    janelas.sort()
+    vistas: List[Tuple[int, int]] = []
+    for _, ini, fim in janelas:
+        if any(a <= ini and fim <= b for a, b in vistas):
+            continue
+        if _min_edit_distance(parte, pagina[ini:fim], k) <= k:
+            return True
+        vistas.append((ini, fim))
+    return False
+
+class PageMatcher:
+    # Confere trechos contra o texto das páginas; normaliza cada página uma vez e memoriza
+    # conferências repetidas (mesmo trecho/página em vários critérios ou resultados).
+    def __init__(self, texts: Mapping[int, str], max_erro: float = TRECHO_MAX_ERRO):
+        self.texts = texts
+        self.max_erro = max_erro
+        self._norm: Dict[int, str] = {}
+        self._memo: Dict[Tuple[int, str], bool] = {}
+
+    def page(self, pagina: int) -> Optional[str]:
+        if pagina not in self._norm:
+            t = self.texts.get(pagina)
+            if t is None:
+                return None
+            self._norm[pagina] = normalize_match(t)
+        return self._norm[pagina]
+
+    def contains(self, pagina: int, trecho: str) -> Optional[bool]:
+        # None = página sem texto disponível (não dá para conferir).
+        key = (pagina, trecho)
+        if key in self._memo:
+            return self._memo[key]
+        texto = self.page(pagina)
+        if texto is None:
+            return None
+        partes = [p for p in (normalize_match(x) for x in REGEX_ELIPSE.split(trecho)) if len(p) >= TRECHO_MIN_CHARS]
+        ok = all(fuzzy_contains(p, texto, self.max_erro) for p in partes)
+        self._memo[key] = ok
+        return ok
+
+def _cached_texts(doc_path: str) -> Optional[Mapping[int, str]]:
+    # Só o que já está no cache de páginas (memória/disco): nunca reextrai o PDF.
+    try:
+        return page_cache.cache.peek(doc_path)
+    except OSError:
+        return None
+
+def _validate(n_paginas: int, resultados: List[CriterionResult], matcher: Optional[PageMatcher]) -> ValidateResponse:
     erros = []
     for r in resultados:
         if r.presenca in {"sim","parcial","nao"} and len(r.evidencias) == 0:
             erros.append(f"{r.criterio}: conclusão sem evidências.")
         for ev in r.evidencias:
-            if not (1 <= ev.pagina <= n_paginas):
+            pagina_ok = 1 <= ev.pagina <= n_paginas
+            trecho_ok = bool(ev.trecho) and len(ev.trecho.strip()) >= 3
+            if not pagina_ok:
                 erros.append(f"{r.criterio}: página inválida {ev.pagina}.")
-            if not ev.trecho or len(ev.trecho.strip()) < 3:
+            if not trecho_ok:
                 erros.append(f"{r.criterio}: trecho de evidência vazio/curto.")
+            if pagina_ok and trecho_ok and matcher is not None and matcher.contains(ev.pagina, ev.trecho) is False:
+                erros.append(f"{r.criterio}: trecho não encontrado na página {ev.pagina}.")
         textos = " ".join([ev.trecho for ev in r.evidencias])
         has_number = bool(REGEX_NUMBER.search(textos))
         if r.presenca == "sim" and not has_number:
-            if not REGEX_ABNT.search(textos):
+            # "INMETRO" sozinho não identifica norma nenhuma: só contam referências numeradas.
+            if not any(tipo != "inmetro" for tipo in detect_norms(textos)):
                 erros.append(f"{r.criterio}: marcou 'sim' sem número ou norma visível.")
     return ValidateResponse(ok=len(erros)==0, erros=erros)
+
+@timed("validate")
+def validate_results(doc_path: str, n_paginas: int, resultados: List[CriterionResult],
+                     texts: Optional[Mapping[int, str]] = None, verificar_trechos: bool = True) -> ValidateResponse:
+    # resultados: CriterionResult ou records.Resultado (mesmos atributos).
+    # texts: texto por página já carregado; se omitido, usa o cache de páginas (sem reextrair).
+    # Sem texto disponível, a conferência dos trechos é pulada.
+    matcher = None
+    if verificar_trechos:
+        texts = texts if texts is not None else _cached_texts(doc_path)
+        matcher = PageMatcher(texts) if texts is not None else None
+    return _validate(n_paginas, resultados, matcher)
+
+@timed("validate")
+def validate_batch(itens: Iterable[Tuple[str, int, List[CriterionResult]]],
+                   verificar_trechos: bool = True) -> List[ValidateResponse]:
+    # Vários (doc_path, n_paginas, resultados): o texto de cada documento é carregado e
+    # normalizado uma vez, e conferências repetidas são memorizadas.
+    matchers: Dict[str, Optional[PageMatcher]] = {}
+    out = []
+    for doc_path, n_paginas, resultados in itens:
+        matcher = None
+        if verificar_trechos:
+            if doc_path not in matchers:
+                texts = _cached_texts(doc_path)
+                matchers[doc_path] = PageMatcher(texts) if texts is not None else None
+            matcher = matchers[doc_path]
+        out.append(_validate(n_paginas, resultados, matcher))
+    return out
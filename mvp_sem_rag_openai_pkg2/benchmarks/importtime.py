@@ -0,0 +1,105 @@
+"""
+Orçamento de tempo de import do serviço (partida a frio de containers e da CLI).
+Roda `python -X importtime` em um processo limpo (menor de N repetições): primeiro importa as
+dependências de base (FastAPI, Pydantic, Jinja2, dotenv), que são o piso da partida em qualquer
+máquina, e depois `app.main`. O orçamento é relativo a esse piso (--orcamento-rel), então vale
+em máquinas mais lentas ou mais rápidas; --orcamento-ms acrescenta um limite absoluto ao total.
+Mostra os imports diretos mais caros e sai com código 1 se o orçamento estourar ou se algum SDK
+que deveria ser carregado só no primeiro uso (provedores LLM, leitores de PDF, OCR) aparecer.
+Uso (a partir de mvp_sem_rag_openai_pkg2/):
+  python -m benchmarks.importtime
+  python -m benchmarks.importtime --modulo app.batch --orcamento-ms 1500 --mostrar 15
+"""
+
+import argparse, os, re, subprocess, sys
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+
+PKG_DIR = Path(__file__).resolve().parents[1]  # mvp_sem_rag_openai_pkg2
+PROIBIDOS = ["google.generativeai", "openai", "pdfplumber", "pypdf", "pytesseract", "pdf2image"]
+BASE = ["fastapi", "fastapi.responses", "pydantic", "jinja2", "dotenv"]
+ORCAMENTO_REL = 0.35  # import próprio do app <= 35% do import das dependências de base
+
+LINHA = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$")
+
+def medir(modulo: str, base: Sequence[str] = ()) -> List[Tuple[int, int, str]]:
+    # (profundidade, cumulativo em µs, módulo) na ordem em que o -X importtime imprime.
+    # Os módulos de base são importados antes, então não entram no cumulativo de `modulo`.
+    env = dict(os.environ, PYTHONPATH=str(PKG_DIR), PYTHONDONTWRITEBYTECODE="")
+    codigo = "".join(f"import {b}; " for b in base) + f"import {modulo}"
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", codigo],
+                          cwd=str(PKG_DIR), env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        print(proc.stderr[-2000:], file=sys.stderr)
+        raise SystemExit(f"import {modulo} falhou (código {proc.returncode})")
+    out = []
+    for l in proc.stderr.splitlines():
+        m = LINHA.match(l)
+        if m:
+            out.append((len(m.group(3)) // 2, int(m.group(2)), m.group(4)))
+    return out
+
+def total_us(linhas: List[Tuple[int, int, str]], modulo: str) -> int:
+    return next((us for prof, us, nome in linhas if prof == 0 and nome == modulo), 0)
+
+def base_us(linhas: List[Tuple[int, int, str]], base: Sequence[str]) -> int:
+    return sum(us for prof, us, nome in linhas if prof == 0 and nome in base)
+
+def medir_relativo(modulo: str, repeticoes: int = 3,
+                   base: Sequence[str] = BASE) -> Tuple[float, float, List[Tuple[int, int, str]]]:
+    # (ms das dependências de base, ms próprios de `modulo`, linhas da medida de menor custo próprio).
+    melhor = None
+    for _ in range(max(1, repeticoes)):
+        linhas = medir(modulo, base)
+        if melhor is None or total_us(linhas, modulo) < total_us(melhor, modulo):
+            melhor = linhas
+    return base_us(melhor, base) / 1000, total_us(melhor, modulo) / 1000, melhor
+
+def filhos_diretos(linhas: List[Tuple[int, int, str]], modulo: str) -> Dict[str, int]:
+    # Filhos são impressos antes do pai, com um nível a mais de indentação.
+    out: Dict[str, int] = {}
+    for i, (prof, _, nome) in enumerate(linhas):
+        if prof == 0 and nome == modulo:
+            j = i - 1
+            while j >= 0 and linhas[j][0] >= 1:
+                if linhas[j][0] == 1:
+                    out[linhas[j][2]] = linhas[j][1]
+                j -= 1
+            break
+    return out
+
+def carregados_proibidos(linhas: List[Tuple[int, int, str]], proibidos: List[str]) -> List[str]:
+    nomes = {nome for _, _, nome in linhas}
+    return [p for p in proibidos if any(n == p or n.startswith(p + ".") for n in nomes)]
+
+def main():
+    ap = argparse.ArgumentParser(description="Confere o tempo de import do serviço contra um orçamento.")
+    ap.add_argument("--modulo", default="app.main")
+    ap.add_argument("--orcamento-rel", type=float, default=ORCAMENTO_REL,
+                    help="Import próprio máximo, como fração do import das dependências de base")
+    ap.add_argument("--orcamento-ms", type=float, default=0, help="Tempo máximo do import total (ms; 0 = sem limite)")
+    ap.add_argument("--repeticoes", type=int, default=3, help="Usa a menor medida (menos ruído)")
+    ap.add_argument("--mostrar", type=int, default=10, help="Imports diretos mais caros a listar")
+    args = ap.parse_args()
+
+    base_ms, proprio_ms, melhor = medir_relativo(args.modulo, args.repeticoes)
+    total_ms = base_ms + proprio_ms
+    rel = proprio_ms / base_ms if base_ms else 0.0
+    print(f"import {args.modulo}: {total_ms:.1f} ms = base {base_ms:.1f} ms ({', '.join(BASE)})"
+          f" + próprio {proprio_ms:.1f} ms ({rel:.0%} da base; orçamento {args.orcamento_rel:.0%})")
+    for nome, us in sorted(filhos_diretos(melhor, args.modulo).items(), key=lambda x: -x[1])[:args.mostrar]:
+        print(f"  {us / 1000:>8.1f} ms  {nome}")
+
+    falhas = []
+    if rel > args.orcamento_rel:
+        falhas.append(f"próprio {proprio_ms:.0f} ms > {args.orcamento_rel:.0%} de {base_ms:.0f} ms")
+    if args.orcamento_ms and total_ms > args.orcamento_ms:
+        falhas.append(f"{total_ms:.0f} ms > {args.orcamento_ms:.0f} ms")
+    proibidos = carregados_proibidos(melhor, PROIBIDOS)
+    if proibidos:
+        falhas.append("importados cedo demais: " + ", ".join(proibidos))
+    if falhas:
+        raise SystemExit("Orçamento de import estourado: " + "; ".join(falhas))
+
+if __name__ == "__main__":
+    main()
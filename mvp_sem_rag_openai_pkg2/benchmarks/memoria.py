@@ -0,0 +1,194 @@
+"""
+Memória por documento aberto em um worker: representação anterior (Dict[int, str] lido do
+.json.gz, cópia normalizada str por página, modelos Pydantic) vs PageStore + records, com o
+cache em .json.gz no heap ("store", PAGE_CACHE_MMAP=0) ou em .pages mapeado em memória
+("mmap", o padrão).
+Cada modo roda em um subprocesso que mantém todos os documentos abertos ao mesmo tempo (como
+um worker com várias análises concorrentes) e mede o RSS por documento (total e anônimo; no
+mmap o texto conta como RSS de arquivo, compartilhado e descartável pelo SO). Depois libera
+tudo e mede o RSS que ficou retido (fragmentação do heap).
+Uso (a partir de mvp_sem_rag_openai_pkg2/):
+  python -m benchmarks.memoria --docs 8 --paginas 300
+  python -m benchmarks.memoria --docs 8 --paginas 300 --tipografia
+"""
+
+import argparse, gc, gzip, json, os, subprocess, sys, tempfile, tracemalloc
+from pathlib import Path
+from typing import Dict, List, Optional
+
+PKG_DIR = Path(__file__).resolve().parents[1]
+MODOS = ["dict", "store", "mmap"]
+EVIDENCIAS_POR_CRITERIO = 3
+
+def _status_kb() -> Dict[str, int]:
+    # VmRSS / VmHWM (pico) / RssAnon / RssFile (Linux); vazio em outros sistemas.
+    out = {}
+    try:
+        for l in Path("/proc/self/status").read_text().splitlines():
+            k, _, v = l.partition(":")
+            if k in ("VmRSS", "VmHWM", "RssAnon", "RssFile"):
+                out[k] = int(v.split()[0])
+    except OSError:
+        pass
+    return out
+
+def _zerar_pico() -> bool:
+    # Zera o VmHWM (Linux >= 4.0) para medir só o pico da etapa seguinte.
+    try:
+        Path("/proc/self/clear_refs").write_text("5")
+        return True
+    except OSError:
+        return False
+
+def _resultados(texts, criterios: List[str]) -> List[dict]:
+    # Resultados sintéticos com trechos reais das páginas (mesmo volume para todos os modos).
+    paginas = sorted(texts)
+    out = []
+    for i, c in enumerate(criterios):
+        evid = []
+        for j in range(EVIDENCIAS_POR_CRITERIO):
+            p = paginas[(i * EVIDENCIAS_POR_CRITERIO + j) % len(paginas)]
+            evid.append({"doc": "edital.pdf", "pagina": p, "trecho": texts[p][:200]})
+        out.append({"criterio": c, "presenca": "parcial", "risco_greenwashing": "medio",
+                    "evidencias": evid, "observacoes": "Trechos conferidos."})
+    return out
+
+def _abrir(modo: str, pdf: str, cache, criterios: List[str]):
+    # Um documento "em análise": texto das páginas, texto normalizado (índice) e resultado consolidado.
+    from app.keyword_index import normalize
+    if modo == "dict":
+        from app.models import CriterionResult
+        from app.aggregator import consolidate
+        with gzip.open(cache._disk_path(cache.doc_hash(pdf)), "rt", encoding="utf-8") as f:
+            texts = {int(k): v for k, v in json.load(f).items()}
+        norm = {p: normalize(t) for p, t in texts.items()}
+        cons = consolidate(Path(pdf).stem, [CriterionResult(**r) for r in _resultados(texts, criterios)])
+    else:
+        from app.page_store import PageStore
+        from app.records import Resultado
+        from app.aggregator import consolidate_records
+        texts = cache.get(pdf)
+        norm = PageStore.from_texts((p, normalize(texts[p])) for p in texts)
+        cons = consolidate_records(Path(pdf).stem, [Resultado.from_dict(r) for r in _resultados(texts, criterios)])
+    return texts, norm, cons
+
+def medir_modo(modo: str, pdfs: List[str], cache_dir: str) -> dict:
+    # Roda no subprocesso (processo limpo por modo).
+    from app import page_cache
+    from app.aggregator import DEFAULT_WEIGHTS
+    criterios = list(DEFAULT_WEIGHTS)
+    cache = page_cache.PageTextCache(Path(cache_dir), max_bytes=1 << 40, use_mmap=modo == "mmap")
+    for pdf in pdfs:
+        cache.doc_hash(pdf)
+    gc.collect()
+    tem_pico = _zerar_pico()
+    antes = _status_kb()
+    abertos = [_abrir(modo, pdf, cache, criterios) for pdf in pdfs]
+    gc.collect()
+    durante = _status_kb()
+    n_paginas = sum(len(t) for t, _, _ in abertos)
+    del abertos
+    cache.clear_memory()
+    gc.collect()
+    depois = _status_kb()
+
+    # Só os resultados (objetos Python), medidos à parte com tracemalloc.
+    tracemalloc.start()
+    texto = {1: "x" * 400}
+    amostra = [_abrir_resultados(modo, texto, criterios) for _ in range(200)]
+    resultados_kb = tracemalloc.get_traced_memory()[0] / 1024 / len(amostra)
+    tracemalloc.stop()
+    del amostra
+
+    n = len(pdfs)
+    def por_doc(chave: str, fim: Dict[str, int]) -> float:
+        return round((fim.get(chave, 0) - antes.get(chave, 0)) / 1024 / n, 2) if chave in antes else None
+    return {
+        "docs": n, "paginas": n_paginas,
+        "rss_mb_por_doc": por_doc("VmRSS", durante),
+        "anon_mb_por_doc": por_doc("RssAnon", durante),
+        "arquivo_mb_por_doc": por_doc("RssFile", durante),
+        "pico_mb_por_doc": round((durante["VmHWM"] - antes["VmRSS"]) / 1024 / n, 2) if tem_pico else None,
+        "retido_mb_por_doc": por_doc("RssAnon", depois),
+        "resultados_kb_por_doc": round(resultados_kb, 2),
+    }
+
+def _abrir_resultados(modo: str, texts, criterios: List[str]):
+    if modo == "dict":
+        from app.models import CriterionResult
+        from app.aggregator import consolidate
+        return consolidate("d", [CriterionResult(**r) for r in _resultados(texts, criterios)])
+    from app.records import Resultado
+    from app.aggregator import consolidate_records
+    return consolidate_records("d", [Resultado.from_dict(r) for r in _resultados(texts, criterios)])
+
+def preparar_caches(pdfs: List[str], work: Path, src_dir: Optional[Path] = None) -> Dict[str, str]:
+    # Extrai uma vez (ou lê de src_dir, um cache já existente em qualquer formato) e grava o
+    # mesmo texto em .json.gz e em .pages; cada modo lê do seu diretório.
+    from app import page_cache
+    from app.page_store import PageStore
+    src = page_cache.PageTextCache(src_dir, use_mmap=False) if src_dir else None
+    gz = page_cache.PageTextCache(work / "cache_gz", use_mmap=False, disk_max_bytes=0, disk_max_age=0)
+    raw = page_cache.PageTextCache(work / "cache_raw", use_mmap=True, disk_max_bytes=0, disk_max_age=0)
+    raw.cache_dir.mkdir(parents=True, exist_ok=True)
+    for pdf in pdfs:
+        sha = gz.doc_hash(pdf)
+        texts = (src or gz).get(pdf)
+        if not gz._disk_path(sha).exists():
+            gz._save_disk(sha, dict(texts.items()))
+        if not raw._raw_path(sha).exists():
+            PageStore.from_texts(texts).save(raw._raw_path(sha))
+        gz.clear_memory()
+        if src is not None:
+            src.clear_memory()
+    return {"dict": str(gz.cache_dir), "store": str(gz.cache_dir), "mmap": str(raw.cache_dir)}
+
+def comparar_modos(pdfs: List[str], work: Path, src_dir: Optional[Path] = None) -> Dict[str, dict]:
+    dirs = preparar_caches(pdfs, work, src_dir)
+    out = {}
+    for modo in MODOS:
+        env = dict(os.environ, PYTHONPATH=str(PKG_DIR), OCR_ENABLED="0")
+        proc = subprocess.run([sys.executable, "-m", "benchmarks.memoria", "--medir", modo,
+                               "--cache-dir", dirs[modo], *pdfs],
+                              cwd=str(PKG_DIR), env=env, capture_output=True, text=True)
+        if proc.returncode != 0:
+            print(proc.stderr[-2000:], file=sys.stderr)
+            raise SystemExit(f"medição de memória ({modo}) falhou")
+        out[modo] = json.loads(proc.stdout.strip().splitlines()[-1])
+    return out
+
+def imprimir(res: Dict[str, dict]) -> None:
+    cols = [("rss_mb_por_doc", "RSS/doc"), ("anon_mb_por_doc", "anôn./doc"), ("arquivo_mb_por_doc", "arq./doc"),
+            ("pico_mb_por_doc", "pico/doc"), ("retido_mb_por_doc", "retido/doc"), ("resultados_kb_por_doc", "result. KB")]
+    print(f"\n{'memória (MB)':<14}" + "".join(f"{t:>12}" for _, t in cols))
+    for modo, m in res.items():
+        print(f"{modo:<14}" + "".join(f"{'-' if m[k] is None else m[k]:>12}" for k, _ in cols))
+
+def main():
+    ap = argparse.ArgumentParser(description="Compara a memória por documento entre as representações de texto.")
+    ap.add_argument("pdfs", nargs="*", help="PDFs a usar (padrão: editais sintéticos)")
+    ap.add_argument("--docs", type=int, default=8)
+    ap.add_argument("--paginas", type=int, default=300)
+    ap.add_argument("--densidade", type=float, default=0.05)
+    ap.add_argument("--tipografia", action="store_true", help="Editais com – e • (texto fora do Latin-1)")
+    ap.add_argument("--workdir", default="", help="Pasta de trabalho (padrão: temporária)")
+    ap.add_argument("--medir", choices=MODOS, help=argparse.SUPPRESS)
+    ap.add_argument("--cache-dir", default="", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.medir:
+        print(json.dumps(medir_modo(args.medir, args.pdfs, args.cache_dir)))
+        return
+    os.environ.setdefault("OCR_ENABLED", "0")
+    work = Path(args.workdir) if args.workdir else Path(tempfile.mkdtemp(prefix="bench_mem_"))
+    work.mkdir(parents=True, exist_ok=True)
+    pdfs = args.pdfs
+    if not pdfs:
+        from .synth_pdf import gerar_edital
+        (work / "editais").mkdir(exist_ok=True)
+        pdfs = [gerar_edital(str(work / "editais" / f"MEM-{i:04d}.pdf"), args.paginas, args.densidade, i, args.tipografia)
+                for i in range(args.docs)]
+    imprimir(comparar_modos([str(Path(p).resolve()) for p in pdfs], work))
+
+if __name__ == "__main__":
+    main()
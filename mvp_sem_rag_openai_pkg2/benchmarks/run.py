@@ -0,0 +1,249 @@
+"""
+Benchmark de throughput/latência com editais sintéticos e o provedor MOCK (latência simulada).
+Etapas: extract (extract_text_by_page pelo cache de páginas frio), scan (POST /scan), evaluate (POST /evaluate),
+validate (validate_results), consolidate e compute_metrics (compute_metrics.py em subprocesso).
+Também compara a memória por documento aberto entre as representações de texto/resultados
+(benchmarks.memoria: dict anterior, PageStore, PageStore com mmap).
+Mostra docs/s, latência p50/p95/p99 por operação e pico de RSS; grava o resultado em JSON
+para comparar execuções (--comparar sai com código 1 se alguma etapa piorar além da tolerância).
+Uso (a partir de mvp_sem_rag_openai_pkg2/):
+  python -m benchmarks.run --docs 10 --paginas 80 --latencia-ms 50 --jitter-ms 20 --saida benchmarks/baseline.json
+  python -m benchmarks.run --docs 10 --paginas 80 --latencia-ms 50 --jitter-ms 20 --comparar benchmarks/baseline.json
+"""
+
+import argparse, csv, json, os, platform, random, resource, subprocess, sys, tempfile, time
+from contextlib import ExitStack
+from pathlib import Path
+from typing import Dict, List
+
+from .synth_pdf import gerar_edital
+from . import memoria
+
+ROOT = Path(__file__).resolve().parents[2]  # raiz do repositório (compute_metrics.py)
+METRICAS_COMPARADAS = {"p50_ms": 1, "p95_ms": 1, "docs_por_s": -1}  # 1 = menor é melhor
+
+def percentil(valores: List[float], q: float) -> float:
+    # Interpolação linear entre as ordens (mesmo critério do numpy.percentile padrão).
+    if not valores:
+        return 0.0
+    v = sorted(valores)
+    pos = (len(v) - 1) * q / 100
+    i = int(pos)
+    j = min(i + 1, len(v) - 1)
+    return v[i] + (v[j] - v[i]) * (pos - i)
+
+def pico_rss_mb(quem: int = resource.RUSAGE_SELF) -> float:
+    kb = resource.getrusage(quem).ru_maxrss
+    return kb / (1024 * 1024) if sys.platform == "darwin" else kb / 1024  # macOS informa em bytes
+
+class Etapa:
+    def __init__(self, nome: str, n_docs: int):
+        self.nome, self.n_docs = nome, n_docs
+        self.latencias: List[float] = []
+        self.t0 = time.perf_counter()
+        self.total = 0.0
+
+    def medir(self, fn, *args, **kwargs):
+        t = time.perf_counter()
+        out = fn(*args, **kwargs)
+        self.latencias.append(time.perf_counter() - t)
+        return out
+
+    def fim(self) -> dict:
+        self.total = time.perf_counter() - self.t0
+        ms = [x * 1000 for x in self.latencias]
+        return {
+            "operacoes": len(ms),
+            "total_s": round(self.total, 4),
+            "docs_por_s": round(self.n_docs / self.total, 3) if self.total > 0 else 0.0,
+            "p50_ms": round(percentil(ms, 50), 3),
+            "p95_ms": round(percentil(ms, 95), 3),
+            "p99_ms": round(percentil(ms, 99), 3),
+            "pico_rss_mb": round(pico_rss_mb(), 1),
+        }
+
+def configurar_ambiente(work: Path, args) -> None:
+    # Precisa rodar antes de importar app.*: a configuração é lida no import.
+    os.environ.update({
+        "LLM_PROVIDER": "MOCK",
+        "LLM_CACHE": "0",
+        "MOCK_LATENCY_MS": str(args.latencia_ms),
+        "MOCK_JITTER_MS": str(args.jitter_ms),
+        "PAGE_CACHE_DIR": str(work / ".page_cache"),
+        "UPLOAD_DIR": str(work / "uploads"),
+        "JOBS_WORKERS": "0",
+        "JOBS_DB_PATH": str(work / "jobs.sqlite3"),
+        "OCR_ENABLED": "0",
+    })
+    if args.pdf_workers:
+        os.environ["PDF_WORKERS"] = str(args.pdf_workers)
+
+def gravar_ouro(path: Path, consolidados: List[dict], seed: int) -> None:
+    # Rótulos "ouro" sintéticos: as respostas do MOCK com parte dos rótulos trocada.
+    rng = random.Random(seed)
+    ufs = ["RJ", "SP", "PA", "MG", "RR"]
+    with path.open("w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["doc_id", "orgao", "uf", "data", "criterio", "presenca", "paginas_evidencia",
+                    "observacoes", "risco_greenwashing"])
+        for i, c in enumerate(consolidados):
+            uf = ufs[i % len(ufs)]
+            for r in c["resultados"]:
+                presenca = r["presenca"] if rng.random() < 0.7 else rng.choice(["sim", "parcial", "nao"])
+                w.writerow([c["doc_id"], f"ORG-{uf}", uf, f"2025-{1 + i % 12:02d}-15", r["criterio"], presenca,
+                            "", "", r["risco_greenwashing"]])
+
+def executar(args) -> dict:
+    work = Path(args.workdir) if args.workdir else Path(tempfile.mkdtemp(prefix="bench_"))
+    work.mkdir(parents=True, exist_ok=True)
+    configurar_ambiente(work, args)
+
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app import page_cache
+    from app.utils_pdf import shutdown_pool
+    from app.criteria import DEFAULT_KEYWORDS
+    from app.models import CriterionResult
+    from app.validators import validate_results
+    from app.aggregator import DEFAULT_WEIGHTS, consolidate
+    from app.batch import save_document
+
+    docs_dir = work / "editais"
+    docs_dir.mkdir(exist_ok=True)
+    docs = [gerar_edital(str(docs_dir / f"SYN-{i:04d}.pdf"), args.paginas, args.densidade, args.seed + i)
+            for i in range(args.docs)]
+    n = len(docs)
+    etapas: Dict[str, dict] = {}
+    pilha = ExitStack()
+    client = pilha.enter_context(TestClient(app))  # roda o lifespan (clientes LLM)
+
+    # Cache frio: get_page_texts chama extract_text_by_page e deixa o texto em cache,
+    # como o /upload faz em segundo plano; scan/evaluate medem o caminho com cache.
+    e = Etapa("extract", n)
+    n_paginas = {d: len(e.medir(page_cache.get_page_texts, d)) for d in docs}
+    etapas["extract"] = e.fim()
+
+    e = Etapa("scan", n)
+    paginas: Dict[str, Dict[str, List[int]]] = {}
+    for d in docs:
+        paginas[d] = {}
+        for crit, kws in DEFAULT_KEYWORDS.items():
+            r = e.medir(client.post, "/scan", json={"doc_path": d, "criterio": crit, "palavras_chave": kws,
+                                                     "max_paginas": args.max_paginas})
+            r.raise_for_status()
+            paginas[d][crit] = r.json()["paginas"]
+    etapas["scan"] = e.fim()
+
+    e = Etapa("evaluate", n)
+    resultados: Dict[str, List[CriterionResult]] = {}
+    for d in docs:
+        resultados[d] = []
+        for crit, kws in DEFAULT_KEYWORDS.items():
+            r = e.medir(client.post, "/evaluate", json={"doc_path": d, "criterio": crit,
+                                                         "paginas": paginas[d][crit], "palavras_chave": kws})
+            r.raise_for_status()
+            resultados[d].append(CriterionResult(**dict(r.json(), criterio=crit)))
+    etapas["evaluate"] = e.fim()
+
+    e = Etapa("validate", n)
+    for d in docs:
+        e.medir(validate_results, d, n_paginas[d], resultados[d])
+    etapas["validate"] = e.fim()
+
+    e = Etapa("consolidate", n)
+    consolidados = [e.medir(consolidate, Path(d).stem, resultados[d], None).model_dump() for d in docs]
+    etapas["consolidate"] = e.fim()
+
+    script = ROOT / "compute_metrics.py"
+    if script.exists():
+        out_dir = work / "outputs"
+        for c in consolidados:
+            save_document(out_dir, c)
+        gravar_ouro(work / "rotulos_ouro.csv", consolidados, args.seed)
+        (work / "pesos.json").write_text(json.dumps(DEFAULT_WEIGHTS), encoding="utf-8")
+        e = Etapa("compute_metrics", n)
+        cmd = [sys.executable, str(script), "--root", str(work), "--bootstrap", str(args.bootstrap), "--workers", "1"]
+        proc = e.medir(subprocess.run, cmd, capture_output=True, text=True)
+        if proc.returncode != 0:
+            print(proc.stderr[-2000:], file=sys.stderr)
+            raise SystemExit(f"compute_metrics.py falhou (código {proc.returncode})")
+        etapas["compute_metrics"] = e.fim()
+    else:
+        print(f"[WARN] {script} não encontrado; etapa compute_metrics pulada.")
+    pilha.close()
+    shutdown_pool()
+    mem = memoria.comparar_modos(docs, work, page_cache.cache.cache_dir) if args.memoria else {}
+
+    return {
+        "versao": 1,
+        "criado_em": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {k: getattr(args, k) for k in ("docs", "paginas", "densidade", "latencia_ms", "jitter_ms",
+                                                   "max_paginas", "bootstrap", "seed", "pdf_workers")},
+        "ambiente": {"python": platform.python_version(), "plataforma": platform.platform(), "cpus": os.cpu_count()},
+        "etapas": etapas,
+        "pico_rss_mb": {"processo": round(pico_rss_mb(), 1),
+                        "filhos": round(pico_rss_mb(resource.RUSAGE_CHILDREN), 1)},
+        "memoria": mem,
+    }
+
+def imprimir(res: dict) -> None:
+    print(f"{'etapa':<16}{'ops':>6}{'docs/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'RSS MB':>9}")
+    for nome, e in res["etapas"].items():
+        print(f"{nome:<16}{e['operacoes']:>6}{e['docs_por_s']:>10.2f}{e['p50_ms']:>10.2f}"
+              f"{e['p95_ms']:>10.2f}{e['p99_ms']:>10.2f}{e['pico_rss_mb']:>9.1f}")
+    print(f"Pico de RSS: processo {res['pico_rss_mb']['processo']} MB, filhos {res['pico_rss_mb']['filhos']} MB")
+    if res.get("memoria"):
+        memoria.imprimir(res["memoria"])
+
+def comparar(atual: dict, base: dict, tolerancia: float) -> List[str]:
+    # Devolve as regressões (piora relativa acima da tolerância) por etapa/métrica.
+    if atual["config"] != base["config"]:
+        print("[WARN] configurações diferentes; a comparação pode não ser válida.")
+    regressoes = []
+    print(f"\n{'etapa':<16}{'métrica':<12}{'base':>12}{'atual':>12}{'var.':>9}")
+    for nome, e in atual["etapas"].items():
+        b = base.get("etapas", {}).get(nome)
+        if not b:
+            continue
+        for m, sentido in METRICAS_COMPARADAS.items():
+            if not b[m]:
+                continue
+            var = (e[m] - b[m]) / b[m]
+            piorou = var * sentido > tolerancia
+            print(f"{nome:<16}{m:<12}{b[m]:>12.3f}{e[m]:>12.3f}{var:>+9.1%}{'  <- regressão' if piorou else ''}")
+            if piorou:
+                regressoes.append(f"{nome}.{m}")
+    return regressoes
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark do pipeline com editais sintéticos e LLM MOCK.")
+    ap.add_argument("--docs", type=int, default=5)
+    ap.add_argument("--paginas", type=int, default=60, help="Páginas por edital")
+    ap.add_argument("--densidade", type=float, default=0.05, help="Fração das linhas com palavras-chave")
+    ap.add_argument("--latencia-ms", type=float, default=50, help="Latência simulada por chamada ao LLM")
+    ap.add_argument("--jitter-ms", type=float, default=10, help="Variação uniforme (±) da latência")
+    ap.add_argument("--max-paginas", type=int, default=6)
+    ap.add_argument("--bootstrap", type=int, default=200, help="Reamostragens no compute_metrics.py")
+    ap.add_argument("--pdf-workers", type=int, default=0, help="PDF_WORKERS (0 = padrão do app)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--workdir", default="", help="Pasta de trabalho (padrão: temporária)")
+    ap.add_argument("--sem-memoria", dest="memoria", action="store_false",
+                    help="Não roda a comparação de memória (benchmarks.memoria)")
+    ap.add_argument("--saida", default="", help="Grava o resultado (JSON) neste arquivo")
+    ap.add_argument("--comparar", default="", help="JSON de uma execução anterior (baseline)")
+    ap.add_argument("--tolerancia", type=float, default=0.15, help="Piora relativa aceita na comparação")
+    args = ap.parse_args()
+
+    res = executar(args)
+    imprimir(res)
+    if args.saida:
+        Path(args.saida).write_text(json.dumps(res, ensure_ascii=False, indent=2), encoding="utf-8")
+        print("Resultado gravado em", args.saida)
+    if args.comparar:
+        base = json.loads(Path(args.comparar).read_text(encoding="utf-8"))
+        regressoes = comparar(res, base, args.tolerancia)
+        if regressoes:
+            raise SystemExit(f"Regressões acima de {args.tolerancia:.0%}: {', '.join(regressoes)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Gerador de editais sintéticos (PDF com camada de texto) para os benchmarks.
+Escreve o PDF diretamente (Helvetica + WinAnsiEncoding, streams com FlateDecode),
+sem depender de reportlab. A densidade é a fração de linhas com frases que contêm
+palavras-chave dos critérios; o resto é texto administrativo genérico. Com --tipografia,
+usa travessões e marcadores (– •), comuns em editais reais e fora do Latin-1.
+Uso:
+  python -m benchmarks.synth_pdf saida.pdf --paginas 120 --densidade 0.05 --seed 1
+"""
+
+import argparse, random, zlib
+from pathlib import Path
+from typing import List
+
+LINHAS_POR_PAGINA = 48
+
+FRASES_CRITERIO = {
+    "eficiencia_energetica": [
+        "Os equipamentos deverão possuir Etiqueta Nacional de Conservação de Energia (ENCE) classe A.",
+        "Eficiência energética mínima de {n} lm/W, comprovada por relatório de ensaio.",
+        "Consumo de energia máximo de {n} kWh/mês, com Selo Procel.",
+    ],
+    "normas_tecnicas": [
+        "O produto deve atender à ABNT NBR {n}:20{a} e às normas técnicas vigentes.",
+        "Certificação conforme Portaria INMETRO nº {n}/20{a}.",
+        "Conformidade com a ISO {n} comprovada por organismo acreditado.",
+    ],
+    "emissoes": [
+        "Os veículos deverão atender aos limites de emissões de poluentes (CO2 até {n} g/km).",
+        "A contratada apresentará inventário de gases de efeito estufa e plano de redução de carbono.",
+    ],
+    "uso_de_agua": [
+        "Torneiras com vazão máxima de {n} L/min e dispositivo de economia de água.",
+        "Sistema de reuso de água e redução do consumo hídrico em {n}%.",
+    ],
+    "materiais_reciclabilidade": [
+        "Embalagens recicláveis e logística reversa dos resíduos gerados.",
+        "Ao menos {n}% de material reciclado ou biodegradável na composição.",
+    ],
+    "rotulagem": [
+        "O produto deverá possuir selo ou rótulo ambiental tipo I (certificação ambiental).",
+        "Rotulagem ambiental reconhecida, como Ecolabel, ou etiqueta equivalente.",
+    ],
+}
+
+FRASES_GENERICAS = [
+    "A licitante deverá apresentar a documentação de habilitação jurídica e fiscal.",
+    "O prazo de entrega será de {n} dias corridos a contar da emissão da ordem de fornecimento.",
+    "As propostas serão julgadas pelo critério de menor preço por item.",
+    "O pagamento será efetuado em até {n} dias após o atesto da nota fiscal.",
+    "Os recursos deverão ser interpostos no prazo legal, por meio do sistema eletrônico.",
+    "A garantia dos produtos será de, no mínimo, {n} meses a contar do recebimento definitivo.",
+    "Aplicam-se as sanções previstas na Lei nº 14.133/2021 em caso de inexecução contratual.",
+    "A fiscalização do contrato ficará a cargo de servidor designado pela administração.",
+]
+
+def _fill(frase: str, rng: random.Random) -> str:
+    return frase.format(n=rng.randint(10, 20000), a=rng.randint(10, 24))
+
+def gerar_linhas(paginas: int, densidade: float, seed: int = 0, tipografia: bool = False) -> List[List[str]]:
+    rng = random.Random(seed)
+    criterios = list(FRASES_CRITERIO)
+    traco, marcador = ("–", "• ") if tipografia else ("-", "")
+    out = []
+    for p in range(1, paginas + 1):
+        linhas = [f"EDITAL DE PREGÃO ELETRÔNICO {traco} Página {p}"]
+        for _ in range(LINHAS_POR_PAGINA - 1):
+            if rng.random() < densidade:
+                linhas.append(marcador + _fill(rng.choice(FRASES_CRITERIO[rng.choice(criterios)]), rng))
+            else:
+                linhas.append(_fill(rng.choice(FRASES_GENERICAS), rng))
+        out.append(linhas)
+    return out
+
+def _escape(s: str) -> bytes:
+    b = s.encode("cp1252", errors="replace")
+    return b.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+def _content(linhas: List[str]) -> bytes:
+    parts = [b"BT /F1 9 Tf 13 TL 36 806 Td"]
+    for i, l in enumerate(linhas):
+        parts.append((b"" if i == 0 else b"T* ") + b"(" + _escape(l) + b") Tj")
+    parts.append(b"ET")
+    return b"\n".join(parts)
+
+def write_pdf(path: str, paginas_linhas: List[List[str]]) -> str:
+    n = len(paginas_linhas)
+    # Objetos: 1 catálogo, 2 páginas, 3 fonte, depois pares (página, conteúdo).
+    objs: List[bytes] = [b"", b"", b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>"]
+    kids = []
+    for linhas in paginas_linhas:
+        page_no, content_no = len(objs) + 1, len(objs) + 2
+        kids.append(f"{page_no} 0 R")
+        objs.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Resources << /Font << /F1 3 0 R >> >>"
+                    f" /Contents {content_no} 0 R >>".encode())
+        data = zlib.compress(_content(linhas))
+        objs.append(f"<< /Length {len(data)} /Filter /FlateDecode >>\nstream\n".encode() + data + b"\nendstream")
+    objs[0] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    objs[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {n} >>".encode()
+
+    buf = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for i, o in enumerate(objs, 1):
+        offsets.append(len(buf))
+        buf += f"{i} 0 obj\n".encode() + o + b"\nendobj\n"
+    xref = len(buf)
+    buf += f"xref\n0 {len(objs) + 1}\n0000000000 65535 f \n".encode()
+    for off in offsets:
+        buf += f"{off:010d} 00000 n \n".encode()
+    buf += f"trailer\n<< /Size {len(objs) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    Path(path).write_bytes(bytes(buf))
+    return path
+
+def gerar_edital(path: str, paginas: int = 60, densidade: float = 0.05, seed: int = 0, tipografia: bool = False) -> str:
+    return write_pdf(path, gerar_linhas(paginas, densidade, seed, tipografia))
+
+def main():
+    ap = argparse.ArgumentParser(description="Gera um edital sintético em PDF.")
+    ap.add_argument("saida")
+    ap.add_argument("--paginas", type=int, default=60)
+    ap.add_argument("--densidade", type=float, default=0.05, help="Fração das linhas com palavras-chave (0-1)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--tipografia", action="store_true", help="Travessões e marcadores (– •) no texto")
+    args = ap.parse_args()
+    gerar_edital(args.saida, args.paginas, args.densidade, args.seed, args.tipografia)
+    print(args.saida)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Gravação retomável do lote: resultados.json (marca de concluído) vem antes da linha do
+summary.csv, e o reconcile_summary recupera linhas faltando e remove linhas repetidas.
+Uso (a partir da raiz do repositório):
+  python -m pytest -q tests/test_batch.py
+"""
+
+import csv, sys
+from pathlib import Path
+
+import pytest
+
+PKG_DIR = Path(__file__).resolve().parents[1] / "mvp_sem_rag_openai_pkg2"
+sys.path.insert(0, str(PKG_DIR))
+pytest.importorskip("fastapi")
+from app import batch  # noqa: E402
+
+def _cons(doc_id: str, escore: float) -> dict:
+    return {"doc_id": doc_id, "escore_aderencia": escore, "resultados": [{"criterio": "agua"}],
+            "flags": {"greenwashing_alto": [], "itens_insuficientes": ["agua"], "erros_validacao": []}}
+
+def _summary(out: Path) -> list:
+    with (out / "summary.csv").open(newline="", encoding="utf-8") as f:
+        return [(r["doc_id"], r["escore_aderencia"]) for r in csv.DictReader(f)]
+
+def test_summary_gravado_depois_do_resultado(tmp_path, monkeypatch):
+    def interrompe(out_dir, rows):
+        raise KeyboardInterrupt
+    monkeypatch.setattr(batch, "append_summary", interrompe)
+    with pytest.raises(KeyboardInterrupt):
+        batch.save_document(tmp_path, _cons("A", 50.0))
+    assert batch.result_path(tmp_path, "A").exists()
+    monkeypatch.undo()
+    # Próxima execução: A está concluído e sua linha é recuperada, uma única vez.
+    batch.reconcile_summary(tmp_path, ["A"])
+    batch.reconcile_summary(tmp_path, ["A"])
+    assert _summary(tmp_path) == [("A", "50.0")]
+
+def test_reconcile_remove_repetidos(tmp_path):
+    for doc_id, escore in (("A", 10.0), ("B", 20.0), ("A", 30.0)):
+        batch.save_document(tmp_path, _cons(doc_id, escore))
+    batch.save_document(tmp_path, _cons("C", 40.0))
+    (tmp_path / "summary.csv").write_text(
+        (tmp_path / "summary.csv").read_text(encoding="utf-8").replace("C,40.0", "C,40.0\nC,40.0"), encoding="utf-8")
+    (tmp_path / "D").mkdir()
+    (tmp_path / "D" / "consolidado.json").write_text(
+        '{"doc_id": "D", "escore_aderencia": 5.0, "flags": {}}', encoding="utf-8")
+    batch.reconcile_summary(tmp_path, ["A", "B", "C", "D"])
+    assert _summary(tmp_path) == [("B", "20.0"), ("A", "30.0"), ("C", "40.0"), ("D", "5.0")]
@@ -0,0 +1,106 @@
+"""
+Regressão do compute_metrics vetorizado: compara escores ponderados e F1 macro com as
+implementações anteriores (loops linha a linha, copiadas abaixo como oráculo) em conjuntos
+ouro/predição aleatórios.
+Uso (a partir da raiz do repositório):
+  python -m pytest -q tests/test_compute_metrics.py
+"""
+
+import json, sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+import compute_metrics as cm  # noqa: E402
+
+ROTULOS = ["sim", "parcial", "nao", "insuficiente", "", "desconhecido"]
+PESOS = json.loads((ROOT / "pesos.json").read_text(encoding="utf-8"))
+CRITERIOS = list(PESOS) + ["sem_peso"]
+
+# --- oráculo: versão anterior (loops) ---------------------------------------------------
+
+def _scores_loop(df: pd.DataFrame, pesos: dict, presenca_col: str, out_col: str) -> pd.DataFrame:
+    rows = []
+    for (doc_id), g in df.groupby("doc_id"):
+        total_w = 0.0
+        acc = 0.0
+        for _, r in g.iterrows():
+            criterio = r["criterio"]
+            w = float(pesos.get(criterio, 0.0))
+            total_w += w
+            acc += w * cm.SCORE_MAP.get(r[presenca_col], 0.0)
+        score = 0.0 if total_w == 0 else 100.0 * acc / total_w
+        rows.append({"doc_id": doc_id, out_col: round(score, 2)})
+    return pd.DataFrame(rows)
+
+def _f1_macro_loop(y_true: list, y_pred: list, labels=("sim", "parcial", "nao")) -> float:
+    def f1_for_label(lbl):
+        tp = sum((yt == lbl) and (yp == lbl) for yt, yp in zip(y_true, y_pred))
+        fp = sum((yt != lbl) and (yp == lbl) for yt, yp in zip(y_true, y_pred))
+        fn = sum((yt == lbl) and (yp != lbl) for yt, yp in zip(y_true, y_pred))
+        if tp == 0 and (fp > 0 or fn > 0):
+            return 0.0
+        if tp == 0 and fp == 0 and fn == 0:
+            return 0.0
+        prec = tp / (tp + fp) if (tp + fp) > 0 else 0.0
+        rec = tp / (tp + fn) if (tp + fn) > 0 else 0.0
+        if prec + rec == 0:
+            return 0.0
+        return 2 * prec * rec / (prec + rec)
+    return float(np.mean([f1_for_label(lbl) for lbl in labels]))
+
+# --- dados aleatórios ------------------------------------------------------------------
+
+def _pesos(rng: np.random.Generator, seed: int) -> dict:
+    # Metade das rodadas usa o pesos.json; as outras, pesos múltiplos de 0,05 (como os reais,
+    # sem representação exata em binário: expõem diferenças na ordem da soma) com alguns zerados.
+    if seed % 2 == 0:
+        return dict(PESOS)
+    pesos = {c: round(float(rng.integers(0, 9)) * 0.05, 2) for c in CRITERIOS[:-1]}
+    for c in rng.choice(CRITERIOS[:-1], size=int(rng.integers(0, 3)), replace=False):
+        pesos[c] = 0.0
+    return pesos
+
+def _frame(rng: np.random.Generator, n_docs: int, presenca_col: str) -> pd.DataFrame:
+    rows = []
+    for d in rng.permutation(n_docs):
+        # Critérios repetidos e em ordem aleatória; documentos com uma única linha.
+        for c in rng.choice(CRITERIOS, size=int(rng.integers(1, 12))):
+            rows.append({"doc_id": f"D{d:04d}", "criterio": c, presenca_col: rng.choice(ROTULOS)})
+    return pd.DataFrame(rows)
+
+SEEDS = range(20)
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_escores_iguais_ao_loop(seed):
+    rng = np.random.default_rng(seed)
+    pesos = _pesos(rng, seed)
+    gold = _frame(rng, int(rng.integers(1, 200)), "presenca_gold")
+    preds = _frame(rng, int(rng.integers(1, 200)), "presenca_mvp")
+
+    for novo, velho in (
+        (cm.compute_human_scores(gold, pesos), _scores_loop(gold, pesos, "presenca_gold", "escore_humano")),
+        (cm.compute_scores_from_preds(preds, pesos), _scores_loop(preds, pesos, "presenca_mvp", "escore_mvp_calc")),
+    ):
+        assert list(novo.columns) == list(velho.columns)
+        assert novo["doc_id"].tolist() == velho["doc_id"].tolist()
+        # Igualdade exata: o arredondamento a 2 casas não pode mudar em nenhum documento.
+        assert novo.iloc[:, 1].tolist() == velho.iloc[:, 1].tolist()
+
+def test_escores_vazio():
+    vazio = pd.DataFrame(columns=["doc_id", "criterio", "presenca_gold"])
+    assert cm.compute_human_scores(vazio, {"agua": 1.0}).empty
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_f1_macro_igual_ao_loop(seed):
+    rng = np.random.default_rng(1000 + seed)
+    n = int(rng.integers(0, 300))
+    # Rótulos restritos em algumas rodadas, para cobrir classes sem tp/fp/fn.
+    rotulos = ROTULOS if seed % 3 else ["sim", "nao"]
+    y_true = list(rng.choice(rotulos, size=n))
+    y_pred = list(rng.choice(rotulos, size=n))
+    assert cm.f1_macro(y_true, y_pred) == pytest.approx(_f1_macro_loop(y_true, y_pred), abs=1e-12)
@@ -0,0 +1,32 @@
+"""
+Partida a frio do serviço: `import app.main` não pode carregar SDKs de provedores LLM, leitores
+de PDF nem OCR, e o import próprio do app fica dentro de uma fração do import das dependências
+de base (FastAPI, Pydantic, Jinja2, dotenv), o que independe da velocidade da máquina.
+Usa as mesmas medidas do `python -m benchmarks.importtime`.
+Uso (a partir da raiz do repositório):
+  python -m pytest -q tests/test_importtime.py
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+PKG_DIR = Path(__file__).resolve().parents[1] / "mvp_sem_rag_openai_pkg2"
+sys.path.insert(0, str(PKG_DIR))
+from benchmarks import importtime as it  # noqa: E402
+
+pytest.importorskip("fastapi")
+
+@pytest.mark.parametrize("modulo", ["app.main", "app.batch", "app.jobs"])
+def test_sem_sdks_no_import(modulo):
+    # Processo limpo, sem nada pré-importado: qualquer caminho até os SDKs aparece aqui.
+    assert it.carregados_proibidos(it.medir(modulo), it.PROIBIDOS) == []
+
+def test_orcamento_relativo_a_base():
+    base_ms, proprio_ms, linhas = it.medir_relativo("app.main", repeticoes=3)
+    assert base_ms > 0 and it.total_us(linhas, "app.main") > 0
+    mais_caros = sorted(it.filhos_diretos(linhas, "app.main").items(), key=lambda x: -x[1])[:5]
+    assert proprio_ms <= it.ORCAMENTO_REL * base_ms, (
+        f"import próprio de app.main: {proprio_ms:.0f} ms > {it.ORCAMENTO_REL:.0%} de {base_ms:.0f} ms "
+        f"(dependências de base); mais caros: {mais_caros}")
@@ -0,0 +1,142 @@
+"""
+Fila de jobs em SQLite: dedup e forcar no submit, ordem e lease no claim (heartbeat,
+devolução à fila de jobs com lease vencido, escritas descartadas do worker antigo) e
+workers que sobrevivem a erros do banco. Banco temporário e lease curto.
+Uso (a partir da raiz do repositório):
+  python -m pytest -q tests/test_jobs.py
+"""
+
+import sqlite3, sys, time
+from pathlib import Path
+
+import pytest
+
+PKG_DIR = Path(__file__).resolve().parents[1] / "mvp_sem_rag_openai_pkg2"
+sys.path.insert(0, str(PKG_DIR))
+pytest.importorskip("dotenv")
+from app import jobs  # noqa: E402
+
+LEASE = 0.2
+
+@pytest.fixture
+def queue(tmp_path):
+    q = jobs.JobQueue(str(tmp_path / "jobs.sqlite3"))
+    yield q
+    q.close()
+
+def _status(q, job_id):
+    return q.get(job_id)["status"]
+
+def test_submit_dedup_e_forcar(queue):
+    a, dup = queue.submit({"doc": 1}, "k1", ["agua"])
+    assert not dup
+    assert queue.submit({"doc": 1}, "k1", ["agua"]) == (a, True)
+    b, dup = queue.submit({"doc": 2}, "k2", ["agua"])
+    assert not dup and b != a
+    # Na fila ou executando: reaproveitado mesmo com force.
+    assert queue.submit({"doc": 1}, "k1", ["agua"], force=True) == (a, True)
+    job = queue.claim("w1", LEASE)
+    assert job["id"] == a
+    assert queue.submit({"doc": 1}, "k1", ["agua"], force=True) == (a, True)
+    queue.finish(a, {"ok": True}, "w1")
+    # Concluído: reaproveitado, exceto com force.
+    assert queue.submit({"doc": 1}, "k1", ["agua"]) == (a, True)
+    c, dup = queue.submit({"doc": 1}, "k1", ["agua"], force=True)
+    assert not dup and c not in (a, b)
+    assert queue.submit({"doc": 1}, "k1", ["agua"]) == (c, True)
+
+def test_falhou_pode_ser_resubmetido(queue):
+    a, _ = queue.submit({}, "k", [])
+    queue.claim("w1", LEASE)
+    queue.fail(a, "RuntimeError: x", "w1")
+    assert queue.get(a)["erro"] == "RuntimeError: x" and _status(queue, a) == jobs.FALHOU
+    b, dup = queue.submit({}, "k", [])
+    assert not dup and b != a
+
+def test_claim_por_prioridade_e_chegada(queue):
+    a, _ = queue.submit({}, "a", [])
+    b, _ = queue.submit({}, "b", [], prioridade=5)
+    c, _ = queue.submit({}, "c", [])
+    # Resubmeter com prioridade maior sobe o job que está na fila.
+    assert queue.submit({}, "c", [], prioridade=9) == (c, True)
+    assert [queue.claim("w", LEASE)["id"] for _ in range(3)] == [c, b, a]
+    assert queue.claim("w", LEASE) is None
+
+def test_lease_vencido_volta_para_fila(queue):
+    a, _ = queue.submit({}, "k", ["agua"])
+    assert queue.claim("w1", LEASE)["worker"] == "w1"
+    queue.add_result(a, {"criterio": "agua"}, "w1")
+    assert queue.claim("w2", LEASE) is None  # lease ainda válido
+    time.sleep(LEASE * 1.5)
+    job = queue.claim("w2", LEASE)
+    assert job["id"] == a and job["worker"] == "w2"
+    assert queue.get(a)["resultados"] == []  # progresso parcial do worker antigo descartado
+    # O worker antigo não escreve mais no job.
+    queue.add_result(a, {"criterio": "agua", "de": "w1"}, "w1")
+    queue.finish(a, {"de": "w1"}, "w1")
+    queue.fail(a, "de w1", "w1")
+    assert _status(queue, a) == jobs.EXECUTANDO and queue.get(a)["resultados"] == []
+    queue.add_result(a, {"criterio": "agua", "de": "w2"}, "w2")
+    queue.finish(a, {"de": "w2"}, "w2")
+    got = queue.get(a)
+    assert got["status"] == jobs.CONCLUIDO and got["resultado"] == {"de": "w2"}
+    assert got["resultados"] == [{"criterio": "agua", "de": "w2"}]
+
+def test_heartbeat_mantem_o_lease(queue):
+    a, _ = queue.submit({}, "k", [])
+    queue.claim("w1", LEASE)
+    for _ in range(4):
+        time.sleep(LEASE / 2)
+        assert queue.heartbeat("w1") == 1
+        assert queue.requeue_expired(LEASE) == 0
+    time.sleep(LEASE * 1.5)
+    assert queue.requeue_expired(LEASE) == 1
+    assert _status(queue, a) == jobs.NA_FILA and queue.heartbeat("w1") == 0
+
+class _FilaInstavel:
+    # Delega a uma JobQueue real, mas o claim falha nas primeiras chamadas e o fail na primeira.
+    def __init__(self, q, falhas_claim=2, falhas_fail=1):
+        self.q, self.falhas_claim, self.falhas_fail = q, falhas_claim, falhas_fail
+
+    def claim(self, worker, lease):
+        if self.falhas_claim:
+            self.falhas_claim -= 1
+            raise sqlite3.OperationalError("database is locked")
+        return self.q.claim(worker, lease)
+
+    def fail(self, job_id, erro, worker):
+        if self.falhas_fail:
+            self.falhas_fail -= 1
+            raise sqlite3.OperationalError("disk I/O error")
+        self.q.fail(job_id, erro, worker)
+
+    def __getattr__(self, nome):
+        return getattr(self.q, nome)
+
+def test_worker_sobrevive_a_erros_do_banco(queue, monkeypatch, capsys):
+    from app import batch
+
+    def process_document(*args, **kwargs):
+        raise ValueError("pipeline quebrou")
+
+    monkeypatch.setattr(batch, "process_document", process_document)
+    monkeypatch.setattr(jobs, "JOBS_POLL_INTERVAL", 0.01)
+    params = {"doc_path": "x.pdf", "max_paginas": 6, "contexto": 1, "max_concorrencia": 1, "modo": "individual"}
+    a, _ = queue.submit(params, "k", [])
+    w = jobs.JobWorkers(_FilaInstavel(queue), n=1, lease=LEASE)
+    w.start()
+    try:
+        limite = time.time() + 5
+        while _status(queue, a) != jobs.FALHOU and time.time() < limite:
+            time.sleep(0.02)
+        b, _ = queue.submit(params, "k2", [])
+        w.notify()
+        while _status(queue, b) != jobs.FALHOU and time.time() < limite:
+            time.sleep(0.02)
+    finally:
+        w.stop()
+    assert _status(queue, a) == jobs.FALHOU
+    assert queue.get(a)["erro"] == "OperationalError: disk I/O error"
+    assert queue.get(b)["erro"] == "ValueError: pipeline quebrou"  # a thread continuou viva
+    out = capsys.readouterr().out
+    assert out.count("[WARN]") == 3 and "database is locked" in out
@@ -0,0 +1,96 @@
+"""
+Varredura por palavras-chave do KeywordIndex: o /scan indexado devolve as mesmas páginas do
+/scan original (contagem de substrings no texto em minúsculas, copiada abaixo como oráculo),
+inclusive com palavras-chave com espaços nas bordas.
+Uso (a partir da raiz do repositório):
+  python -m pytest -q tests/test_keyword_index.py
+"""
+
+import random, sys
+from pathlib import Path
+
+import pytest
+
+PKG_DIR = Path(__file__).resolve().parents[1] / "mvp_sem_rag_openai_pkg2"
+sys.path.insert(0, str(PKG_DIR))
+from app.keyword_index import KeywordIndex  # noqa: E402
+
+# --- oráculo: /scan original ------------------------------------------------------------
+
+def _scan_original(texts: dict, palavras: list, max_paginas: int, contexto: int) -> list:
+    keys = [k.lower() for k in palavras]
+    scores = []
+    for p in sorted(texts):
+        tl = texts[p].lower()
+        score = sum(tl.count(k) for k in keys)
+        if score > 0:
+            scores.append((p, score))
+    scores.sort(key=lambda x: x[1], reverse=True)
+    pages = [p for p, _ in scores[:max_paginas]]
+    with_context = set()
+    for p in pages:
+        for d in range(-contexto, contexto + 1):
+            if 1 <= p + d <= len(texts):
+                with_context.add(p + d)
+    return sorted(with_context) if with_context else pages
+
+# --- dados aleatórios (sem acentos: a normalização de acentos é mudança intencional) -----
+
+PALAVRAS = ["iso", "inciso", "aviso", "nbr", "abnt", "agua", "aguardar", "norma", "tecnica", "de",
+            "ence", "vencedor", "kwh", "l/min", "co2", "selo", "selos"]
+CHAVES = ["iso", " iso ", "iso ", " iso", "nbr", "norma tecnica", " agua", "ence ", "l/min", "selo",
+          "Abnt", "de ", " ", "kwh", "NBR ISO", "ISO 14001"]
+
+def _texto(rng: random.Random) -> str:
+    partes = []
+    for _ in range(rng.randint(0, 60)):
+        w = rng.choice(PALAVRAS + ["14001", "9001", "."])
+        partes.append(w.upper() if rng.random() < 0.2 else w)
+        partes.append(rng.choice([" ", " ", "  ", "\n", ", "]))
+    return "".join(partes)
+
+@pytest.mark.parametrize("seed", range(40))
+def test_scan_igual_ao_original(seed):
+    rng = random.Random(seed)
+    texts = {p: _texto(rng) for p in range(1, rng.randint(1, 25) + 1)}
+    idx = KeywordIndex(texts)
+    for _ in range(10):
+        palavras = rng.sample(CHAVES, rng.randint(1, 4))
+        max_paginas, contexto = rng.randint(1, 6), rng.randint(0, 2)
+        assert idx.scan(palavras, max_paginas, contexto) == _scan_original(texts, palavras, max_paginas, contexto), palavras
+
+def test_palavra_com_espacos_nao_casa_dentro_de_palavras():
+    idx = KeywordIndex({1: "inciso I do aviso", 2: "norma ISO 14001"})
+    assert idx.count(" iso ") == {2: 1}
+    assert idx.count("iso") == {1: 2, 2: 1}  # "inciso" e "aviso"
+    assert idx.count("") == {}
+    assert idx.hits([1, 2], [" iso "]) == {1: [], 2: [5]}
+
+# --- varredura do pipeline: palavras inteiras ---------------------------------------------
+
+from app.criteria import DEFAULT_KEYWORDS  # noqa: E402
+
+BOILERPLATE = ("Nos termos do inciso II, publique-se o aviso de licitação; o vencedor apresentará os documentos "
+               "que lhe pertence. Aguardar a isonomia entre os licitantes e a sessão encerrada. ") * 4
+EVIDENCIA = ("O produto atende à ABNT NBR 15575 e à ISO 14001, com Etiqueta Nacional de Conservação de Energia "
+             "(ENCE) classe A e consumo de água reduzido.")
+
+@pytest.mark.parametrize("criterio", ["normas_tecnicas", "eficiencia_energetica", "uso_de_agua"])
+def test_boilerplate_nao_supera_evidencia(criterio):
+    idx = KeywordIndex({1: BOILERPLATE, 2: EVIDENCIA, 3: BOILERPLATE})
+    assert idx.rank(DEFAULT_KEYWORDS[criterio], palavra_inteira=True)[0][0] == 2
+    assert idx.scan(DEFAULT_KEYWORDS[criterio], max_paginas=1, contexto=0, palavra_inteira=True) == [2]
+    assert idx.hits([1, 3], DEFAULT_KEYWORDS[criterio], palavra_inteira=True) == {1: [], 3: []}
+
+def test_palavras_inteiras_e_prefixos():
+    idx = KeywordIndex({1: "Material reciclável; reciclagem. Inciso: ISO-9001", 2: "norma técnica NBR/ISO", 3: "normas"})
+    assert idx.count_words("iso") == {1: 1, 2: 1}
+    assert idx.count_words("recicl") == {}
+    assert idx.count_words("Recicl*") == {1: 2}
+    assert idx.count_words("norma tec*") == {2: 1}
+    assert idx.count_words("nbr/iso") == {2: 1}
+    assert idx.count_words("norma*") == {2: 1, 3: 1}
+    assert idx.count_words(" * ") == {}
+    texto = idx.norm[1]
+    assert idx.hits([1], ["recicl*", "iso"], palavra_inteira=True) == {
+        1: [texto.index("reciclavel"), texto.index("reciclagem"), texto.index("iso-")]}
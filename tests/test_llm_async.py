@@ -0,0 +1,123 @@
+"""
+Cliente LLM assíncrono: retentativas em 429/5xx/timeout (respeitando Retry-After e o limite
+LLM_MAX_RETRIES), erros não transitórios sem retentativa e o RateLimiter (token bucket)
+espaçando as chamadas. O provedor é um _call falso que levanta erros com status e cabeçalhos,
+como os SDKs; nenhuma chamada de rede.
+Uso (a partir da raiz do repositório):
+  python -m pytest -q tests/test_llm_async.py
+"""
+
+import asyncio, sys, time
+from email.utils import formatdate
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+PKG_DIR = Path(__file__).resolve().parents[1] / "mvp_sem_rag_openai_pkg2"
+sys.path.insert(0, str(PKG_DIR))
+pytest.importorskip("dotenv")
+from app import llm_async  # noqa: E402
+from app.metrics import LLM_RETRIES  # noqa: E402
+
+class APIError(Exception):
+    # Como openai.APIStatusError: status_code e response.headers.
+    def __init__(self, status: int, headers: dict = None):
+        super().__init__(f"HTTP {status}")
+        self.status_code = status
+        self.response = SimpleNamespace(status_code=status, headers=headers or {})
+
+class FakeClient(llm_async.AsyncLLMClient):
+    # Cada chamada consome o próximo item do roteiro: exceção (levantada), número (demora, em s) ou resposta.
+    def __init__(self, roteiro, limiter=None):
+        super().__init__(limiter or llm_async.RateLimiter(0, 0))
+        self.roteiro = list(roteiro)
+        self.chamadas = []
+
+    async def _call(self, prompt, system, temperature, max_tokens):
+        self.chamadas.append(time.monotonic())
+        item = self.roteiro.pop(0) if self.roteiro else '{"ok": true}'
+        if isinstance(item, Exception):
+            raise item
+        if isinstance(item, float):
+            await asyncio.sleep(item)
+            return '{"ok": true}'
+        return item
+
+@pytest.fixture(autouse=True)
+def ambiente(monkeypatch):
+    monkeypatch.setenv("LLM_PROVIDER", "MOCK")
+    monkeypatch.setattr(llm_async, "get_cache", lambda: None)
+    monkeypatch.setattr(llm_async, "LLM_BACKOFF_BASE", 0.01)
+    monkeypatch.setattr(llm_async, "LLM_BACKOFF_MAX", 0.05)
+
+def _run(client, **kw):
+    return asyncio.run(client.complete_json("prompt", **kw))
+
+def test_retry_after_respeitado():
+    client = FakeClient([APIError(429, {"retry-after-ms": "150"}), APIError(503, {"retry-after": "0.2"}), '{"a": 1}'])
+    antes = LLM_RETRIES.value()
+    t0 = time.monotonic()
+    assert _run(client) == '{"a": 1}'
+    assert len(client.chamadas) == 3 and LLM_RETRIES.value() - antes == 2
+    # A espera pedida é cumprida inteira (sem jitter para baixo).
+    esperas = [b - a for a, b in zip(client.chamadas, client.chamadas[1:])]
+    assert esperas[0] >= 0.15 and esperas[1] >= 0.2
+    assert time.monotonic() - t0 < 2
+
+def test_limite_de_retentativas():
+    client = FakeClient([APIError(500)] * 10)
+    client.max_retries = 2
+    with pytest.raises(APIError):
+        _run(client)
+    assert len(client.chamadas) == 3
+
+@pytest.mark.parametrize("status", [400, 401, 404, 422])
+def test_erro_nao_transitorio_sem_retentativa(status):
+    client = FakeClient([APIError(status, {"retry-after": "0"})])
+    with pytest.raises(APIError):
+        _run(client)
+    assert len(client.chamadas) == 1
+
+def test_timeout_e_retentado():
+    client = FakeClient([1.0, '{"b": 2}'])
+    client.timeout = 0.05
+    assert _run(client) == '{"b": 2}'
+    assert len(client.chamadas) == 2
+
+def test_retry_after_formatos():
+    def erro(headers):
+        return APIError(429, headers)
+    assert llm_async._retry_after(erro({"retry-after-ms": "250", "retry-after": "9"})) == 0.25
+    assert llm_async._retry_after(erro({"retry-after": "3"})) == 3.0
+    assert 0 < llm_async._retry_after(erro({"retry-after": formatdate(time.time() + 30, usegmt=True)})) <= 30
+    assert llm_async._retry_after(erro({"retry-after": formatdate(time.time() - 30, usegmt=True)})) == 0.0
+    assert llm_async._retry_after(erro({"retry-after": "amanhã"})) is None
+    assert llm_async._retry_after(erro({})) is None
+    assert llm_async._retry_after(ValueError("sem resposta")) is None
+
+def test_limiter_espaca_requisicoes():
+    # 600 RPM = 1 requisição a cada 0,1 s depois de esgotada a rajada inicial.
+    limiter = llm_async.RateLimiter(rpm=600, tpm=0)
+    limiter.requests.tokens = 0
+
+    async def main():
+        client = FakeClient([], limiter)
+        await asyncio.gather(*(client.complete_json(f"p{i}") for i in range(5)))
+        return client.chamadas
+
+    t0 = time.monotonic()
+    chamadas = asyncio.run(main())
+    assert len(chamadas) == 5
+    assert chamadas[-1] - t0 >= 0.45
+    assert all(b - a >= 0.08 for a, b in zip(chamadas, chamadas[1:]))
+
+def test_limiter_conta_retentativas_e_tokens():
+    # Cada tentativa passa pelo limite; o TPM limita pelos tokens estimados da chamada.
+    limiter = llm_async.RateLimiter(rpm=0, tpm=6000)  # 100 tokens/s
+    limiter.tokens.tokens = 0
+    client = FakeClient([APIError(429, {"retry-after": "0"}), '{"c": 3}'], limiter)
+    t0 = time.monotonic()
+    assert _run(client, max_tokens=10) == '{"c": 3}'
+    # Duas tentativas de 13 tokens estimados (system + prompt + max_tokens) a 100 tokens/s.
+    assert len(client.chamadas) == 2 and time.monotonic() - t0 >= 0.2
@@ -0,0 +1,107 @@
+"""
+Cache de páginas e OCR: páginas que ficaram sem OCR (motor indisponível ou falha) são marcadas
+no cache em disco e completadas quando o OCR volta a funcionar, em vez de ficarem vazias para
+sempre; e a checagem do Tesseract roda uma vez por processo.
+Uso (a partir da raiz do repositório):
+  python -m pytest -q tests/test_page_cache.py
+"""
+
+import sys, types
+from pathlib import Path
+
+import pytest
+
+PKG_DIR = Path(__file__).resolve().parents[1] / "mvp_sem_rag_openai_pkg2"
+sys.path.insert(0, str(PKG_DIR))
+from app import ocr, page_cache  # noqa: E402
+
+DIGITAL = "Texto da página digital com a norma ABNT NBR 15575."
+OCR = "Texto reconhecido da página escaneada com a ISO 14001."
+
+@pytest.fixture
+def doc(tmp_path, monkeypatch):
+    pdf = tmp_path / "doc.pdf"
+    pdf.write_bytes(b"%PDF-1.4 fake")
+    monkeypatch.setattr(page_cache, "extract_text_by_page", lambda path: {1: DIGITAL, 2: ""})
+    return str(pdf)
+
+def _cache(tmp_path, use_mmap=True):
+    # Instância nova = outro processo: sem nada em memória, só o que está em disco.
+    return page_cache.PageTextCache(tmp_path / "pc", use_mmap=use_mmap)
+
+@pytest.mark.parametrize("use_mmap", [True, False])
+def test_pagina_sem_ocr_e_completada_depois(tmp_path, doc, monkeypatch, use_mmap):
+    chamadas = []
+
+    def run_ocr(path, pages):
+        chamadas.append(list(pages))
+        return {p: OCR for p in pages} if ocr_ok else {}
+
+    monkeypatch.setattr(ocr, "run_ocr", run_ocr)
+    monkeypatch.setattr(ocr, "can_ocr", lambda: ocr_ok)
+
+    ocr_ok = False  # Tesseract indisponível
+    assert dict(_cache(tmp_path, use_mmap).get(doc)) == {1: DIGITAL, 2: ""}
+    sha = page_cache.file_sha256(doc)
+    assert (tmp_path / "pc" / f"{sha}{page_cache.PENDING_OCR_SUFFIX}").read_text() == "[2]"
+    # Ainda indisponível: usa o disco sem tentar de novo.
+    assert dict(_cache(tmp_path, use_mmap).get(doc)) == {1: DIGITAL, 2: ""}
+    assert chamadas == [[2]]
+
+    ocr_ok = True
+    c = _cache(tmp_path, use_mmap)
+    assert dict(c.get(doc)) == {1: DIGITAL, 2: OCR}
+    assert dict(c.get(doc)) == {1: DIGITAL, 2: OCR}
+    assert not (tmp_path / "pc" / f"{sha}{page_cache.PENDING_OCR_SUFFIX}").exists()
+    assert dict(_cache(tmp_path, use_mmap).get(doc)) == {1: DIGITAL, 2: OCR}
+    assert chamadas == [[2], [2]]
+
+def test_ocr_desligado_marca_paginas(tmp_path, doc, monkeypatch):
+    monkeypatch.setattr(ocr, "OCR_ENABLED", False)
+    assert ocr.fill_missing(doc, {1: DIGITAL, 2: " ", 3: "curta"}) == [2, 3]
+    _cache(tmp_path).get(doc)
+    assert list((tmp_path / "pc").glob(f"*{page_cache.PENDING_OCR_SUFFIX}"))
+
+def test_tesseract_verificado_uma_vez(monkeypatch):
+    chamadas = []
+    fake = types.SimpleNamespace(get_tesseract_version=lambda: chamadas.append(1) or "5.3")
+    monkeypatch.setitem(sys.modules, "pytesseract", fake)
+    monkeypatch.setattr(ocr.TesseractEngine, "_available", None)
+    assert all(ocr.TesseractEngine().available() for _ in range(5))
+    assert len(chamadas) == 1
+
+# --- limite da pasta em disco ------------------------------------------------------------
+
+def _arquivos(pasta: Path) -> set:
+    return {f.name.split(".", 1)[0] for f in pasta.iterdir() if not f.name.endswith(".tmp")}
+
+@pytest.mark.parametrize("use_mmap", [True, False])
+def test_disco_limitado_por_tamanho(tmp_path, use_mmap):
+    import os
+    texto = {1: "x" * 4000}
+    c = page_cache.PageTextCache(tmp_path / "pc", use_mmap=use_mmap, disk_max_bytes=0, disk_max_age=0)
+    for i, sha in enumerate(["a", "b"]):
+        c._save_disk(sha, texto, [1] if sha == "a" else [])
+        for f in (tmp_path / "pc").glob(f"{sha}.*"):
+            os.utime(f, (1000 + i, 1000 + i))
+    # Cabem "a" (com o .sem_ocr.json) e "b", mas não um terceiro documento.
+    c.disk_max_bytes = sum(f.stat().st_size for f in (tmp_path / "pc").iterdir()) + 10
+    # "a" é o mais antigo, mas foi lido agora: sai "b".
+    assert c._load_disk("a") is not None
+    c._save_disk("c", texto)
+    assert _arquivos(tmp_path / "pc") == {"a", "c"}
+    # O documento recém-gravado fica mesmo sozinho acima do limite.
+    c._save_disk("d", {1: "".join(chr(0x4e00 + i % 5000) for i in range(20_000))})
+    assert _arquivos(tmp_path / "pc") == {"d"}
+
+def test_disco_limitado_por_idade(tmp_path):
+    import os, time
+    c = page_cache.PageTextCache(tmp_path / "pc", disk_max_bytes=0, disk_max_age=3600)
+    c._save_disk("velho", {1: "a"})
+    c._save_disk("novo", {1: "b"})
+    antigo = time.time() - 7200
+    os.utime(tmp_path / "pc" / f"velho{page_cache.RAW_SUFFIX}", (antigo, antigo))
+    assert c.prune_disk() == 1
+    assert _arquivos(tmp_path / "pc") == {"novo"}
+    sem_limite = page_cache.PageTextCache(tmp_path / "pc", disk_max_bytes=0, disk_max_age=0)
+    assert sem_limite.prune_disk() == 0
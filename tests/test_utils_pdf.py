@@ -0,0 +1,71 @@
+"""
+Extração paralela de PDFs: um pool de processos por número de workers, de modo que chamadores
+com tamanhos diferentes não derrubam o pool uns dos outros, e recuperação quando o pool quebra
+(processo filho morto) ou é encerrado. O PDF de teste é montado aqui, sem arquivos externos.
+Uso (a partir da raiz do repositório):
+  python -m pytest -q tests/test_utils_pdf.py
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+PKG_DIR = Path(__file__).resolve().parents[1] / "mvp_sem_rag_openai_pkg2"
+sys.path.insert(0, str(PKG_DIR))
+pytest.importorskip("pdfplumber")
+pytest.importorskip("pypdf")
+from app import utils_pdf  # noqa: E402
+
+def _pdf(path: Path, paginas: list) -> Path:
+    # PDF mínimo: uma linha de texto em Helvetica por página.
+    n = len(paginas)
+    objs = ["<< /Type /Catalog /Pages 2 0 R >>",
+            "<< /Type /Pages /Kids [%s] /Count %d >>" % (" ".join(f"{4 + 2 * i} 0 R" for i in range(n)), n),
+            "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    for i, texto in enumerate(paginas):
+        stream = f"BT /F1 12 Tf 72 720 Td ({texto}) Tj ET"
+        objs.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {5 + 2 * i} 0 R"
+                    " /Resources << /Font << /F1 3 0 R >> >> >>")
+        objs.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+    out, offsets = b"%PDF-1.4\n", []
+    for i, o in enumerate(objs, 1):
+        offsets.append(len(out))
+        out += f"{i} 0 obj\n{o}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objs) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{o:010d} 00000 n \n" for o in offsets).encode()
+    out += f"trailer\n<< /Size {len(objs) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    path.write_bytes(out)
+    return path
+
+@pytest.fixture
+def pdf(tmp_path):
+    path = _pdf(tmp_path / "doc.pdf", [f"pagina {i} norma ABNT" for i in range(1, 6)])
+    yield str(path)
+    utils_pdf.shutdown_pool()
+
+def test_pools_por_numero_de_workers(pdf):
+    esperado = dict(utils_pdf.iter_pages(pdf))
+    assert esperado[3] == "pagina 3 norma ABNT"
+    assert utils_pdf.extract_text_by_page(pdf, workers=2, chunk_size=1) == esperado
+    pool2 = utils_pdf._pools[2]
+    # Outro tamanho cria outro pool e não encerra o primeiro.
+    assert utils_pdf.extract_text_by_page(pdf, workers=3, chunk_size=2) == esperado
+    assert utils_pdf._pools[2] is pool2 and set(utils_pdf._pools) == {2, 3}
+    assert utils_pdf.extract_text_by_page(pdf, workers=2, chunk_size=1) == esperado
+
+def test_pool_quebrado_e_encerrado(pdf):
+    esperado = dict(utils_pdf.iter_pages(pdf))
+    assert utils_pdf.extract_text_by_page(pdf, workers=2, chunk_size=1) == esperado
+    pool2, pool3 = utils_pdf._pools[2], utils_pdf._get_pool(3)
+    for proc in list(pool2._processes.values()):
+        proc.kill()
+        proc.join()
+    # Pool quebrado: extrai sem ele e sai do registro; o pool de outro tamanho continua.
+    assert utils_pdf.extract_text_by_page(pdf, workers=2, chunk_size=1) == esperado
+    assert utils_pdf._pools.get(2) is not pool2 and utils_pdf._pools[3] is pool3
+    assert utils_pdf.extract_text_by_page(pdf, workers=2, chunk_size=1) == esperado
+    # Pool encerrado por outro chamador: RuntimeError no submit vira extração local.
+    pool3.shutdown(wait=True)
+    assert utils_pdf.extract_text_by_page(pdf, workers=3, chunk_size=1) == esperado